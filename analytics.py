@@ -0,0 +1,222 @@
+"""
+Typing analytics per key and per bigram (pair of consecutive keys).
+
+A TypingTracker counts the player's moves, their periods, and their
+misses in flat arrays while they play. Nothing but a few additions
+happens per keystroke. Sessions are merged into a TypingStore on disk,
+whose totals can bias Game.key_bias toward the player's weak keys.
+"""
+import json
+import os
+from array import array
+
+import events
+from languages import LANGUAGES
+
+
+class TypingStats:
+    """
+    Counters of the player's moves in one language. Keys and bigrams
+    are indexed by the order of keys in the language. A bigram of keys
+    i then j has the code i * len(language) + j.
+
+    Attributes:
+    -- lang_choice  : str               :
+    -- keys         : list{str}         : Display keys, in order.
+    -- index        : dict{str: int}    : Map from display keys to their index.
+    -- counts       : array{int}        : Per key, the number of moves onto it.
+    -- seconds      : array{float}      : Per key, the total periods of those moves.
+    -- misses       : array{int}        : Per key, the misses before those moves.
+    -- bigrams      : dict{int: int}    : Map from bigram codes to their slot in
+                                          the bigram_ arrays.
+    """
+    def __init__(self, lang_choice: str):
+        self.lang_choice = lang_choice
+        self.keys = list(LANGUAGES[lang_choice])
+        self.index = {k: i for i, k in enumerate(self.keys)}
+        self.counts = array('L', [0]) * len(self.keys)
+        self.seconds = array('d', [0.0]) * len(self.keys)
+        self.misses = array('L', [0]) * len(self.keys)
+        self.bigrams = {}
+        self.bigram_counts = array('L')
+        self.bigram_seconds = array('d')
+        self.bigram_misses = array('L')
+
+    def add(self, prev: int, key: int, period: float, misses: int):
+        """
+        Counts a move onto the key of index key. prev is
+        the index of the key moved onto before it, or None.
+        """
+        self.counts[key] += 1
+        self.seconds[key] += period
+        self.misses[key] += misses
+        if prev is not None:
+            self.add_bigram(prev * len(self.keys) + key, 1, period, misses)
+
+    def add_bigram(self, code: int, count: int, seconds: float, misses: int):
+        slot = self.bigrams.get(code)
+        if slot is None:
+            slot = self.bigrams[code] = len(self.bigram_counts)
+            self.bigram_counts.append(0)
+            self.bigram_seconds.append(0.0)
+            self.bigram_misses.append(0)
+        self.bigram_counts[slot] += count
+        self.bigram_seconds[slot] += seconds
+        self.bigram_misses[slot] += misses
+
+    def merge(self, other):
+        """ Adds the counters of other, from the same language. """
+        for i in range(len(self.keys)):
+            self.counts[i] += other.counts[i]
+            self.seconds[i] += other.seconds[i]
+            self.misses[i] += other.misses[i]
+        for code, slot in other.bigrams.items():
+            self.add_bigram(
+                code, other.bigram_counts[slot],
+                other.bigram_seconds[slot], other.bigram_misses[slot])
+
+    def key_summary(self):
+        """
+        Returns a map from display keys with any moves to
+        their number of moves, mean period, and miss rate.
+        """
+        return {
+            key: (count, self.seconds[i] / count, self.misses[i] / count)
+            for i, (key, count) in enumerate(zip(self.keys, self.counts))
+            if count}
+
+    def bigram_summary(self):
+        """ Like key_summary(), but for bigrams as (key, key) tuples. """
+        n = len(self.keys)
+        summary = {}
+        for code, slot in self.bigrams.items():
+            count = self.bigram_counts[slot]
+            summary[(self.keys[code // n], self.keys[code % n])] = (
+                count, self.bigram_seconds[slot] / count,
+                self.bigram_misses[slot] / count)
+        return summary
+
+    def key_bias(self, strength: float = 0.5, min_count: int = 5):
+        """
+        Returns a map for Game.key_bias. A key's weakness is its mean
+        period times one plus its miss rate. The weakest key is always
+        kept, and others are kept less often the stronger they are, down
+        to a chance of 1 - strength. Keys with fewer than min_count moves
+        count as average.
+        """
+        weakness = {}
+        for key, (count, mean, miss_rate) in self.key_summary().items():
+            if count >= min_count:
+                weakness[key] = mean * (1 + miss_rate)
+        if not weakness:
+            return None
+        average = sum(weakness.values()) / len(weakness)
+        weakest = max(weakness.values())
+        return {
+            key: 1 - strength * (1 - weakness.get(key, average) / weakest)
+            for key in self.keys}
+
+    def to_dict(self):
+        return {
+            'counts': self.counts.tolist(),
+            'seconds': self.seconds.tolist(),
+            'misses': self.misses.tolist(),
+            'bigrams': [
+                [code, self.bigram_counts[slot],
+                 self.bigram_seconds[slot], self.bigram_misses[slot]]
+                for code, slot in self.bigrams.items()], }
+
+    @staticmethod
+    def from_dict(lang_choice: str, data: dict):
+        stats = TypingStats(lang_choice)
+        if len(data['counts']) != len(stats.keys):
+            raise ValueError(f'Stored stats do not match {lang_choice}.')
+        stats.counts = array('L', data['counts'])
+        stats.seconds = array('d', data['seconds'])
+        stats.misses = array('L', data['misses'])
+        for bigram in data['bigrams']:
+            stats.add_bigram(*bigram)
+        return stats
+
+
+class TypingTracker:
+    """
+    Collects TypingStats from a game's KeyTyped events.
+
+    Attributes:
+    -- game         : Game              :
+    -- sessions     : dict{str: TypingStats}    : Map from languages played
+                                                  since the last flush() to their stats.
+    -- stats        : TypingStats       : The stats of the current game's language.
+    -- prev         : int               : Index of the last key moved onto, or None.
+    """
+    def __init__(self, game):
+        self.game = game
+        self.sessions = {}
+        self.stats = None
+        self.prev = None
+        game.subscribe(self.on_event, events.KeyTyped, events.Reset)
+        self.on_event(events.Reset())
+
+    def on_event(self, event):
+        if type(event) is events.Reset:
+            lang_choice = self.game.lang_name
+            if lang_choice not in self.sessions:
+                self.sessions[lang_choice] = TypingStats(lang_choice)
+            self.stats = self.sessions[lang_choice]
+            self.prev = None
+            return
+        key = self.stats.index[event.key]
+        self.stats.add(self.prev, key, event.period, event.misses)
+        self.prev = key
+
+    def flush(self):
+        """ Returns the stats collected so far, and starts new ones. """
+        sessions = self.sessions
+        lang_choice = self.stats.lang_choice
+        self.stats = TypingStats(lang_choice)
+        self.sessions = {lang_choice: self.stats}
+        return sessions
+
+
+class TypingStore:
+    """
+    Totals of TypingStats across sessions, in a json file.
+
+    Attributes:
+    -- path         : str               :
+    -- totals       : dict{str: TypingStats}    : Map from languages to their totals.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.totals = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                for lang_choice, data in json.load(file).items():
+                    if lang_choice in LANGUAGES:
+                        self.totals[lang_choice] = \
+                            TypingStats.from_dict(lang_choice, data)
+
+    def merge(self, sessions: dict):
+        """ Adds sessions from TypingTracker.flush(), and saves. """
+        for lang_choice, stats in sessions.items():
+            if lang_choice in self.totals:
+                self.totals[lang_choice].merge(stats)
+            else:
+                self.totals[lang_choice] = stats
+        self.save()
+
+    def save(self):
+        """ Writes the totals, replacing the file only once it is complete. """
+        temp = self.path + '.tmp'
+        with open(temp, 'w') as file:
+            json.dump({
+                lang_choice: stats.to_dict()
+                for lang_choice, stats in self.totals.items()}, file)
+        os.replace(temp, self.path)
+
+    def key_bias(self, lang_choice: str, strength: float = 0.5):
+        """ See TypingStats.key_bias. None if nothing is stored. """
+        if lang_choice not in self.totals:
+            return None
+        return self.totals[lang_choice].key_bias(strength)
@@ -0,0 +1,652 @@
+"""
+Simulates many headless games in lockstep using NumPy arrays.
+
+A BatchGame follows the rules of engine.Game, with the default enemy
+strategies, for B boards at once.
+Instead of typing keys, the player of each board picks one of eight
+directions to move in, or BACKTRACK. Time is simulated: every tick is
+dt seconds long, and each enemy moves when its timer runs out, at the
+same speed it would in the GUI. Requires numpy.
+
+Run with: python batch.py [batch] [ticks]
+to compare its speed against looping over Game objects.
+"""
+from functools import lru_cache
+from itertools import product
+
+import numpy as np
+
+from languages import LANGUAGES, conflicts
+from planner import runner_planner
+from stats import MoveStats
+
+
+# Characters in the occupancy arrays:
+EMPTY, PLAYER, CHASER, NOMMER, RUNNER = range(5)
+
+# (x, y) offsets for each direction. Actions index into this:
+OFFSETS = np.array([
+    (-1, -1), (0, -1), (1, -1),
+    (-1,  0),          (1,  0),
+    (-1,  1), (0,  1), (1,  1), ])
+BACKTRACK = len(OFFSETS)
+
+# Offsets of the 5x5 ring used when shuffling a tile:
+RING = np.array([
+    (x, y) for y in range(-2, 3) for x in range(-2, 3)
+    if x != 0 or y != 0])
+
+TARGET_THINNESS = 72
+
+
+@lru_cache(maxsize=None)
+def runner_tables(width: int):
+    """
+    Returns the tables of the RunnerPlanner of a width as arrays:
+    -- away     : ndarray(2W-1, 2W-1, 2)    : RunnerPlanner.away, indexed by
+                                              the vector's (y, x) + W - 1.
+    -- escapes  : ndarray(C, C, C, C, 2)    : The cached escape of each runner
+                                              and player cell, (x, y) each.
+    Escapes of a runner and player in the same cell are not cached.
+    """
+    planner = runner_planner(width)
+    away = np.zeros((2 * width - 1, 2 * width - 1, 2), dtype=np.int32)
+    for (dx, dy), step in planner.away.items():
+        away[dy + width - 1, dx + width - 1] = step
+    cell = planner.cell
+    cells = -(-width // cell)
+    center = (cell - 1) / 2
+    escapes = np.zeros((cells,) * 4 + (2,), dtype=np.int32)
+    for key in product(range(cells), repeat=4):
+        if key[:2] != key[2:]:
+            escapes[key] = planner.escape(*[i * cell + center for i in key])
+    return away, escapes
+
+
+class BatchGame:
+    """
+    Attributes:
+    -- batch        : int                   : The number of games, B.
+    -- width        : int                   : The length of each grid's sides, W.
+    -- language     : list{str}             : The display keys of the language.
+    -- conflicts    : ndarray(K+1, K)       : Whether two keys cannot be near each other.
+                                              The last row stands for 'no key'.
+    -- packed_conflicts
+                    : ndarray(K+1, K/64)    : conflicts with each row packed into the
+                                              bits of 64-bit words, to be OR-ed quickly.
+    -- keys         : ndarray(B, W, W)      : Index of each tile's key in language.
+                                              Meaningless where occupied.
+    -- occupied     : ndarray(B, W, W)      : The character on each tile, or EMPTY.
+    -- populations  : ndarray(B, K)         : Occurrences of each key in each grid.
+    -- targets      : ndarray(B, N)         : Flat grid index of each target.
+    -- is_target    : ndarray(B, W*W)       : Whether each tile holds a target.
+    -- trail        : ndarray(B, T)         : Ring buffers of flat grid indices.
+    -- trail_start  : ndarray(B)            : Index of each trail's oldest tile.
+    -- trail_len    : ndarray(B)            : Length of each trail.
+    -- player, chaser, nommer, runner
+                    : ndarray(B, 2)         : (x, y) position of each character.
+    -- timers       : ndarray(3, B)         : Seconds until the chaser, nommer
+                                              and runner next move.
+    -- period_avg   : ndarray(B)            : See MoveStats.average. NaN before
+                                              the first forward move.
+    -- since_move   : ndarray(B)            : Seconds since the last forward move.
+    -- heat, score, losses
+                    : ndarray(B)            : See engine.Game.
+    -- alive        : ndarray(B)            : False once the chaser catches a player.
+    -- dt           : float                 : Simulated seconds per tick.
+    """
+    def __init__(self, batch: int, width: int = 20,
+                 lang_choice: str = 'english lower',
+                 dt: float = 0.3, seed=None):
+        self.batch = batch
+        self.width = width
+        self.dt = dt
+        self.rng = np.random.default_rng(seed)
+
+        self.language = list(LANGUAGES[lang_choice])
+        table = conflicts(lang_choice)
+        k = len(self.language)
+        self.conflicts = np.zeros((k + 1, k), dtype=bool)
+        for i, key in enumerate(self.language):
+            for other in table[key]:
+                self.conflicts[i, self.language.index(other)] = True
+        packed = np.packbits(self.conflicts, axis=1)
+        words = -(-packed.shape[1] // 8)
+        self.packed_conflicts = np.zeros((k + 1, words * 8), dtype=np.uint8)
+        self.packed_conflicts[:, :packed.shape[1]] = packed
+        self.packed_conflicts = self.packed_conflicts.view(np.uint64)
+
+        self.cell = runner_planner(width).cell
+        self.away, self.escapes = runner_tables(width)
+
+        self.num_targets = width ** 2 / TARGET_THINNESS
+        n = int(np.ceil(self.num_targets))
+        self.coords = np.stack(np.meshgrid(
+            np.arange(width), np.arange(width)), axis=-1).reshape(-1, 2)
+        self.center_bell = self.bell(
+            self.coords - width // 2, 0.8 * width, peak=1)
+
+        self.keys = np.zeros((batch, width, width), dtype=np.int16)
+        self.occupied = np.zeros((batch, width, width), dtype=np.int8)
+        self.populations = np.zeros((batch, k), dtype=np.int32)
+        self.targets = np.zeros((batch, n), dtype=np.int32)
+        self.is_target = np.zeros((batch, width ** 2), dtype=bool)
+        self.trail = np.zeros((batch, width ** 2), dtype=np.int32)
+        self.trail_start = np.zeros(batch, dtype=np.int32)
+        self.trail_len = np.zeros(batch, dtype=np.int32)
+        self.player = np.zeros((batch, 2), dtype=np.int32)
+        self.chaser = np.zeros((batch, 2), dtype=np.int32)
+        self.nommer = np.zeros((batch, 2), dtype=np.int32)
+        self.runner = np.zeros((batch, 2), dtype=np.int32)
+        self.timers = np.zeros((3, batch))
+        self.alpha = MoveStats().average.alpha
+        self.period_avg = np.full(batch, np.nan)
+        self.since_move = np.zeros(batch)
+        self.heat = np.zeros(batch)
+        self.score = np.zeros(batch, dtype=np.int32)
+        self.losses = np.zeros(batch, dtype=np.int32)
+        self.alive = np.zeros(batch, dtype=bool)
+        self.reset()
+
+    def reset(self, mask=None):
+        """
+        Restarts the games selected by the boolean mask, or all of them.
+
+        Tiles are shuffled in nine phases instead of in row-order like in
+        engine.Game.restart. Tiles of a phase are at least three tiles
+        apart, so none is in another's 5x5 ring and all of them can be
+        shuffled at once. Keys stay balanced, but a phase only sees the
+        populations from before it.
+        """
+        rows = np.arange(self.batch) if mask is None else np.flatnonzero(mask)
+        if not len(rows):
+            return
+        w = self.width
+        self.occupied[rows] = EMPTY
+        self.keys[rows] = -1  # Selects the row of conflicts for 'no key'.
+        self.populations[rows] = 0
+        self.is_target[rows] = False
+        self.trail_start[rows] = 0
+        self.trail_len[rows] = 0
+        self.heat[rows] = 0
+        self.period_avg[rows] = np.nan
+        self.since_move[rows] = 0
+        self.score[rows] = 0
+        self.losses[rows] = 0
+        self.alive[rows] = True
+        for y in range(3):
+            for x in range(3):
+                phase = self.coords[
+                    (self.coords[:, 0] % 3 == x) & (self.coords[:, 1] % 3 == y)]
+                self.__shuffle(
+                    np.repeat(rows, len(phase)),
+                    np.tile(phase, (len(rows), 1)))
+
+        # Spawn each character:
+        for character, pos in (
+                (PLAYER, (w // 2, w // 2)), (CHASER, (0, 0)),
+                (NOMMER, (w - 1, w - 1)), (RUNNER, (w - 1, 0))):
+            positions = self.__positions(character)
+            positions[rows] = pos
+            self.__occupy(rows, positions[rows], character)
+        self.timers[:, rows] = np.array([[0.8], [0.15], [0.5]])
+
+        # Generate the first round's targets:
+        for slot in range(self.targets.shape[1]):
+            self.__spawn(rows, slot)
+
+    def step(self, actions):
+        """
+        Advances every living game by one tick. actions holds, for each
+        game, an index into OFFSETS to move the player in that direction,
+        or BACKTRACK. Moves into walls or characters are ignored.
+        Like env.SnaKeyEnv.step, the nommer and runner do not move in
+        the tick that the chaser catches the player.
+        Returns a boolean array of the games that ended this tick.
+        """
+        actions = np.asarray(actions)
+        self.__move_player(actions)
+        self.timers[:, self.alive] -= self.dt
+        self.since_move[self.alive] += self.dt
+        caught = np.zeros(self.batch, dtype=bool)
+        for i, move in enumerate((
+                self.__move_chaser, self.__move_nommer, self.__move_runner)):
+            rows = np.flatnonzero(
+                self.alive & ~caught & (self.timers[i] <= 0))
+            if len(rows):
+                result = move(rows)
+                if i == 0:
+                    caught[rows] = result
+                self.timers[i, rows] += self.__periods(rows)[i]
+        self.alive &= ~caught
+        return caught
+
+    # -- Characters ---------------------------------------------------------
+
+    def __move_player(self, actions):
+        b = np.arange(self.batch)
+        w = self.width
+        src = self.__flat(self.player)
+
+        # Forward moves:
+        step = self.alive & (actions >= 0) & (actions < BACKTRACK)
+        dest = self.player + OFFSETS[np.clip(actions, 0, BACKTRACK - 1)]
+        in_bound = ((dest >= 0) & (dest < w)).all(axis=1)
+        dest = np.clip(dest, 0, w - 1)
+        forward = step & in_bound & (
+            self.occupied[b, dest[:, 1], dest[:, 0]] == EMPTY)
+
+        # Backtracking onto the newest tile of the trail:
+        top = self.trail[b, (self.trail_start + self.trail_len - 1)
+                         % self.trail.shape[1]]
+        back = (self.alive & (actions == BACKTRACK) & (self.trail_len > 0)
+                & (self.occupied.reshape(self.batch, -1)[b, top] == EMPTY))
+        dest[back] = self.coords[top[back]]
+
+        rows = np.flatnonzero(forward | back)
+        if not len(rows):
+            return
+        self.__vacate(rows, self.player[rows])
+        ahead = np.flatnonzero(forward)
+        # Only forward moves count towards the player's speed:
+        period = self.since_move[ahead]
+        average = self.period_avg[ahead]
+        self.period_avg[ahead] = np.where(
+            np.isnan(average), period, average + self.alpha * (period - average))
+        self.since_move[ahead] = 0
+        self.__push_trail(ahead, src[ahead])
+        self.trail_len[back] -= 1
+        self.player[rows] = dest[rows]
+        self.__occupy(rows, dest[rows], PLAYER)
+
+        # Handle scoring if the player touched a target:
+        eaten = ahead[self.is_target[ahead, self.__flat(dest[ahead])]]
+        if len(eaten):
+            self.score[eaten] += 1
+            base = self.num_targets
+            self.heat[eaten] = base * np.sqrt(self.heat[eaten] / base + 1)
+            self.__respawn(eaten, self.__flat(dest[eaten]))
+        self.__trim_tail(ahead)
+
+    def __move_chaser(self, rows):
+        """ Returns whether the chaser caught each player in rows. """
+        target = self.player[rows].copy()
+        has_trail = self.trail_len[rows] > 0
+        if has_trail.any():
+            # Emulate the chaser 'missing' the player when they move fast:
+            # See strategies.DefaultChaser and Game.player_avg_period:
+            average = self.period_avg[rows]
+            since = self.since_move[rows]
+            period = np.where(
+                np.isnan(average), since, average + self.alpha * (since - average))
+            speed = self.__base_speed(rows)
+            miss_weight = 4.0 ** (1 - period * speed / 4.0)
+            miss = has_trail & (
+                self.rng.random(len(rows)) * (1 + miss_weight) > 1)
+            top = self.trail[rows, (self.trail_start[rows]
+                                    + self.trail_len[rows] - 1)
+                             % self.trail.shape[1]]
+            target[miss] = self.coords[top[miss]]
+        self.__vacate(rows, self.chaser[rows])
+        self.chaser[rows] = self.__enemy_step(
+            rows, self.chaser[rows], target, can_touch_player=True)
+        caught = (self.chaser[rows] == self.player[rows]).all(axis=1)
+        free = rows[~caught]
+        self.__occupy(free, self.chaser[free], CHASER)
+        self.occupied[rows[caught], self.chaser[rows[caught], 1],
+                      self.chaser[rows[caught], 0]] = CHASER
+        return caught
+
+    def __move_nommer(self, rows):
+        # Ignore the third of the targets closest to the player,
+        # and head for the remaining target closest to the nommer:
+        positions = self.coords[self.targets[rows]]
+        from_player = np.abs(
+            positions - self.player[rows, None]).max(axis=2)
+        from_nommer = np.abs(
+            positions - self.nommer[rows, None]).max(axis=2)
+        order = np.argsort(from_player, axis=1, kind='stable')
+        order = order[:, order.shape[1] // 3:]
+        closest = np.take_along_axis(from_nommer, order, axis=1).argmin(axis=1)
+        slots = order[np.arange(len(rows)), closest]
+        dest = positions[np.arange(len(rows)), slots]
+
+        self.heat[rows] = np.where(
+            self.heat[rows] - 1 >= 0, self.heat[rows] - 1, self.heat[rows])
+        self.__vacate(rows, self.nommer[rows])
+        self.nommer[rows] = self.__enemy_step(rows, self.nommer[rows], dest)
+        self.__occupy(rows, self.nommer[rows], NOMMER)
+
+        # The nommer may consume targets:
+        flat = self.__flat(self.nommer[rows])
+        eaten = self.is_target[rows, flat]
+        if eaten.any():
+            self.losses[rows[eaten]] += 1
+            self.__trim_tail(rows[eaten])
+            self.__respawn(rows[eaten], flat[eaten])
+
+    def __move_runner(self, rows):
+        w = self.width
+        runner = self.runner[rows]
+        player = self.player[rows]
+        caught = np.abs(runner - player).max(axis=1) <= 1
+        self.losses[rows[caught]] = self.losses[rows[caught]] * 2 // 3
+        target = self.runner_targets(rows)
+
+        self.__vacate(rows, runner)
+        self.runner[rows] = self.__enemy_step(rows, runner, target)
+        self.__occupy(rows, self.runner[rows], RUNNER)
+
+        # Move twice if the player caught the runner
+        # and one move isn't enough to escape again:
+        again = rows[caught & (np.abs(
+            self.runner[rows] - player).max(axis=1) <= 1)]
+        if len(again):
+            self.__vacate(again, self.runner[again])
+            self.runner[again] = self.__enemy_step(
+                again, self.runner[again], target[np.isin(rows, again)])
+            self.__occupy(again, self.runner[again], RUNNER)
+
+    def runner_targets(self, rows):
+        """
+        Returns where the runner of each of rows heads for. Like
+        strategies.DefaultRunner, it follows planner.RunnerPlanner's
+        tables, with some randomness when far from the player.
+        """
+        w = self.width
+        runner = self.runner[rows]
+        player = self.player[rows]
+        far = ((runner - player) ** 2).sum(axis=1) >= (w / 2) ** 2
+
+        # If within safe distance from player,
+        # Avoid the nommer and chase the chaser:
+        from_nommer = runner - self.nommer[rows] + w - 1
+        target = self.chaser[rows] + self.away[
+            from_nommer[:, 1], from_nommer[:, 0]]
+        target[far] += self.rng.integers(-2, 3, size=(far.sum(), 2))
+
+        # Otherwise, run to the escape cached for the cells
+        # of the runner and player, unless they share one:
+        near = ~far
+        r, p = runner[near] // self.cell, player[near] // self.cell
+        target[near] = self.escapes[r[:, 0], r[:, 1], p[:, 0], p[:, 1]]
+        same = np.flatnonzero(near)[(r == p).all(axis=1)]
+        if len(same):
+            target[same] = self.__escape(runner[same], player[same])
+        return target
+
+    def __escape(self, r, p):
+        """
+        Returns the target of runners at r that are near players at p.
+        See planner.RunnerPlanner.escape. The two corners closest
+        to the player are out of the question.
+        """
+        w = self.width
+        d1 = w // 5
+        d2 = w - 1 - d1
+        corners = np.array([(d1, d1), (d2, d1), (d1, d2), (d2, d2)])
+        to_runner = np.linalg.norm(r[:, None] - corners, axis=2)
+        to_player = np.linalg.norm(p[:, None] - corners, axis=2)
+        square = np.abs(p[:, None] - corners).max(axis=2)
+        order = np.lexsort((
+            np.broadcast_to(np.arange(4), square.shape),
+            -to_runner, square), axis=1)[:, 2:]
+        merit = np.take_along_axis(to_runner - to_player, order, axis=1)
+        corner = corners[order[np.arange(len(r)), merit.argmin(axis=1)]]
+        # Bias away from the player if they are close:
+        run = r - p
+        scale = (np.linalg.norm(corner - r, axis=1) ** 2
+                 / np.linalg.norm(run, axis=1)) ** 0.3
+        return corner + np.rint(run * scale[:, None]).astype(int)
+
+    def __enemy_step(self, rows, origin, target, can_touch_player=False):
+        """
+        Returns the positions that the enemies at origin move to
+        when heading for target. See engine.Game.__enemy_diff. The
+        tiles at origin must already be vacated.
+        """
+        w = self.width
+        diff = target - origin
+        distance = np.abs(diff)
+        total = distance.sum(axis=1)
+        axis_percent = np.abs(distance[:, 0] - distance[:, 1]) / np.maximum(total, 1)
+        # Project diagonal moves onto axes:
+        project = self.rng.random(len(rows)) < axis_percent
+        x_major = distance[:, 0] > distance[:, 1]
+        diff[project & x_major, 1] = 0
+        diff[project & ~x_major, 0] = 0
+        diff = np.clip(diff, -1, 1)
+        desired = origin + diff
+
+        # Find moves out of bounds or onto other characters:
+        in_bound = ((desired >= 0) & (desired < w)).all(axis=1)
+        clipped = np.clip(desired, 0, w - 1)
+        # Enemies on their target stay put, like in engine.Game:
+        blocked = ~in_bound | (
+            self.occupied[rows, clipped[:, 1], clipped[:, 0]] != EMPTY)
+        if can_touch_player:
+            blocked &= ~(desired == self.player[rows]).all(axis=1)
+        if not blocked.any():
+            return desired
+
+        # Favor substitutes in similar direction to that desired:
+        sub = np.flatnonzero(blocked)
+        candidates = origin[sub, None] + OFFSETS
+        valid = ((candidates >= 0) & (candidates < w)).all(axis=2)
+        clipped = np.clip(candidates, 0, w - 1)
+        valid &= self.occupied[
+            rows[sub, None], clipped[..., 1], clipped[..., 0]] == EMPTY
+        aim = (origin[sub] + diff[sub] * 2)[:, None]
+        weights = np.where(
+            valid, 4.0 ** -np.abs(aim - candidates).sum(axis=2), 0)
+        choice = self.__weighted_choice(weights)
+        stuck = ~valid.any(axis=1)
+        desired[sub] = np.where(
+            stuck[:, None], origin[sub],
+            candidates[np.arange(len(sub)), choice])
+        return desired
+
+    # -- Board bookkeeping --------------------------------------------------
+
+    def __shuffle(self, rows, positions):
+        """
+        Gives the tiles at positions new keys, favoring keys that are
+        rare in their grid, and never conflicting with the keys of
+        unoccupied tiles in the 5x5 ring around them.
+        """
+        w = self.width
+        ring = positions[:, None] + RING
+        valid = ((ring >= 0) & (ring < w)).all(axis=2)
+        ring = np.clip(ring, 0, w - 1)
+        r = rows[:, None]
+        valid &= self.occupied[r, ring[..., 1], ring[..., 0]] == EMPTY
+        near = np.where(valid, self.keys[r, ring[..., 1], ring[..., 0]],
+                        len(self.language))
+        excluded = np.bitwise_or.reduce(self.packed_conflicts[near], axis=1)
+        excluded = np.unpackbits(
+            excluded.view(np.uint8).reshape(len(rows), -1),
+            axis=1, count=len(self.language)).astype(bool)
+        # Rarely, every key is excluded. Ignore conflicts there:
+        excluded[excluded.all(axis=1)] = False
+
+        populations = self.populations[rows]
+        lowest = np.where(excluded, np.iinfo(np.int32).max,
+                          populations).min(axis=1, keepdims=True)
+        weights = np.where(excluded, 0, 4.0 ** (lowest - populations))
+        keys = self.__weighted_choice(weights)
+        self.keys[rows, positions[:, 1], positions[:, 0]] = keys
+        np.add.at(self.populations, (rows, keys), 1)
+
+    def __occupy(self, rows, positions, character: int):
+        """ Places character on the tiles at positions. """
+        keys = self.keys[rows, positions[:, 1], positions[:, 0]]
+        self.populations[rows, keys] -= 1
+        self.occupied[rows, positions[:, 1], positions[:, 0]] = character
+
+    def __vacate(self, rows, positions):
+        """ Removes the characters at positions and shuffles the tiles. """
+        self.__shuffle(rows, positions)
+        self.occupied[rows, positions[:, 1], positions[:, 0]] = EMPTY
+
+    def __respawn(self, rows, eaten):
+        """ Replaces the target at flat index eaten in each of rows. """
+        slots = (self.targets[rows] == eaten[:, None]).argmax(axis=1)
+        self.is_target[rows, eaten] = False
+        for slot in np.unique(slots):
+            self.__spawn(rows[slots == slot], slot)
+
+    def __spawn(self, rows, slot: int):
+        """
+        Puts a new target into slot for each of rows. Targets favor the
+        center, and tiles near the player and the nommer. See
+        engine.Game.spawn_new_targets.
+        """
+        def bell(origins, radius, peak):
+            return self.bell(self.coords - origins[:, None], radius, peak)
+
+        w = self.width
+        weights = (self.center_bell
+                   + bell(self.player[rows], w / 3, 0.6)
+                   + bell(self.nommer[rows], w / 3, 0.6))
+        weights[self.is_target[rows]] = 0
+        weights[self.occupied[rows].reshape(len(rows), -1) != EMPTY] = 0
+        flat = self.__weighted_choice(weights)
+        self.targets[rows, slot] = flat
+        self.is_target[rows, flat] = True
+
+        # Targets cannot be part of the trail:
+        span = np.arange(self.trail.shape[1])
+        live = ((span - self.trail_start[rows, None]) % self.trail.shape[1]
+                < self.trail_len[rows, None])
+        hits = ((self.trail[rows] == flat[:, None]) & live).any(axis=1)
+        for row, tile in zip(rows[hits], flat[hits]):
+            self.__remove_from_trail(row, tile)
+
+    def __push_trail(self, rows, flat):
+        cap = self.trail.shape[1]
+        full = self.trail_len[rows] == cap
+        self.trail_start[rows[full]] = (self.trail_start[rows[full]] + 1) % cap
+        self.trail_len[rows[full]] -= 1
+        self.trail[rows, (self.trail_start[rows] + self.trail_len[rows]) % cap] = flat
+        self.trail_len[rows] += 1
+
+    def __remove_from_trail(self, row: int, tile: int):
+        cap = self.trail.shape[1]
+        order = (self.trail_start[row] + np.arange(self.trail_len[row])) % cap
+        tiles = list(self.trail[row, order])
+        tiles.remove(tile)
+        self.trail[row, order[:-1]] = tiles
+        self.trail_len[row] -= 1
+
+    def __trim_tail(self, rows):
+        """ See engine.Game.__trim_tail. """
+        net = (self.score[rows] - self.losses[rows]).astype(float)
+        trim = rows[((net < 0) | (self.trail_len[rows]
+                                  > np.maximum(net, 0) ** (3 / 7)))
+                    & (self.trail_len[rows] > 0)]
+        self.trail_start[trim] = (self.trail_start[trim] + 1) % self.trail.shape[1]
+        self.trail_len[trim] -= 1
+
+    # -- Helpers ------------------------------------------------------------
+
+    def __base_speed(self, rows, curve_down: float = 0.0):
+        """ See engine.Game.enemy_base_speed. """
+        obtained = (self.score[rows] + self.losses[rows]).astype(float)
+        obtained **= 1.0 - curve_down
+        high, low = 1.5, 0.35
+        slowness = 25 * (20 ** 2 / TARGET_THINNESS)
+        return (high - low) * (1 - (2 ** -(obtained / slowness) ** 2)) + low
+
+    def __periods(self, rows):
+        """
+        Returns the seconds until the next move of the chaser,
+        nommer and runner of each of rows. See engine.Game.
+        """
+        chaser = 1 / self.__base_speed(rows)
+        nommer = (1 / self.__base_speed(rows, curve_down=0.05)
+                  / (self.heat[rows] / 5 + 1))
+        w = self.width
+        speedup, power = 2.8, 5.5
+        distance = np.abs(self.runner[rows] - self.player[rows]).max(axis=1)
+        urgency = (speedup - 1) / (w ** power) * (w + 1 - distance) ** power + 1
+        return chaser, nommer, 1 / urgency
+
+    @staticmethod
+    def bell(offsets, radius, peak):
+        """ See bell in engine.Game.spawn_new_targets. """
+        dist = np.sqrt((offsets ** 2).sum(axis=-1))
+        return peak * 2 ** -((2 * dist / radius) ** 2)
+
+    def __positions(self, character: int):
+        return {PLAYER: self.player, CHASER: self.chaser,
+                NOMMER: self.nommer, RUNNER: self.runner}[character]
+
+    def __flat(self, positions):
+        return positions[..., 1] * self.width + positions[..., 0]
+
+    def __weighted_choice(self, weights):
+        """
+        Returns, for each row of weights, a column index drawn
+        with probability proportional to its weight.
+        """
+        cumulative = weights.cumsum(axis=1)
+        draw = self.rng.random(len(weights)) * cumulative[:, -1]
+        choice = (cumulative < draw[:, None]).sum(axis=1)
+        return np.minimum(choice, weights.shape[1] - 1)
+
+
+def compare(batch: int = 256, ticks: int = 200, width: int = 20):
+    """
+    Prints how long it takes to simulate batch games for ticks ticks
+    with a BatchGame and with a loop over as many engine.Game objects.
+    Both sides take the same random actions on the same simulated clock.
+    """
+    from random import randrange
+    from time import perf_counter
+    from engine import Game
+    from pair import Pair
+
+    games = BatchGame(batch, width, seed=0)
+    start = perf_counter()
+    for _ in range(ticks):
+        done = games.step(games.rng.integers(0, BACKTRACK + 1, batch))
+        games.reset(done)
+    batched = perf_counter() - start
+
+    looped_games = [Game(width, headless=True) for _ in range(batch)]
+    timers = [[0.8, 0.15, 0.5] for _ in range(batch)]
+    offsets = [Pair(int(x), int(y)) for x, y in OFFSETS]
+    start = perf_counter()
+    for _ in range(ticks):
+        for game, timer in zip(looped_games, timers):
+            action = randrange(BACKTRACK + 1)
+            if action == BACKTRACK:
+                game.move_player('space')
+            else:
+                dest = game.player + offsets[action]
+                for move in game.legal_moves():
+                    if move.tile.pos == dest:
+                        for key in move.keys:
+                            game.move_player(key)
+                        break
+            timer[:] = [t - games.dt for t in timer]
+            if timer[0] <= 0:
+                timer[0] += game.chaser_period()
+                if game.move_chaser():
+                    game.restart()
+                    timer[:] = [0.8, 0.15, 0.5]
+                    continue
+            if timer[1] <= 0:
+                game.move_nommer()
+                timer[1] += game.nommer_period()
+            if timer[2] <= 0:
+                game.move_runner()
+                timer[2] += game.runner_period()
+    looped = perf_counter() - start
+    print(f'{batch} games x {ticks} ticks: batched {batched:.2f} s, '
+          f'looped {looped:.2f} s, {looped / batched:.1f}x faster')
+
+
+if __name__ == '__main__':
+    import sys
+    compare(*map(int, sys.argv[1:]))
@@ -0,0 +1,92 @@
+"""
+Measures how long it takes to start SnaKey from a cold interpreter.
+
+Each case runs in a fresh python process, and is timed from before its
+first import until its game is ready. The median of several runs must
+stay under the case's budget, or this script exits with status 1.
+Headless cases also fail if they import tkinter. The window case is
+timed until the window is first drawn, and skipped without a display.
+It has no budget yet, as it has not been measured on enough displays
+to pick one, so it is only reported.
+
+Run with: python bench_startup.py [runs]
+"""
+import json
+import subprocess
+import sys
+from statistics import median
+
+
+# name: (setup code, budget in milliseconds or None to only report,
+#        whether tkinter is allowed)
+CASES = {
+    'import engine': (
+        'import engine',
+        30, False),
+    'headless game 20x20': (
+        'import engine\n'
+        'engine.Game(20, headless=True)',
+        60, False),
+    'headless game 20x20 hiragana': (
+        'import engine\n'
+        'engine.Game(20, "japanese hiragana", headless=True)',
+        60, False),
+    'snapshot restore 20x20': (
+        'import engine\n'
+        'engine.Game(20, headless=True).load(SNAPSHOT)',
+        60, False),
+    'window 20x20': (
+        'import game\n'
+        'gui = game.SnaKeyGUI(20)\n'
+        'gui.update_idletasks()',
+        None, True),
+}
+
+TIMER = '''
+import sys, time
+start = time.perf_counter()
+SNAPSHOT = bytes.fromhex(sys.argv[1])
+{setup}
+end = time.perf_counter()
+print(__import__('json').dumps([end - start, 'tkinter' in sys.modules]))
+'''
+
+
+def run(setup: str, snapshot: bytes):
+    """
+    Returns the seconds taken by setup, and whether tkinter was
+    imported, or None if setup needs a display and there is none.
+    """
+    process = subprocess.run(
+        [sys.executable, '-c', TIMER.format(setup=setup), snapshot.hex()],
+        capture_output=True, text=True)
+    if process.returncode and 'TclError' in process.stderr \
+            and 'display' in process.stderr:
+        return None
+    process.check_returncode()
+    return json.loads(process.stdout)
+
+
+def main(runs: int = 7):
+    from engine import Game
+    snapshot = Game(20, headless=True).save()
+    failed = False
+    for name, (setup, budget, tk_allowed) in CASES.items():
+        results = [run(setup, snapshot) for _ in range(runs)]
+        if None in results:
+            print(f'{name:<32}  skipped: no display')
+            continue
+        ms = median(seconds for seconds, _ in results) * 1000
+        used_tk = any(tk for _, tk in results)
+        ok = (budget is None or ms <= budget) \
+            and (tk_allowed or not used_tk)
+        failed |= not ok
+        print(f'{name:<32}{ms:8.2f} ms  '
+              f'{"(no budget)" if budget is None else f"(budget {budget} ms)"}'
+              f'{"  imported tkinter" if used_tk else ""}'
+              f'{"" if ok else "  FAILED"}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*map(int, sys.argv[1:])))
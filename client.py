@@ -0,0 +1,151 @@
+"""
+A local test client for server.py.
+
+Keeps a mirror of a room's board up to date from the server's
+deltas. Interactively, each line typed into the terminal is sent as
+keysyms (one per character, ' ' as 'space') and the board is printed
+after each message. With --bots N, N clients join the room and
+type random adjacent keys, which is useful for load-testing a server.
+
+Run with: python client.py [room] [--bots N] [--port PORT]
+"""
+import asyncio
+import json
+from random import choice, random
+
+
+class Mirror:
+    """
+    A client-side copy of a room's board.
+
+    Attributes:
+    -- width        : int               : See Game.width.
+    -- language     : dict{str: str}    : See Game.language.
+    -- keys         : list{str}         : The key of each tile in row-order.
+    -- enemies      : list{int}         : [chaser x, y, nommer x, y, runner x, y].
+    -- players      : list{list}        : [[seat id, x, y, score], ...].
+    -- trails       : dict{int: list}   : Map from seat ids to the grid indices
+                                          of their trails.
+    -- targets      : list{int}         : Grid indices of targets.
+    -- losses       : int               : See Game.losses.
+    """
+    def __init__(self, board: dict):
+        self.width = board['w']
+        self.language = board['l']
+        self.keys = board['k']
+        self.enemies = []
+        self.players = []
+        self.trails = {}
+        self.targets = []
+        self.losses = 0
+
+    def apply(self, delta: dict):
+        """ Applies a delta message from the server. """
+        for i, key in delta.get('k', ()):
+            self.keys[i] = key
+        self.enemies = delta.get('e', self.enemies)
+        for seat_id, drop, keep, added in delta.get('r', ()):
+            trail = self.trails.get(seat_id, [])
+            self.trails[seat_id] = trail[drop:drop + keep] + added
+        if 'p' in delta:
+            self.players = delta['p']
+            seats = {p[0] for p in self.players}
+            self.trails = {
+                seat_id: trail for seat_id, trail in self.trails.items()
+                if seat_id in seats}
+        self.targets = delta.get('g', self.targets)
+        self.losses = delta.get('s', self.losses)
+
+    def adjacent_keys(self, x: int, y: int):
+        """
+        Returns the typing keys of the tiles around (x, y)
+        that do not hold characters.
+        """
+        keys = []
+        for dy in range(-1, 2):
+            for dx in range(-1, 2):
+                if 0 <= x+dx < self.width and 0 <= y+dy < self.width:
+                    key = self.keys[(y+dy) * self.width + x+dx]
+                    if key in self.language:
+                        keys.append(self.language[key])
+        return keys
+
+    def __str__(self):
+        rows = [' '.join(
+            f'{key:>2}' for key in self.keys[y*self.width:(y+1)*self.width])
+            for y in range(self.width)]
+        scores = ' '.join(f'#{p[0]}:{p[3]}' for p in self.players)
+        rows.append(f'scores: {scores}  losses: {self.losses}')
+        return '\n'.join(rows)
+
+
+async def connect(room: str, host: str, port: int):
+    """
+    Joins a room. Returns the stream reader and
+    writer, and a Mirror of the room's board.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(room.encode() + b'\n')
+    board = json.loads(await reader.readline())
+    mirror = Mirror(board)
+    mirror.apply(json.loads(await reader.readline()))
+    return reader, writer, mirror
+
+
+async def listen(reader, mirror: Mirror, show: bool = False):
+    """ Applies deltas to mirror until the server hangs up. """
+    async for line in reader:
+        mirror.apply(json.loads(line))
+        if show:
+            print(mirror, end='\n\n')
+
+
+async def play(room: str, host: str, port: int):
+    """ Sends lines typed in the terminal as keysyms. """
+    reader, writer, mirror = await connect(room, host, port)
+    print(mirror)
+    asyncio.ensure_future(listen(reader, mirror, show=True))
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, input)
+        for char in line:
+            writer.write(b'space\n' if char == ' ' else char.encode() + b'\n')
+
+
+async def bot(room: str, host: str, port: int, rate: float = 5.0):
+    """
+    Types random keys of adjacent tiles about rate times
+    a second, and backtracks now and then.
+    """
+    reader, writer, mirror = await connect(room, host, port)
+    seat_id = mirror.players[-1][0]
+    asyncio.ensure_future(listen(reader, mirror))
+    while not reader.at_eof():
+        await asyncio.sleep(1 / rate)
+        me = [p for p in mirror.players if p[0] == seat_id]
+        keys = me and mirror.adjacent_keys(me[0][1], me[0][2])
+        if not keys or random() < 0.05:
+            writer.write(b'space\n')
+            continue
+        for char in choice(keys):
+            writer.write(char.encode() + b'\n')
+        await writer.drain()
+
+
+async def bots(count: int, room: str, host: str, port: int):
+    """ Runs count bots in the same room. """
+    await asyncio.gather(*[bot(room, host, port) for _ in range(count)])
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('room', nargs='?', default='lobby')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--bots', type=int, default=0)
+    args = parser.parse_args()
+    if args.bots:
+        asyncio.run(bots(args.bots, args.room, args.host, args.port))
+    else:
+        asyncio.run(play(args.room, args.host, args.port))
@@ -1,3 +1,10 @@
+"""
+Color schemes of the GUI, keyed by name. Each maps the roles of tiles
+(and 'lines', between tiles) to their tk background and text colors.
+"""
+from functools import lru_cache
+
+
 color_schemes = {
     'dark - nw': {
         'lines':    {'bg': '#3f5e77', },
@@ -50,3 +57,25 @@ color_schemes = {
         'runner':   {'bg': '#63beff',   'fg': 'black'},
         },
 }
+
+# Roles that a tile can have. See worker.Driver.role:
+ROLES = ('tile', 'target', 'player', 'trail', 'chaser', 'nommer', 'runner')
+# The ttk style that every tile's style derives from:
+TILE_STYLE = 'Tile.TLabel'
+
+
+def style_name(role: str):
+    """ Returns the name of the ttk style of tiles with role. """
+    return f'{role}.{TILE_STYLE}'
+
+
+@lru_cache(maxsize=None)
+def compiled_scheme(name: str):
+    """
+    Returns (style name, background, foreground) for each role in
+    a color scheme, ready for ttk.Style.configure. Built once per scheme.
+    """
+    scheme = color_schemes[name]
+    return tuple(
+        (style_name(role), scheme[role]['bg'], scheme[role]['fg'])
+        for role in ROLES)
@@ -0,0 +1,1027 @@
+"""
+The game's rules and state, independent of any display.
+
+Importing this module does not import tkinter. Only
+a Game that is not headless imports it, on construction.
+"""
+from array import array
+from collections import namedtuple
+from itertools import accumulate
+from random import choices, random
+from struct import Struct
+from time import time
+
+import events
+from pair import *
+from languages import LANGUAGES, conflicts, typing
+from lookahead import Lookahead
+from populations import Populations
+from stats import Difficulty, MoveStats
+from strategies import ENEMIES, strategy
+
+
+# Most target tiles to draw ahead of time. See Game.prepare_spawns():
+SPAWN_BUFFER = 8
+
+SNAPSHOT_MAGIC = b'SNKY'
+SNAPSHOT_VERSION = 2
+# magic, version, width, flags, score, losses, heat, seconds since the
+# last player move, then the grid indices of the player, chaser,
+# nommer and runner:
+SNAPSHOT_HEADER = Struct('<4sBHBiiddHHHH')
+
+
+class Var:
+    """
+    A headless stand-in for tk variables so that a Game
+    can run without a Tk root (ie. on a server or in tools).
+    Supports the subset of the tk.Variable interface used here.
+    """
+    def __init__(self, value=None):
+        self.value = value
+        self.callbacks = []
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+        for callback in self.callbacks:
+            callback(self, '', 'write')
+
+    def trace_add(self, mode: str, callback):
+        """ Only the 'write' mode is supported. """
+        if mode != 'write':
+            raise ValueError(mode)
+        self.callbacks.append(callback)
+        return callback
+
+
+class Tile:
+    """
+
+    """
+    def __init__(self, pos: Pair, key: str = '', var_type=Var):
+        self.pos = pos
+        self.key = var_type()
+        self.key.set(key)
+        self.label = None
+
+    def color(self, cs: dict):
+        """ cs follows {'bg': _, 'text': _} """
+        self.label.configure(cs)
+
+    def __repr__(self):
+        return f'{self.key.get()}:{self.pos}'
+
+
+# A move the player can make. keys are the keysyms to pass to
+# Game.move_player, in order, to move the player onto tile:
+LegalMove = namedtuple('LegalMove', 'tile keys')
+
+
+def weighted_choice(weights: dict):
+    """
+    Returns a key from the weights dict.
+    Favors keys with greater value mappings
+
+    Values in weights must be ints or floats.
+    weights must not be empty.
+    """
+    from random import uniform
+    w_choice = uniform(0, sum(weights.values()))
+    for key, weight in weights.items():
+        if w_choice > weight:
+            w_choice -= weight
+        else:
+            return key
+    raise ArithmeticError('This should not happen.')
+
+
+class Game:
+    """
+    Attributes:
+    CORE ATTRIBUTES -------------------------------------------------------------------------------
+    -- width        : int               : The length of both the grid's sides in tiles.
+    -- language     : dict{str: str}    : Map from display keys to their alphabet strings.
+    -- lang_name    : str               : The name of language, the language in play.
+                                          lang_choice may differ until the next restart.
+    -- populations  : Populations       : Map from all display keys to their #occurances in the grid.
+                                          The sum of the values should always be width ** 2
+                                          minus the number of tiles under characters.
+    -- conflicts    : dict{str: set}    : Map from display keys to those that cannot be near them.
+    -- typing       : Typing            : The language's typing keys and their prefixes.
+    -- grid         : list{Tile}        : Row-order. Index 0 is at the top left of the screen.
+    -- num_targets  : int               : Number of targets to maintain on the grid.
+    -- spawns       : list{Tile}        : Tiles drawn ahead of time to become targets,
+                                          oldest first. See prepare_spawns().
+    -- key_bias     : dict{str: float}  : Chance in (0, 1] that a shuffled tile keeps
+                                          each display key, or None. Favors weak keys.
+
+    GAME-PLAY OPTIONS -----------------------------------------------------------------------------
+    -- lang_choice  : StringVar         : The language to use for the next game.
+    -- kick_start   : BooleanVar        : Whether to start a new game with some losses.
+    -- adaptive     : BooleanVar        : Whether enemy frequencies adapt to the player's speed.
+
+    -- sad_mode     : BooleanVar        : Makes the faces sad. Purely aesthetic.
+
+    PLAYER POSITION DATA --------------------------------------------------------------------------
+    -- targets      : list{Tile}        : tiles containing the target letter for a round.
+    -- move_str     : str               : keys the user has recently pressed, which may map to a
+                    :                   : display key in self.language. Shorter than the longest
+                    :                   : typing key.
+    -- player       : Pair              : The player's current position.
+    -- trail        : list{Tile}        : tiles the player has visited in a round.
+    -- moves        : MoveStats         : periods of the player's moves in seconds.
+    -- misses       : int               : keys pressed since the last move that could
+                    :                   : not have led to one.
+    -- time_start   : float             : start time since epoch of last move in seconds.
+    -- neighborhood : tuple             : The cache of legal_moves(), or None. Holds
+                                          where it was made, a map from the typing
+                                          sequences of adjacent tiles to them, their
+                                          LegalMoves, and the proper prefixes of
+                                          those sequences.
+
+    SCORING & OPPONENTS ---------------------------------------------------------------------------
+    -- chaser       : Pair              : The position of an enemy chaser.
+    -- nommer       : Pair              : Competes with player to eat targets.
+    -- heat         : int               : Burst level triggered when player touches target.
+    -- runner       : Pair              : Runs away from player.
+    -- score        : tk.IntVar         : number of targets reached by player.
+    -- difficulty   : Difficulty        : Adapts enemy frequencies if adaptive is set.
+                                          Kept between games.
+    -- losses       : tk.IntVar         : number of targets reached by nommer.
+    -- strategies   : dict{str: Strategy}: Map from enemies to what decides their moves.
+                                          Kept between games. See set_strategy().
+
+    OBSERVERS -------------------------------------------------------------------------------------
+    -- observers    : dict{type: list}  : Map from event types to callbacks. See subscribe().
+    -- generation   : int               : Counts changes to the keys of tiles, so
+                                          that Lookaheads can tell they are stale.
+    """
+    target_thinness = 72
+    faces = {
+        'chaser': ':>',
+        'player': ':|',
+        'nommer': ':O',
+        'runner': ':D',
+    }
+
+    def __init__(self, width: int, lang_choice: str = 'english lower',
+                 headless: bool = False):
+        """
+        Keyset MUST have more than 20 unique keys that are
+        recognized as part of tk.Event.keysym
+
+        A headless game uses plain Vars instead of tk
+        variables, and does not require a Tk root.
+        """
+        self.headless = headless
+        self.observers = {}
+        self.generation = 0
+
+        # Create grid:
+        self.width = width
+        self.grid = []
+        for y in range(width):
+            self.grid.extend(
+                [Tile(Pair(x, y), var_type=self.__var_type('StringVar'))
+                 for x in range(width)])
+        self.num_targets = (self.width ** 2) / Game.target_thinness
+        self.key_bias = None
+
+        # Initialize game-play options:
+        self.lang_choice = self.__var_type('StringVar')()
+        self.lang_choice.set(lang_choice)
+        self.__setup_options()
+
+        # Initialize fields - See restart():
+        self.language:      dict = None
+        self.lang_name:      str = None
+        self.populations:   dict = None
+        self.conflicts:     dict = None
+        self.typing:       tuple = None
+        self.targets:       list = None
+        self.spawns:        list = None
+        self.move_str:       str = None
+        self.player:        Pair = None
+        self.trail:         list = None
+        self.time_start:   float = None
+        self.neighborhood: tuple = None
+        self.moves:    MoveStats = None
+        self.misses:         int = None
+        self.chaser:        Pair = None
+        self.nommer:        Pair = None
+        self.heat:           int = None
+        self.runner:        Pair = None
+        self.score = self.__var_type('IntVar')()
+        self.losses = self.__var_type('IntVar')()
+        self.difficulty = Difficulty()
+        self.strategies = {c: strategy(c) for c in ENEMIES}
+        self.restart()
+
+    def __var_type(self, name: str):
+        """
+        Returns the tk variable type with the
+        given name, or Var if this game is headless.
+        """
+        if self.headless:
+            return Var
+        import tkinter as tk
+        return getattr(tk, name)
+
+    def subscribe(self, callback, *event_types):
+        """
+        Calls callback with every event of the given
+        types from the events module emitted by this game.
+        """
+        for event_type in event_types:
+            self.observers.setdefault(event_type, []).append(callback)
+
+    def unsubscribe(self, callback):
+        for callbacks in self.observers.values():
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def emit(self, event):
+        for callback in self.observers.get(type(event), ()):
+            callback(event)
+
+    def __set_key(self, tile: Tile, key: str):
+        tile.key.set(key)
+        self.generation += 1
+        if self.neighborhood is not None:
+            center = self.neighborhood[0]
+            if abs(tile.pos.x - center.x) <= 1 and abs(tile.pos.y - center.y) <= 1:
+                self.neighborhood = None
+        self.emit(events.KeyChanged(tile, key))
+
+    def __set_score(self, score: int = None, losses: int = None):
+        if score is not None:
+            self.score.set(score)
+        if losses is not None:
+            self.losses.set(losses)
+        self.emit(events.ScoreChanged(self.score.get(), self.losses.get()))
+
+    def __setup_options(self):
+        """
+        Initialize options fields
+        for the menu-bar in the GUI.
+        """
+        self.kick_start = self.__var_type('BooleanVar')()
+        self.kick_start.set(False)
+
+        self.sad_mode = self.__var_type('BooleanVar')()
+        self.sad_mode.set(False)
+
+        self.adaptive = self.__var_type('BooleanVar')()
+        self.adaptive.set(False)
+
+    def restart(self):
+        """
+        Re-initializes all non-option aspects of the game.
+        Assumes the keys of the board are all generated.
+        Observers only receive a Reset event.
+        """
+        observers, self.observers = self.observers, {}
+        self.generation += 1
+        self.score.set(0)
+        self.losses.set(0 if not self.kick_start.get() else 120)
+
+        # initialize letters with random, balanced keys:
+        self.lang_name = self.lang_choice.get()
+        self.language = LANGUAGES[self.lang_name].copy()
+        self.conflicts = conflicts(self.lang_name)
+        self.typing = typing(self.lang_name)
+        self.populations = Populations.fromkeys(self.language, 0)
+        for tile in self.grid:
+            self.__shuffle_tile(tile)
+
+        # Set spawn points:
+        self.targets = []
+        self.move_str = ''
+        self.player = Pair(self.width // 2, self.width // 2)
+        self.trail = []
+        self.time_start = self.clock()
+        self.moves = MoveStats()
+        self.misses = 0
+        self.chaser = Pair(0, 0)
+        self.nommer = Pair(self.width-1, self.width-1)
+        self.heat = 0
+        self.runner = Pair(self.width-1, 0)
+
+        # 'Clear' the location for the player:
+        self.populations[self.player_tile().key.get()] -= 1
+        self.populations[self.chaser_tile().key.get()] -= 1
+        self.populations[self.nommer_tile().key.get()] -= 1
+        self.populations[self.runner_tile().key.get()] -= 1
+
+        # Spawn each character:
+        self.player_tile().key.set(self.__get_face_key('player'))
+        self.chaser_tile().key.set(self.__get_face_key('chaser'))
+        self.nommer_tile().key.set(self.__get_face_key('nommer'))
+        self.runner_tile().key.set(self.__get_face_key('runner'))
+
+        # Generate the first round's targets:
+        self.neighborhood = None
+        self.spawns = []
+        self.spawn_new_targets()
+        self.observers = observers
+        self.emit(events.Reset())
+
+    def __trim_tail(self):
+        """
+        Controls the formula for the length of the trail.
+        """
+        net = self.score.get() - self.losses.get()
+        if net < 0 or len(self.trail) > net**(3 / 7):
+            if self.trail:
+                self.emit(events.TrailPopped(self.trail.pop(0)))
+
+    def __shuffle_tile(self, tile: Tile):
+        """
+        Randomizes the parameter tile's key,
+        favoring less-common keys in the current grid.
+
+        Does not make required changes to populations
+        based on the key of the tile being shuffled.
+        These changes should be handled externally.
+        """
+        def __wide_adjacent(origin: Tile):
+            """
+            Return a set of keys in the 5x5 ring around tile.
+            Display keys conflicting with these cannot go in
+            tile, since they would create an ambiguity in
+            movement direction.
+            """
+            x0, y0 = origin.pos.x, origin.pos.y
+            width = self.width
+            adjacent = set()
+            for y in range(max(y0-2, 0), min(y0+3, width)):
+                for x in range(max(x0-2, 0), min(x0+3, width)):
+                    if x != x0 or y != y0:  # Skip the current position.
+                        adjacent.add(self.grid[width * y + x].key.get())
+            return adjacent
+
+        conflicts = self.conflicts
+        excluded = set().union(*[
+            conflicts[key] for key in __wide_adjacent(tile)
+            if key in conflicts])
+        new_key = self.populations.balanced_choice(excluded)
+        if self.key_bias:
+            # Redraw keys by their chance of being kept:
+            while random() >= self.key_bias.get(new_key, 1.0):
+                new_key = self.populations.balanced_choice(excluded)
+        self.__set_key(tile, new_key)
+        self.populations[new_key] += 1
+
+    def move_player(self, key: str, now: float = None):
+        """
+        If the key parameter matches one of the adjacent
+        tiles' keys, the player moves to that tile's position.
+        The tile being moved out of is added to trail.
+        now is when the key was pressed, in seconds since
+        the epoch. It defaults to the current time. See clock().
+
+        Built into the fact that the chaser and nommer keys are
+        not single characters, the player cannot move onto them.
+
+        Returns whether the player completed a round with this move.
+        """
+        # The player wants to backtrack:
+        if key == 'space':
+            # Fail if trail is empty or is choked by enemy.
+            if not self.trail or self.is_character(self.trail[-1]):
+                return
+            src = self.player_tile()
+            self.__shuffle_tile(src)
+            popped = self.trail.pop(-1)
+            self.emit(events.TrailPopped(popped))
+            self.player = popped.pos
+            self.populations[popped.key.get()] -= 1
+            self.__set_key(popped, self.__get_face_key('player'))
+            self.emit(events.CharacterMoved('player', src, popped))
+            return
+
+        self.move_str += key
+        sequences = self.__neighbors()
+        starts = self.neighborhood[3]
+        # The adjacent tile whose typing sequence ends move_str.
+        # Conflicting sequences are never adjacent, so there is
+        # at most one, whatever the size of the language:
+        dest = None
+        move_str = self.move_str
+        for length in range(1, min(len(move_str), self.typing.longest) + 1):
+            dest = sequences.get(move_str[-length:])
+            if dest is not None:
+                break
+
+        # If the user pressed a key
+        # corresponding to an adjacent tile:
+        round_over = False
+        if dest is not None:
+            self.move_str = ''
+            if now is None:
+                now = self.clock()
+            period = now - self.time_start
+            self.moves.add(period)
+            self.time_start = now
+            if self.adaptive.get():
+                self.difficulty.update(self.moves.average.value)
+            src = self.player_tile()
+            self.__shuffle_tile(src)
+            self.trail.append(src)
+            self.emit(events.TrailPushed(src))
+            self.player = dest.pos
+            dest_key = dest.key.get()
+            self.populations[dest_key] -= 1
+            self.__set_key(dest, self.__get_face_key('player'))
+            self.emit(events.CharacterMoved('player', src, dest))
+            self.emit(events.KeyTyped(dest_key, period, self.misses))
+            self.misses = 0
+
+            # Handle scoring if player touched a target:
+            if dest in self.targets:
+                self.targets.remove(dest)
+                self.emit(events.TargetEaten(dest, 'player'))
+                self.__set_score(score=self.score.get() + 1)
+                base = self.num_targets
+                self.heat = base * sqrt(self.heat / base + 1)
+                round_over = self.spawn_new_targets()
+            self.__trim_tail()
+
+        else:
+            # A single character that does not start the
+            # sequence of any adjacent key is a miss:
+            if len(key) == 1 and not any(
+                    move_str[-length:] in starts
+                    for length in range(1, self.typing.longest)):
+                self.misses += 1
+            # Only the end of move_str can start a sequence:
+            self.move_str = move_str[
+                max(len(move_str) + 1 - self.typing.longest, 0):]
+
+        return round_over
+
+    def move_chaser(self):
+        """
+        Moves the chaser closer to the player.
+        Returns True if the chaser is on the player.
+        """
+        target = self.strategies['chaser'].decide(self)
+        src = self.chaser_tile()
+        self.chaser += self.__enemy_diff(
+            self.chaser,
+            target=target,
+            can_touch_player=True)
+        key_var = self.chaser_tile().key
+        if key_var.get() != self.__get_face_key('player'):
+            # If the chaser did not land on the player:
+            self.populations[key_var.get()] -= 1
+        self.__set_key(self.chaser_tile(), self.__get_face_key('chaser'))
+        self.emit(events.CharacterMoved('chaser', src, self.chaser_tile()))
+        return self.chaser == self.player
+
+    def move_nommer(self):
+        """
+        Moves the nommer toward the target its strategy decides on.
+        Decreases the heat if > 1.
+        """
+        dest = self.strategies['nommer'].decide(self)
+
+        # Execute the move:
+        if self.heat - 1 >= 0:
+            self.heat -= 1
+        src = self.nommer_tile()
+        self.nommer += self.__enemy_diff(
+            origin=self.nommer,
+            target=dest,
+            can_touch_player=False
+        )
+        dest = self.nommer_tile()
+        self.populations[dest.key.get()] -= 1
+        self.__set_key(dest, self.__get_face_key('nommer'))
+        self.emit(events.CharacterMoved('nommer', src, dest))
+        # Nommer may consume targets:
+        if dest in self.targets:
+            self.targets.remove(dest)
+            self.emit(events.TargetEaten(dest, 'nommer'))
+            self.__set_score(losses=self.losses.get() + 1)
+            self.__trim_tail()
+        return self.spawn_new_targets()
+
+    def move_runner(self):
+        """
+        Just tries to run away from the player.
+        If the player catches it, their losses
+        due to the nommer will be halved.
+        """
+        # Check if the player caught up to the runner:
+        was_caught = False
+        if (self.player - self.runner).square_norm() <= 1:
+            was_caught = True
+            self.__set_score(losses=self.losses.get() * 2 // 3)
+
+        target = self.strategies['runner'].decide(self)
+
+        # Cleanup and execute the move:
+        src = self.runner_tile()
+        self.runner += self.__enemy_diff(
+            origin=self.runner,
+            target=target,
+            can_touch_player=False
+        )
+        # Move twice if the player caught the runner
+        # and one move isn't enough to escape again:
+        if was_caught and (self.player - self.runner).square_norm() <= 1:
+            # The tile passed through is shuffled, so uncount its key:
+            self.populations[self.runner_tile().key.get()] -= 1
+            self.runner += self.__enemy_diff(
+                origin=self.runner,
+                target=target,
+                can_touch_player=False
+            )
+        dest = self.runner_tile()
+        self.populations[dest.key.get()] -= 1
+        self.__set_key(dest, self.__get_face_key('runner'))
+        self.emit(events.CharacterMoved('runner', src, dest))
+
+    def spawn_new_targets(self):
+        """
+        Should be called at the end of every move by
+        characters which can consume targets.
+        Spawns more targets if necessary and returns
+        those newly spawned in a list.
+
+        Targets try to spawn spread out and not too
+        close to the player or the nommer.
+
+        Tiles drawn ahead of time by prepare_spawns() are used
+        first, so that eating a target does not need a pass over
+        the grid. The grid is only weighed when they run out.
+        """
+        # Get an appropriate number
+        # of random keys for targets:
+        new_targets = []
+        while len(self.targets) < self.num_targets:
+            target = self.__take_spawn()
+            if target is None:
+                # Use the generated weights to get a new target:
+                target = weighted_choice(self.__spawn_weights())
+            if target not in self.targets and not self.is_character(target):
+                self.targets.append(target)
+                new_targets.append(target)
+                self.emit(events.TargetSpawned(target))
+                if target in self.trail:
+                    self.trail.remove(target)
+                    self.emit(events.TrailPopped(target))
+        return new_targets
+
+    def __spawn_weights(self):
+        """
+        Returns a map from the tiles that can become targets
+        to their weights. Favors tiles near the center, and
+        those near the player or the nommer.
+        """
+        def bell(p1: Pair, p2: Pair, radius, lip=1.0, peak=0.0):
+            dist = (p1 - p2).norm()
+            return (peak-lip) * 2 ** -((2*dist/radius)**2) + lip
+
+        # Favor tiles with few targets nearby:
+        available = list(filter(
+            lambda tile: tile not in self.targets and
+            not self.is_character(tile), self.grid))
+        weights = dict.fromkeys(available, 0.0)
+
+        center = Pair(self.width//2, self.width//2)
+        for t in weights:
+            # Slight bias towards the center:
+            weights[t]  = bell(center,    t.pos, 0.8*self.width, lip=0, peak=1)
+            weights[t] += bell(self.player, t.pos, self.width/3, lip=0, peak=0.6)
+            weights[t] += bell(self.nommer, t.pos, self.width/3, lip=0, peak=0.6)
+        return weights
+
+    def prepare_spawns(self, count: int = SPAWN_BUFFER):
+        """
+        Draws tiles to become targets ahead of time, until count are
+        waiting, in one pass over the grid. Meant to be called when
+        nothing else is happening, ie. in Tk idle time or on a worker.
+        Returns the number of tiles drawn.
+
+        Tiles are weighed by where the player and nommer are now,
+        which is a few moves before the tiles are used.
+        """
+        needed = count - len(self.spawns)
+        if needed <= 0:
+            return 0
+        weights = self.__spawn_weights()
+        if not weights:
+            return 0
+        self.spawns.extend(choices(
+            list(weights), cum_weights=list(accumulate(weights.values())),
+            k=needed))
+        return needed
+
+    def __take_spawn(self):
+        """
+        Returns the oldest tile drawn by prepare_spawns() that
+        can still become a target, or None if there is none.
+        """
+        spawns = self.spawns
+        while spawns:
+            tile = spawns.pop(0)
+            if tile not in self.targets and not self.is_character(tile):
+                return tile
+        return None
+
+    def __neighbors(self):
+        """
+        Returns a map from the typing sequences of the tiles the player
+        can move onto to those tiles. Made in one pass over the tiles
+        around the player, and cached until one of them changes.
+        """
+        if self.neighborhood is None or self.neighborhood[0] != self.player:
+            sequences = {}
+            for tile in self.__adjacent(self.player):
+                key = tile.key.get()
+                if key in self.language:
+                    sequences[self.language[key]] = tile
+            moves = tuple(LegalMove(tile, tuple(sequence))
+                          for sequence, tile in sequences.items())
+            prefixes = self.typing.prefixes
+            starts = frozenset(
+                start for sequence in sequences
+                for start in prefixes[sequence])
+            self.neighborhood = (
+                Pair(self.player.x, self.player.y), sequences, moves, starts)
+        return self.neighborhood[1]
+
+    def legal_moves(self):
+        """
+        Returns a tuple of the LegalMoves the player can make: one for
+        each adjacent tile without a character, and then one for
+        backtracking, if the player can. Cached like move_player()'s.
+        """
+        self.__neighbors()
+        moves = self.neighborhood[2]
+        if self.trail and not self.is_character(self.trail[-1]):
+            return moves + (LegalMove(self.trail[-1], ('space',)),)
+        return moves
+
+    def __adjacent(self, pos: Pair):
+        """
+        Returns a list of tiles adjacent to, and on
+        top of pos, in row-order. The order is fixed
+        so that a seeded game always plays the same.
+        """
+        adj = []
+        for y in range(-1, 2):
+            for x in range(-1, 2):
+                tile = self.tile_at(pos+Pair(x, y))
+                if tile is not None:
+                    adj.append(tile)
+        return adj
+
+    @staticmethod
+    def __enemy_diff_ceil(origin: Pair, target: Pair):
+        """
+        Returns a valid offset in the direction
+        from origin to target. All enemy moves
+        should pass through this function before
+        being applied.
+
+        Applies the following changes when necessary:
+        -- projecting enemy diagonal moves onto axes.
+        -- avoiding landing other enemies and the player.
+        """
+        if target == origin:
+            return Pair(0, 0)
+        
+        diff = abs(target - origin)
+        axis_percent = abs(diff.x-diff.y) / (diff.x+diff.y)
+        diff = target - origin
+        if weighted_choice({
+                True: axis_percent,
+                False: 1 - axis_percent}):
+            if abs(diff.x) > abs(diff.y):
+                diff.y = 0
+            else:
+                diff.x = 0
+        return diff.ceil(radius=1)
+
+    def __enemy_diff(self, origin: Pair, target: Pair,
+                     can_touch_player: bool = False):
+        """
+        target is the position of the tile targeted by
+        the enemy at origin. Automatically shuffles the
+        tile in the enemy's original position.
+
+        Assumes that the enemy at origin
+        currently has no position on the grid.
+        """
+        # Automatically shuffle the tile that
+        # The enemy will leave behind:
+        self.__shuffle_tile(self.tile_at(origin))
+
+        # Get the offset in the direction of target:
+        diff = self.__enemy_diff_ceil(origin, target)
+
+        # Allow enemies like the chaser to touch the player:
+        if can_touch_player and origin+diff == self.player:
+            return diff
+
+        # If the enemy would go out of bounds,
+        # or touch another enemy or the player illegally:
+        desired = self.tile_at(origin+diff)
+        if desired is None or self.is_character(desired):
+            # Find all possible substitutes:
+            adj = list(filter(
+                lambda t: not self.is_character(t),
+                self.__adjacent(origin)))
+            # Favor substitutes in similar direction to that desired:
+            weights = {
+                t: 4**-(origin + diff*2 - t.pos).linear_norm()
+                for t in adj if t.pos != origin}
+            popped = weighted_choice(weights)
+            return popped.pos - origin
+
+        # Everything is fine:
+        else:
+            return diff
+
+    def enemy_base_speed(self, curve_down: float = 0.0):
+        """
+        Returns a speed in tiles per second.
+        Uses an upside-down bell-curve shape
+        as a function of the sum of the absolutes
+        of the the player's score and losses.
+
+        curve_down is in the range[0, 1).
+        compresses the effect of the independant
+        variable by using fractional powers.
+        """
+        obtained = self.score.get() + self.losses.get()
+        obtained **= 1.0 - curve_down
+
+        high = 1.5  # Tiles per second
+        low = 0.35  # Tiles per second
+        slowness = 25 * (20 ** 2 / Game.target_thinness)  # self.num_targets
+        return (high-low) * (1-(2**-(obtained/slowness)**2)) + low
+
+    def chaser_period(self):
+        """
+        Returns the number of seconds until the chaser's next move.
+        """
+        return 1 / self.enemy_base_speed() / self.frequency_scale()
+
+    def nommer_period(self):
+        """
+        Returns the number of seconds until the nommer's next move.
+        The nommer gains a short speed burst when
+        the player reaches targets.
+        """
+        burst = self.heat / 5 + 1
+        return (1 / self.enemy_base_speed(curve_down=0.05) / burst
+                / self.frequency_scale())
+
+    def runner_period(self):
+        """
+        Returns the number of seconds until the runner's next move.
+        Frequency multiplier increases
+        quadratically with distance from player.
+        """
+        speedup = 2.8   # The maximum frequency multiplier.
+        power = 5.5     # Increasing this shrinks high-urgency range.
+        urgency = (speedup-1) / (self.width**power)
+        urgency *= (self.width+1 - (self.runner-self.player).square_norm()) ** power
+        urgency += 1
+        return 1 / urgency / self.frequency_scale()
+
+    def clock(self):
+        """
+        Returns the current time in seconds since the epoch. Replace
+        it on an instance to run the game on a simulated clock.
+        """
+        return time()
+
+    def set_strategy(self, character: str, name: str, **kwargs):
+        """
+        Makes an enemy's moves be decided by the strategy registered
+        under name. kwargs go to the strategy. See strategies.py.
+        """
+        self.strategies[character] = strategy(character, name, **kwargs)
+
+    def frequency_scale(self):
+        """
+        Returns the multiplier of every enemy's frequency.
+        Always 1 unless the adaptive option is set.
+        """
+        return self.difficulty.scale if self.adaptive.get() else 1.0
+
+    def player_avg_period(self):
+        """
+        Returns the average period of the player's recent moves,
+        counting the time since their last move as a period.
+        """
+        return self.moves.average.peek(self.clock() - self.time_start)
+
+    def stats(self):
+        """
+        Returns a summary of the player's speed and the
+        difficulty, for displays and logs. Periods are in seconds.
+        """
+        return dict(self.moves.as_dict(), scale=self.frequency_scale())
+
+    def clone(self):
+        """
+        Returns a Lookahead of the game, for searching ahead. It is
+        cheap to make, copy and undo moves on, and never changes the
+        game. It reads the game's tiles, so it is only valid until
+        the game changes.
+        """
+        return Lookahead.of(self)
+
+    def tile_at(self, pos: Pair):
+        """
+        Returns the tile at the given Pair coordinate.
+        """
+        if pos.in_bound(self.width, self.width):
+            return self.grid[self.width * pos.y + pos.x]
+        else:
+            return None
+
+    def player_tile(self):
+        """ Just as a readability aid. """
+        return self.grid[self.width * self.player.y + self.player.x]
+
+    def chaser_tile(self):
+        """ Just as a readability aid. """
+        return self.grid[self.width * self.chaser.y + self.chaser.x]
+
+    def nommer_tile(self):
+        """ Just as a readability aid. """
+        return self.grid[self.width * self.nommer.y + self.nommer.x]
+
+    def runner_tile(self):
+        """ Just as a readability aid. """
+        return self.grid[self.width * self.runner.y + self.runner.x]
+
+    def is_character(self, tile: Tile):
+        """ tile must not be None. """
+        return tile.key.get() not in self.language
+
+    def occupy(self, pos: Pair, character: str):
+        """
+        Places the face of character onto the tile at pos.
+        Used to add characters beyond those spawned by restart().
+        The tile must not already hold a character.
+        """
+        tile = self.tile_at(pos)
+        self.populations[tile.key.get()] -= 1
+        if tile in self.targets:
+            self.targets.remove(tile)
+            self.emit(events.TargetEaten(tile, character))
+        self.__set_key(tile, self.__get_face_key(character))
+
+    def vacate(self, pos: Pair):
+        """
+        Replaces the character at pos with a
+        regular key. The inverse of occupy().
+        """
+        self.__shuffle_tile(self.tile_at(pos))
+
+    def save(self):
+        """
+        Returns a compact snapshot of the game as bytes. See load().
+
+        Format (little-endian), following SNAPSHOT_HEADER:
+        -- lang_name        : u16 length, utf-8.
+        -- move_str         : u16 length, utf-8.
+        -- move periods     : u8 count, f64 each. See MoveStats.periods().
+        -- targets, trail   : u16 count, u16 grid index each.
+        -- populations      : i32 for each key of the language, in order.
+        -- keys             : per tile in row-order, the index of its key
+                              in the language (u8, or u16 for languages of
+                              255+ keys). Characters' tiles hold len(language).
+        Options other than kick-start, sad mode and adaptive are not
+        saved, and neither is the difficulty.
+        """
+        width = self.width
+        keys = {k: i for i, k in enumerate(self.language)}
+        characters = len(keys)
+        flags = (self.kick_start.get() | self.sad_mode.get() << 1
+                 | self.adaptive.get() << 2)
+        data = bytearray(SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, width, flags,
+            self.score.get(), self.losses.get(), self.heat,
+            self.clock() - self.time_start,
+            *[width * p.y + p.x for p in (
+                self.player, self.chaser, self.nommer, self.runner)]))
+        for string in (self.lang_name, self.move_str):
+            encoded = string.encode()
+            data += array('H', [len(encoded)]).tobytes()
+            data += encoded
+        periods = self.moves.periods()[-255:]
+        data.append(len(periods))
+        data += array('d', periods).tobytes()
+        for tiles in (self.targets, self.trail):
+            data += array('H', [len(tiles)] + [
+                width * t.pos.y + t.pos.x for t in tiles]).tobytes()
+        data += array('i', self.populations.values()).tobytes()
+        data += array('B' if characters < 255 else 'H', [
+            keys.get(t.key.get(), characters)
+            for t in self.grid]).tobytes()
+        return bytes(data)
+
+    def load(self, data: bytes):
+        """
+        Restores the game to a snapshot made by save().
+        The snapshot must come from a game of the same width.
+        Raises ValueError if the snapshot cannot be loaded, in
+        which case the game is left as it was.
+        Observers only receive a Reset event.
+        """
+        if len(data) < SNAPSHOT_HEADER.size:
+            raise ValueError('The snapshot is truncated.')
+        (magic, version, width, flags, score, losses, heat, idle,
+         *positions) = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError('Not a compatible snapshot.')
+        if width != self.width:
+            raise ValueError(f'Snapshot width {width} is not {self.width}.')
+        if max(positions) >= width ** 2:
+            raise ValueError('A character is off the board.')
+        offset = SNAPSHOT_HEADER.size
+
+        def take(typecode: str, count: int):
+            nonlocal offset
+            values = array(typecode)
+            end = offset + values.itemsize * count
+            if end > len(data):
+                raise ValueError('The snapshot is truncated.')
+            values.frombytes(data[offset:end])
+            offset = end
+            return values
+
+        def take_tiles():
+            indices = take('H', take('H', 1)[0])
+            if indices and max(indices) >= width ** 2:
+                raise ValueError('A tile is off the board.')
+            return [self.grid[i] for i in indices]
+
+        lang_choice, move_str = [
+            bytes(take('B', take('H', 1)[0])).decode() for _ in range(2)]
+        if lang_choice not in LANGUAGES:
+            raise ValueError(f'Unknown language {lang_choice}.')
+        periods = take('d', take('B', 1)[0]).tolist()
+        targets = take_tiles()
+        trail = take_tiles()
+        language = list(LANGUAGES[lang_choice])
+        populations = take('i', len(language)).tolist()
+        indices = take('B' if len(language) < 255 else 'H', width ** 2)
+        if max(indices) > len(language):
+            raise ValueError('A tile has a key outside the language.')
+
+        # Restore everything that does not depend on faces:
+        self.lang_choice.set(lang_choice)
+        self.lang_name = lang_choice
+        self.language = LANGUAGES[lang_choice].copy()
+        self.conflicts = conflicts(lang_choice)
+        self.typing = typing(lang_choice)
+        self.populations = Populations(zip(language, populations))
+        self.kick_start.set(bool(flags & 1))
+        self.sad_mode.set(bool(flags & 2))
+        self.adaptive.set(bool(flags & 4))
+        self.score.set(score)
+        self.losses.set(losses)
+        self.heat = heat
+        self.time_start = self.clock() - idle
+        self.moves = MoveStats(periods)
+        self.misses = 0
+        self.move_str = move_str
+        self.targets = targets
+        self.spawns = []
+        self.trail = trail
+        self.player, self.chaser, self.nommer, self.runner = [
+            Pair(i % width, i // width) for i in positions]
+
+        # Restore keys, then put each character's face back on the board:
+        self.generation += 1
+        language.append('')
+        for tile, i in zip(self.grid, indices):
+            tile.key.set(language[i])
+        for character in ('player', 'chaser', 'nommer', 'runner'):
+            pos = getattr(self, character)
+            self.tile_at(pos).key.set(self.__get_face_key(character))
+        self.neighborhood = None
+        self.emit(events.Reset())
+
+    def __get_face_key(self, character: str):
+        face = Game.faces[character]
+        if character == 'nommer' and (
+                self.heat >= self.num_targets + 1.5):
+            face = '>' + face + ' '
+        if self.sad_mode.get():
+            return face.replace(':', ':\'')
+        else:
+            return face
@@ -0,0 +1,243 @@
+"""
+Gym-style environments for training bots to play SnaKey.
+
+SnaKeyEnv wraps one headless Game with reset() and step(action).
+Its observations live in one preallocated array that is updated in
+place from the game's events, so only tiles that changed are written.
+VecEnv runs several environments in worker processes, which write
+their observations straight into one shared-memory array.
+
+Actions are indices into batch.OFFSETS, moving the player to the
+adjacent tile in that direction, or batch.BACKTRACK. Each step lasts
+dt simulated seconds, during which enemies move on the GUI's timers.
+The game runs on the simulated clock, so the player's speed, and the
+enemies' reactions to it, do not depend on how fast the host is, and
+episodes with the same seed repeat.
+Requires numpy.
+"""
+import random
+from multiprocessing import Pipe, Process, shared_memory
+
+import numpy as np
+
+import events
+from batch import EMPTY, PLAYER, CHASER, NOMMER, RUNNER, OFFSETS, BACKTRACK
+from engine import Game, Pair
+
+
+CHANNELS = ('keys', 'occupied', 'targets', 'trail')
+CHARACTERS = {
+    'player': PLAYER, 'chaser': CHASER,
+    'nommer': NOMMER, 'runner': RUNNER, }
+
+
+class SnaKeyEnv:
+    """
+    Attributes:
+    -- game         : Game              : Headless.
+    -- dt           : float             : Simulated seconds per step.
+    -- now          : float             : Simulated seconds since the last reset.
+                                          The game's clock.
+    -- obs          : ndarray(4, W, W)  : Returned by reset() and step(). Reused.
+    -- keys         : ndarray(W, W)     : View of obs. Index of each tile's key
+                                          in the language, or -1 under characters.
+    -- occupied     : ndarray(W, W)     : View of obs. The character on each tile.
+    -- targets      : ndarray(W, W)     : View of obs. 1 on targets.
+    -- trail        : ndarray(W, W)     : View of obs. Times each tile is in the trail.
+    -- timers       : list{float}       : Seconds until the chaser, nommer and
+                                          runner next move.
+    """
+    num_actions = BACKTRACK + 1
+
+    def __init__(self, width: int = 20, lang_choice: str = 'english lower',
+                 dt: float = 0.3, out=None):
+        """
+        out may be an int16 array of shape (4, width, width)
+        to hold observations, such as a view of shared memory.
+        """
+        self.now = 0.0
+        self.game = Game(width, lang_choice, headless=True)
+        self.game.clock = lambda: self.now
+        self.dt = dt
+        if out is None:
+            out = np.zeros((len(CHANNELS), width, width), dtype=np.int16)
+        self.obs = out
+        self.keys, self.occupied, self.targets, self.trail = out
+        self.index = None
+        self.timers = None
+        self.game.subscribe(
+            self.on_event,
+            events.KeyChanged, events.CharacterMoved,
+            events.TargetSpawned, events.TargetEaten,
+            events.TrailPushed, events.TrailPopped, events.Reset, )
+        self.on_event(events.Reset())
+
+    def reset(self, seed=None):
+        """ Restarts the game. Returns the observation. """
+        if seed is not None:
+            random.seed(seed)
+            # Keys are shuffled away from their neighbors' keys,
+            # so clear those of the last episode:
+            for tile in self.game.grid:
+                tile.key.set('')
+        self.now = 0.0
+        self.game.restart()
+        self.timers = [0.8, 0.15, 0.5]
+        return self.obs
+
+    def step(self, action: int):
+        """
+        Moves the player, then lets dt seconds pass.
+        Returns (observation, reward, done, info). The reward is
+        the change in score minus the change in losses. The
+        episode is done when the chaser catches the player.
+        """
+        game = self.game
+        before = game.score.get() - game.losses.get()
+        if action == BACKTRACK:
+            game.move_player('space', self.now)
+        else:
+            dx, dy = OFFSETS[action]
+            dest = game.player + Pair(int(dx), int(dy))
+            for move in game.legal_moves():
+                if move.tile.pos == dest and move.keys != ('space',):
+                    for key in move.keys:
+                        game.move_player(key, self.now)
+                    break
+
+        done = False
+        self.now += self.dt
+        self.timers = [t - self.dt for t in self.timers]
+        if self.timers[0] <= 0:
+            done = game.move_chaser()
+            self.timers[0] += game.chaser_period()
+        if not done and self.timers[1] <= 0:
+            game.move_nommer()
+            self.timers[1] += game.nommer_period()
+        if not done and self.timers[2] <= 0:
+            game.move_runner()
+            self.timers[2] += game.runner_period()
+        reward = game.score.get() - game.losses.get() - before
+        info = {'score': game.score.get(), 'losses': game.losses.get()}
+        return self.obs, reward, done, info
+
+    def on_event(self, event):
+        """ Writes the tiles changed by event into obs. """
+        kind = type(event)
+        if kind is events.KeyChanged:
+            pos = event.tile.pos
+            self.keys[pos.y, pos.x] = self.index.get(event.key, -1)
+        elif kind is events.CharacterMoved:
+            src, dst = event.src.pos, event.dst.pos
+            self.occupied[src.y, src.x] = EMPTY
+            self.occupied[dst.y, dst.x] = CHARACTERS[event.character]
+        elif kind is events.TargetSpawned or kind is events.TargetEaten:
+            pos = event.tile.pos
+            self.targets[pos.y, pos.x] = kind is events.TargetSpawned
+        elif kind is events.TrailPushed:
+            self.trail[event.tile.pos.y, event.tile.pos.x] += 1
+        elif kind is events.TrailPopped:
+            self.trail[event.tile.pos.y, event.tile.pos.x] -= 1
+        elif kind is events.Reset:
+            self.__rebuild()
+
+    def __rebuild(self):
+        """ Rewrites every channel of obs. """
+        game = self.game
+        self.index = {k: i for i, k in enumerate(game.language)}
+        self.obs[:] = 0
+        for tile in game.grid:
+            self.keys[tile.pos.y, tile.pos.x] = self.index.get(tile.key.get(), -1)
+        for character, code in CHARACTERS.items():
+            pos = getattr(game, character)
+            self.occupied[pos.y, pos.x] = code
+        for tile in game.targets:
+            self.targets[tile.pos.y, tile.pos.x] = 1
+        for tile in game.trail:
+            self.trail[tile.pos.y, tile.pos.x] += 1
+
+
+def _work(conn, shm_name: str, shape: tuple, i: int,
+          width: int, lang_choice: str, dt: float, seed):
+    """
+    Runs the i'th environment of a VecEnv until told to close.
+    Environments that finish an episode restart on their own.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    obs = np.ndarray(shape, dtype=np.int16, buffer=shm.buf)
+    env = SnaKeyEnv(width, lang_choice, dt, out=obs[i])
+    try:
+        while True:
+            command, arg = conn.recv()
+            if command == 'reset':
+                env.reset(None if seed is None else seed + i)
+                conn.send(None)
+            elif command == 'step':
+                _, reward, done, info = env.step(arg)
+                if done:
+                    env.reset()
+                conn.send((reward, done, info))
+            else:
+                break
+    finally:
+        del env, obs
+        shm.close()
+
+
+class VecEnv:
+    """
+    Runs n SnaKeyEnvs in worker processes.
+
+    Attributes:
+    -- obs          : ndarray(n, 4, W, W)   : Observations of every environment,
+                                              in shared memory. Reused.
+    """
+    num_actions = SnaKeyEnv.num_actions
+
+    def __init__(self, n: int, width: int = 20,
+                 lang_choice: str = 'english lower',
+                 dt: float = 0.3, seed=None):
+        shape = (n, len(CHANNELS), width, width)
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=int(np.prod(shape)) * 2)
+        self.obs = np.ndarray(shape, dtype=np.int16, buffer=self.shm.buf)
+        self.conns = []
+        self.workers = []
+        for i in range(n):
+            parent, child = Pipe()
+            worker = Process(
+                target=_work, daemon=True, args=(
+                    child, self.shm.name, shape, i,
+                    width, lang_choice, dt, seed))
+            worker.start()
+            self.conns.append(parent)
+            self.workers.append(worker)
+
+    def reset(self):
+        """ Restarts every environment. Returns the observations. """
+        for conn in self.conns:
+            conn.send(('reset', None))
+        for conn in self.conns:
+            conn.recv()
+        return self.obs
+
+    def step(self, actions):
+        """
+        Steps every environment with its action. Returns (observations,
+        rewards, dones, infos). Finished environments are restarted,
+        so their observations already belong to the next episode.
+        """
+        for conn, action in zip(self.conns, actions):
+            conn.send(('step', int(action)))
+        results = [conn.recv() for conn in self.conns]
+        rewards, dones, infos = zip(*results)
+        return self.obs, np.array(rewards), np.array(dones), list(infos)
+
+    def close(self):
+        for conn in self.conns:
+            conn.send(('close', None))
+        for worker in self.workers:
+            worker.join()
+        del self.obs
+        self.shm.close()
+        self.shm.unlink()
@@ -0,0 +1,37 @@
+"""
+Events emitted by a Game as its state changes.
+
+Subscribe to them with Game.subscribe. Events are emitted right after
+the change they describe, so the game's state can be read from inside
+a callback. Restarting or loading a game emits only a single Reset.
+"""
+from collections import namedtuple
+
+
+# The key of tile became key:
+KeyChanged = namedtuple('KeyChanged', 'tile key')
+
+# A target appeared on tile:
+TargetSpawned = namedtuple('TargetSpawned', 'tile')
+
+# character ('player' or 'nommer') ate the target on tile:
+TargetEaten = namedtuple('TargetEaten', 'tile character')
+
+# tile was appended to the player's trail:
+TrailPushed = namedtuple('TrailPushed', 'tile')
+
+# tile was removed from the player's trail:
+TrailPopped = namedtuple('TrailPopped', 'tile')
+
+# character moved from the tile src to the tile dst:
+CharacterMoved = namedtuple('CharacterMoved', 'character src dst')
+
+# The player moved onto a tile with the display key key, period seconds
+# after their last move, after misses keys that could not lead to a move:
+KeyTyped = namedtuple('KeyTyped', 'key period misses')
+
+# The player's score or losses changed:
+ScoreChanged = namedtuple('ScoreChanged', 'score losses')
+
+# Everything may have changed (ie. after a restart):
+Reset = namedtuple('Reset', '')
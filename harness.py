@@ -0,0 +1,314 @@
+"""
+Runs a reference engine and a candidate engine side by side, to check
+that an optimization of the candidate did not change the game's rules.
+
+Both games start from the same seed and get the same inputs. Each one
+draws from its own copy of the random module's state, and reads the
+time from the same fake clock, so equal games stay equal. After every
+tick, their states are compared and the candidate's invariants are
+checked, and the first difference is reported. The time each engine
+spent on each kind of move is reported as a speedup.
+
+Run with: python harness.py [ticks] [seed] [module.Class]
+to compare engine.Game against a candidate (itself by default).
+"""
+import random
+import sys
+from collections import namedtuple
+from importlib import import_module
+from time import perf_counter
+
+
+ACTIONS = ('player', 'chaser', 'nommer', 'runner')
+# Ticks between moves of each enemy:
+ENEMY_EVERY = {'chaser': 4, 'nommer': 2, 'runner': 3}
+# Seconds of the fake clock per tick:
+TICK_SECONDS = 0.1
+
+# tick is the index of the tick, action what was done in it, and
+# fields a map from the names of the fields that differ to their
+# (reference, candidate) values:
+Divergence = namedtuple('Divergence', 'tick action fields')
+# violations holds (tick, message) for each broken invariant, and
+# times maps 'reference' and 'candidate' to maps from ACTIONS to seconds:
+Report = namedtuple('Report', 'ticks divergence violations times')
+
+
+def state(game):
+    """ Returns the parts of a game's state that the rules decide. """
+    width = game.width
+    return {
+        'keys': tuple(t.key.get() for t in game.grid),
+        'targets': tuple(sorted(width * t.pos.y + t.pos.x for t in game.targets)),
+        'trail': tuple(width * t.pos.y + t.pos.x for t in game.trail),
+        'positions': tuple(
+            (p.x, p.y) for p in
+            (game.player, game.chaser, game.nommer, game.runner)),
+        'populations': {k: v for k, v in game.populations.items() if v},
+        'score': game.score.get(),
+        'losses': game.losses.get(),
+        'heat': game.heat,
+        'misses': game.misses,
+        'move_str': game.move_str,
+    }
+
+
+def differences(reference: dict, candidate: dict):
+    """
+    Returns a map from the names of fields of two states that
+    differ to their values. Keys are summarized by their first
+    differing tile, since boards are big.
+    """
+    fields = {}
+    for name, value in reference.items():
+        other = candidate[name]
+        if value == other:
+            continue
+        if name == 'keys':
+            i = next(i for i, (a, b) in enumerate(zip(value, other)) if a != b)
+            count = sum(a != b for a, b in zip(value, other))
+            fields[name] = (f'{count} tiles, first #{i}: {value[i]!r}',
+                            f'{other[i]!r}')
+        else:
+            fields[name] = (value, other)
+    return fields
+
+
+# -- Invariants ---------------------------------------------------------------
+# Each returns a description of how a game breaks it, or None.
+
+def populations_match_grid(game):
+    """ Each key's population is its number of tiles. """
+    counts = dict.fromkeys(game.language, 0)
+    for tile in game.grid:
+        key = tile.key.get()
+        if key in counts:
+            counts[key] += 1
+    wrong = {k: (game.populations[k], n)
+             for k, n in counts.items() if game.populations[k] != n}
+    if wrong:
+        return f'populations differ from the grid: {wrong}'
+    faces = sum(game.is_character(t) for t in game.grid)
+    if sum(game.populations.values()) + faces != game.width ** 2:
+        return f'populations and {faces} faces do not sum to width ** 2'
+
+
+def neighborhoods_conflict_free(game):
+    """ No two tiles that can both be next to the player conflict. """
+    width = game.width
+    grid = game.grid
+    for y in range(width):
+        for x in range(width):
+            key = grid[width * y + x].key.get()
+            conflicts = game.conflicts.get(key)
+            if conflicts is None:
+                continue
+            # Visit each pair once, from the first of them in row-order:
+            for dy in range(0, 3):
+                for dx in range(-2, 3):
+                    if (dy == 0 and dx <= 0) or not (
+                            0 <= x + dx < width and y + dy < width):
+                        continue
+                    other = grid[width * (y + dy) + x + dx].key.get()
+                    if other in conflicts:
+                        return (f'{key!r} at ({x},{y}) conflicts with'
+                                f' {other!r} at ({x + dx},{y + dy})')
+
+
+def trail_length(game):
+    """ See Game.__trim_tail. Each trim removes at most one tile. """
+    net = game.score.get() - game.losses.get()
+    limit = max(net, 0) ** (3 / 7) + 1
+    if len(game.trail) > limit:
+        return f'trail of {len(game.trail)} tiles with net score {net}'
+
+
+def characters_placed(game):
+    """ Characters are on their own tiles, except the chaser on the player. """
+    positions = [game.player, game.nommer, game.runner]
+    if len(set(positions)) < 3 or game.chaser in positions[1:]:
+        return f'characters overlap at {positions + [game.chaser]}'
+    for pos in positions + [game.chaser]:
+        if not pos.in_bound(game.width, game.width):
+            return f'a character is out of bounds at {pos}'
+        if not game.is_character(game.tile_at(pos)):
+            return f'the tile at {pos} has a key under a character'
+
+
+def targets_kept(game):
+    """ Targets are distinct, and there are enough of them. """
+    if len(set(game.targets)) != len(game.targets):
+        return 'a tile is a target more than once'
+    if len(game.targets) < game.num_targets:
+        return f'only {len(game.targets)} targets'
+
+
+INVARIANTS = (
+    populations_match_grid, neighborhoods_conflict_free,
+    trail_length, characters_placed, targets_kept, )
+
+
+class _Side:
+    """
+    One of the games being compared.
+
+    Attributes:
+    -- game         : Game              :
+    -- random_state : tuple             : Its copy of the random module's state.
+    -- times        : dict{str: float}  : Map from ACTIONS to seconds spent on them.
+    """
+    def __init__(self, engine, width: int, lang_choice: str, seed: int):
+        random.seed(seed)
+        self.game = engine(width, lang_choice, headless=True)
+        self.random_state = random.getstate()
+        self.times = dict.fromkeys(ACTIONS, 0.0)
+
+    def run(self, action: str, function, *args):
+        """ Calls function with args on this side's random state, and times it. """
+        random.setstate(self.random_state)
+        start = perf_counter()
+        result = function(*args)
+        self.times[action] += perf_counter() - start
+        self.random_state = random.getstate()
+        return result
+
+
+class Harness:
+    """
+    Attributes:
+    -- reference    : _Side             :
+    -- candidate    : _Side             :
+    -- inputs       : random.Random     : Decides the player's key presses.
+    -- now          : float             : The fake clock of both games, in seconds.
+    -- modules      : list{module}      : The modules of the engines, whose time
+                                          functions are replaced while running.
+    """
+    def __init__(self, reference, candidate, width: int = 20,
+                 lang_choice: str = 'english lower', seed: int = 0):
+        self.now = 0.0
+        self.modules = []
+        for engine in (reference, candidate):
+            module = sys.modules[engine.__module__]
+            if hasattr(module, 'time') and module not in self.modules:
+                self.modules.append(module)
+        with self.__fake_clock():
+            self.reference = _Side(reference, width, lang_choice, seed)
+            self.candidate = _Side(candidate, width, lang_choice, seed)
+        self.inputs = random.Random(seed)
+
+    def __fake_clock(self):
+        harness = self
+
+        class FakeClock:
+            def __enter__(self):
+                self.saved = [m.time for m in harness.modules]
+                for module in harness.modules:
+                    module.time = lambda: harness.now
+                return self
+
+            def __exit__(self, *_):
+                for module, saved in zip(harness.modules, self.saved):
+                    module.time = saved
+        return FakeClock()
+
+    def __tick(self, tick: int):
+        """ Plays a tick on both games. Returns what was done. """
+        inputs = self.inputs
+        done = []
+        roll = inputs.random()
+        if roll < 0.6:
+            # Type a legal move, chosen by its place among the moves:
+            choice = inputs.random()
+            for side in (self.reference, self.candidate):
+                game = side.game
+                moves = sorted(
+                    game.legal_moves(),
+                    key=lambda m: (m.tile.pos.y, m.tile.pos.x, m.keys))
+                if moves:
+                    for key in moves[int(choice * len(moves))].keys:
+                        side.run('player', game.move_player, key, self.now)
+            done.append('player')
+        elif roll < 0.7:
+            # Type a key that may be a miss:
+            keys = sorted(self.reference.game.language.values())
+            key = keys[inputs.randrange(len(keys))][0]
+            for side in (self.reference, self.candidate):
+                side.run('player', side.game.move_player, key, self.now)
+            done.append('miss')
+
+        for action, every in ENEMY_EVERY.items():
+            if tick % every:
+                continue
+            done.append(action)
+            caught = [side.run(action, getattr(side.game, 'move_' + action))
+                      for side in (self.reference, self.candidate)]
+            if action == 'chaser' and caught[0]:
+                for side in (self.reference, self.candidate):
+                    side.run('chaser', side.game.restart)
+                done.append('restart')
+        return ' '.join(done)
+
+    def run(self, ticks: int, check_every: int = 1):
+        """
+        Plays up to ticks ticks, and returns a Report. Stops at the
+        first divergence. Invariants are checked every check_every ticks.
+        """
+        divergence = None
+        violations = []
+        tick = 0
+        with self.__fake_clock():
+            for tick in range(1, ticks + 1):
+                self.now += TICK_SECONDS
+                action = self.__tick(tick)
+                fields = differences(
+                    state(self.reference.game), state(self.candidate.game))
+                if fields:
+                    divergence = Divergence(tick, action, fields)
+                    break
+                if tick % check_every == 0:
+                    for invariant in INVARIANTS:
+                        message = invariant(self.candidate.game)
+                        if message is not None:
+                            violations.append((tick, message))
+        return Report(tick, divergence, violations, {
+            'reference': self.reference.times,
+            'candidate': self.candidate.times})
+
+
+def load_engine(name: str):
+    """ Returns the class named like 'module.Class'. """
+    module, _, cls = name.rpartition('.')
+    return getattr(import_module(module), cls)
+
+
+if __name__ == '__main__':
+    from engine import Game
+    args = sys.argv[1:]
+    num_ticks = int(args[0]) if len(args) > 0 else 2000
+    seed = int(args[1]) if len(args) > 1 else 0
+    candidate = load_engine(args[2]) if len(args) > 2 else Game
+    report = Harness(Game, candidate, seed=seed).run(num_ticks)
+
+    if report.divergence is None:
+        print(f'{report.ticks} ticks: no divergence')
+    else:
+        tick, action, fields = report.divergence
+        print(f'diverged at tick {tick} ({action}):')
+        for name, (expected, got) in fields.items():
+            print(f'  {name}: reference {expected}, candidate {got}')
+    for tick, message in report.violations[:10]:
+        print(f'tick {tick}: {message}')
+    if len(report.violations) > 10:
+        print(f'... and {len(report.violations) - 10} more violations')
+
+    print(f'{"action":>8} {"reference":>10} {"candidate":>10} {"speedup":>8}')
+    for action in ACTIONS + ('total',):
+        if action == 'total':
+            times = [sum(report.times[side].values())
+                     for side in ('reference', 'candidate')]
+        else:
+            times = [report.times[side][action]
+                     for side in ('reference', 'candidate')]
+        speedup = times[0] / times[1] if times[1] else float('nan')
+        print(f'{action:>8} {times[0] * 1000:8.1f}ms {times[1] * 1000:8.1f}ms'
+              f' {speedup:7.2f}x')
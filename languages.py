@@ -1,26 +1,24 @@
 """
 Please only use as follows:
-from LANGUAGES import LANGUAGES
+from languages import LANGUAGES, MIXES, conflicts, typing
 
 Rules for defining languages:
 -- must map from display key (what the player sees)
    to typing key (what the player types to move around).
 -- no typing keys should start with another typing key as a substring.
+
+A board can mix languages whose display keys differ. Its language is
+named by the names of the languages it mixes, joined by MIX, and is
+looked up in LANGUAGES like any other. Typing keys of a mix may repeat
+or contain each other across its languages (ie. hiragana and katakana
+share their romanization). Such keys conflict, so they are never near
+each other on a board.
 """
+from collections import namedtuple
+from collections.abc import Mapping
+from functools import lru_cache
 
 lowercase = 'abcdefghijklmnopqrstuvwxyz'
-
-jpn_temp = [[consonant + vowel for vowel in 'aiueo']
-            for consonant in ['', ] + list('kstnhmr')]
-jpn_temp[2][1] = 'shi'
-jpn_temp[3][1] = 'chi'
-jpn_temp[3][2] = 'tsu'
-jpn_temp[5][2] = 'fu'
-jpn_romanization = []
-for row in jpn_temp:
-    jpn_romanization.extend(row)
-jpn_romanization.extend(['ya', 'yu', 'yo', 'wa', 'wo', 'n'])
-jpn_romanization = tuple(jpn_romanization)
 hiragana = 'あいうえおかきくけこさしすせそ' \
              'たちつてとなにぬねのはひふへほ' \
              'まみむめもらりるれろやゆよわをん'
@@ -28,8 +26,128 @@ katakana = 'アイウエオカキクケコサシスセソ' \
              'タチツテトナニヌネノハヒフヘホ' \
              'マミムメモラリルレロヤユヨワヲン'
 
-LANGUAGES = {
-    'english lower': {l: l for l in lowercase},
-    'japanese hiragana': {k: v for k, v in zip(hiragana, jpn_romanization)},
-    'japanese katakana': {k: v for k, v in zip(katakana, jpn_romanization)},
-}
+
+@lru_cache(maxsize=None)
+def jpn_romanization():
+    jpn_temp = [[consonant + vowel for vowel in 'aiueo']
+                for consonant in ['', ] + list('kstnhmr')]
+    jpn_temp[2][1] = 'shi'
+    jpn_temp[3][1] = 'chi'
+    jpn_temp[3][2] = 'tsu'
+    jpn_temp[5][2] = 'fu'
+    romanization = []
+    for row in jpn_temp:
+        romanization.extend(row)
+    romanization.extend(['ya', 'yu', 'yo', 'wa', 'wo', 'n'])
+    return tuple(romanization)
+
+
+# Joins the names of the languages of a mixed board:
+MIX = ' + '
+
+
+class Languages(Mapping):
+    """
+    A read-only map from language names to languages. Each
+    language is only built the first time it is looked up,
+    so listing the names of languages costs nothing.
+
+    Mixes of languages can be looked up, but are not listed.
+    """
+    def __init__(self, builders: dict):
+        self.builders = builders
+        self.built = {}
+
+    def __getitem__(self, name: str):
+        if name not in self.built:
+            if MIX in name:
+                self.built[name] = self.__mix(name)
+            else:
+                self.built[name] = self.builders[name]()
+        return self.built[name]
+
+    def __mix(self, name: str):
+        """ Returns the union of the languages a mix is named by. """
+        if name not in self:
+            raise KeyError(name)
+        language = {}
+        for part in name.split(MIX):
+            for display, typed in self[part].items():
+                if display in language:
+                    raise ValueError(
+                        f'{display!r} is in more than one language of {name}.')
+                language[display] = typed
+        return language
+
+    def __iter__(self):
+        return iter(self.builders)
+
+    def __len__(self):
+        return len(self.builders)
+
+    def __contains__(self, name):
+        parts = name.split(MIX)
+        return len(set(parts)) == len(parts) and \
+            all(part in self.builders for part in parts)
+
+
+LANGUAGES = Languages({
+    'english lower': lambda: {l: l for l in lowercase},
+    'japanese hiragana': lambda: dict(zip(hiragana, jpn_romanization())),
+    'japanese katakana': lambda: dict(zip(katakana, jpn_romanization())),
+})
+
+# Mixes offered beside the languages:
+MIXES = (
+    MIX.join(('japanese hiragana', 'japanese katakana')),
+    MIX.join(('english lower', 'japanese hiragana', 'japanese katakana')),
+)
+
+# The typing keys of a language, compiled for matching what is typed:
+# -- sequences  : map from typing keys to the display keys typed with them.
+# -- prefixes   : map from typing keys to their proper prefixes.
+# -- longest    : the length of the longest typing key.
+Typing = namedtuple('Typing', 'sequences prefixes longest')
+
+
+@lru_cache(maxsize=None)
+def typing(lang_choice: str):
+    """ Returns the Typing of a language. Built once per language. """
+    sequences = {}
+    for display, typed in LANGUAGES[lang_choice].items():
+        sequences.setdefault(typed, []).append(display)
+    return Typing(
+        {typed: tuple(keys) for typed, keys in sequences.items()},
+        {typed: tuple(typed[:i] for i in range(1, len(typed)))
+         for typed in sequences},
+        max(map(len, sequences)), )
+
+
+@lru_cache(maxsize=None)
+def conflicts(lang_choice: str):
+    """
+    Returns a map from each display key of a language to the
+    display keys that cannot be near it. Two keys conflict when one's
+    typing key is a substring of the other's, since having both near
+    the player would make the direction of movement ambiguous.
+    Built once per language.
+
+    Instead of comparing every pair of typing keys, which grows with
+    the square of the size of a mix, each typing key's substrings are
+    looked up among the others.
+    """
+    sequences = typing(lang_choice).sequences
+    related = {typed: set() for typed in sequences}
+    for typed in sequences:
+        for start in range(len(typed)):
+            for stop in range(start + 1, len(typed) + 1):
+                inner = typed[start:stop]
+                if inner in related:
+                    related[typed].add(inner)
+                    related[inner].add(typed)
+    table = {}
+    for typed, others in related.items():
+        keys = frozenset(k for other in others for k in sequences[other])
+        for display in sequences[typed]:
+            table[display] = keys
+    return table
@@ -0,0 +1,319 @@
+"""
+Cheap copies of a game's state for bots and enemies that search ahead.
+
+A Lookahead shares its tile keys and populations with the game (or
+Lookahead) it was cloned from, and records its own changes in small
+override maps. Moves are pushed on an undo stack, so a search can apply
+a move, evaluate, and undo it without copying anything.
+
+A Lookahead of a game reads the game's tiles and populations when it
+needs them instead of copying them, so making one costs as little as
+cloning another. It is only valid until the game changes, and raises
+a RuntimeError if used after that.
+
+Keys that the game would shuffle in randomly are unknown ahead of time,
+so vacated tiles hold UNKNOWN. Characters' tiles hold OCCUPIED.
+
+Run with: python lookahead.py [depth]
+to time a minimax chaser on a fresh game.
+"""
+from math import inf
+
+UNKNOWN = None
+OCCUPIED = ''
+CHARACTERS = ('player', 'chaser', 'nommer', 'runner')
+OFFSETS = tuple(
+    (dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx or dy)
+
+
+class _LiveKeys(dict):
+    """
+    Map from grid indices to the keys of a game's tiles. Each is read
+    from the game the first time it is looked up, and then kept.
+    Characters' tiles hold OCCUPIED.
+    """
+    def __init__(self, game):
+        super(_LiveKeys, self).__init__()
+        self.grid = game.grid
+        self.language = game.language
+
+    def __missing__(self, i: int):
+        key = self.grid[i].key.get()
+        if key not in self.language:
+            key = OCCUPIED
+        self[i] = key
+        return key
+
+
+class Lookahead:
+    """
+    Attributes:
+    -- width        : int               : See Game.width.
+    -- base_keys    : sequence{str}     : Keys of tiles in row-order when cloned.
+                                          Shared between clones.
+    -- keys         : dict{int: str}    : Map from grid indices to keys that
+                                          differ from base_keys.
+    -- base_populations : dict{str: int}: Shared between clones.
+    -- populations  : dict{str: int}    : Populations that differ from base_populations.
+    -- targets      : set{int}          : Grid indices of targets.
+    -- trail        : list{int}         : Grid indices of the trail, oldest first.
+    -- positions    : dict{str: tuple}  : Map from characters to their (x, y).
+    -- score        : int               :
+    -- losses       : int               :
+    -- history      : list{tuple}       : Records of applied moves, for undo().
+    -- game         : Game              : The game whose tiles are the base, or None.
+    -- generation   : int               : The game's generation when cloned.
+    """
+    def __init__(self, width, base_keys, base_populations, targets, trail,
+                 positions, score, losses):
+        self.width = width
+        self.base_keys = base_keys
+        self.keys = {}
+        self.base_populations = base_populations
+        self.populations = {}
+        self.targets = targets
+        self.trail = trail
+        self.positions = positions
+        self.score = score
+        self.losses = losses
+        self.history = []
+        self.game = None
+        self.generation = None
+
+    @staticmethod
+    def of(game):
+        """
+        Returns a Lookahead of a game's current state. Its cost grows
+        with the targets and trail, not with the board.
+        """
+        width = game.width
+        view = Lookahead(
+            width, _LiveKeys(game), game.populations,
+            {width * t.pos.y + t.pos.x for t in game.targets},
+            [width * t.pos.y + t.pos.x for t in game.trail],
+            {c: (getattr(game, c).x, getattr(game, c).y) for c in CHARACTERS},
+            game.score.get(), game.losses.get())
+        view.game = game
+        view.generation = game.generation
+        return view
+
+    def check(self):
+        """ Raises a RuntimeError if the game changed since the clone. """
+        if self.game is not None and self.game.generation != self.generation:
+            raise RuntimeError('The game changed since it was cloned.')
+
+    def clone(self):
+        """
+        Returns a copy that shares this one's base state. Its cost grows
+        with the changes made since this one's base, not with the board.
+        """
+        clone = Lookahead(
+            self.width, self.base_keys, self.base_populations,
+            set(self.targets), list(self.trail), dict(self.positions),
+            self.score, self.losses)
+        clone.keys = dict(self.keys)
+        clone.populations = dict(self.populations)
+        clone.game = self.game
+        clone.generation = self.generation
+        return clone
+
+    # -- Reading ------------------------------------------------------------
+
+    def key_at(self, pos: tuple):
+        """ Returns the key at (x, y): a display key, UNKNOWN or OCCUPIED. """
+        self.check()
+        i = self.width * pos[1] + pos[0]
+        return self.keys.get(i, self.base_keys[i])
+
+    def population(self, key: str):
+        self.check()
+        return self.populations.get(key, self.base_populations.get(key, 0))
+
+    def occupant(self, pos: tuple):
+        """ Returns the character at (x, y), or None. """
+        for character, other in self.positions.items():
+            if other == pos:
+                return character
+        return None
+
+    def moves(self, character: str):
+        """
+        Returns the positions that character can move to: adjacent tiles
+        in bounds that no other character is on. Only the chaser may
+        move onto the player.
+        """
+        x, y = self.positions[character]
+        width = self.width
+        taken = {p for c, p in self.positions.items()
+                 if not (character == 'chaser' and c == 'player')}
+        return [(x + dx, y + dy) for dx, dy in OFFSETS
+                if 0 <= x + dx < width and 0 <= y + dy < width
+                and (x + dx, y + dy) not in taken]
+
+    def caught(self):
+        """ Returns whether the chaser is on the player. """
+        return self.positions['chaser'] == self.positions['player']
+
+    # -- Changing -----------------------------------------------------------
+
+    def __set_key(self, i: int, key: str):
+        if key == self.base_keys[i]:
+            self.keys.pop(i, None)
+        else:
+            self.keys[i] = key
+
+    def __add_population(self, key: str, change: int):
+        population = self.population(key) + change
+        if population == self.base_populations.get(key, 0):
+            self.populations.pop(key, None)
+        else:
+            self.populations[key] = population
+
+    def move(self, character: str, dest: tuple):
+        """
+        Moves character to dest, following the game's rules for the
+        player's trail and for eating targets. Undo with undo().
+        """
+        if self.game is not None and self.game.generation != self.generation:
+            self.check()
+        width = self.width
+        src = self.positions[character]
+        i_src = width * src[1] + src[0]
+        i_dest = width * dest[1] + dest[0]
+        dest_key = self.keys.get(i_dest, self.base_keys[i_dest])
+        src_key = self.keys.get(i_src, self.base_keys[i_src])
+        self.positions[character] = dest
+        self.__set_key(i_src, UNKNOWN)
+        self.__set_key(i_dest, OCCUPIED)
+        if dest_key:
+            self.__add_population(dest_key, -1)
+
+        eaten = False
+        popped = None
+        if character == 'player' or character == 'nommer':
+            eaten = i_dest in self.targets
+            if eaten:
+                self.targets.discard(i_dest)
+                if character == 'player':
+                    self.score += 1
+                else:
+                    self.losses += 1
+        if character == 'player':
+            self.trail.append(i_src)
+        if character == 'player' or eaten:
+            # See Game.__trim_tail:
+            net = self.score - self.losses
+            if self.trail and (net < 0 or len(self.trail) > net ** (3 / 7)):
+                popped = self.trail.pop(0)
+        self.history.append(
+            (character, src, i_src, src_key, i_dest, dest_key, eaten, popped))
+
+    def undo(self):
+        """ Reverts the last move that was not undone. """
+        (character, src, i_src, src_key, i_dest, dest_key,
+         eaten, popped) = self.history.pop()
+        if popped is not None:
+            self.trail.insert(0, popped)
+        if character == 'player':
+            self.trail.pop()
+        if eaten:
+            self.targets.add(i_dest)
+            if character == 'player':
+                self.score -= 1
+            else:
+                self.losses -= 1
+        if dest_key:
+            self.__add_population(dest_key, 1)
+        self.__set_key(i_dest, dest_key)
+        self.__set_key(i_src, src_key)
+        self.positions[character] = src
+
+
+def minimax_chaser(view: Lookahead, depth: int):
+    """
+    Returns the chaser's move that gets closest to the player, assuming
+    the player then moves as far away as it can, searching depth moves
+    of each. Distances are square norms. Returns None if it cannot move.
+    """
+    def distance():
+        (cx, cy), (px, py) = view.positions['chaser'], view.positions['player']
+        return max(abs(cx - px), abs(cy - py))
+
+    def search(depth: int, alpha: float, beta: float):
+        """ Returns the closest distance the chaser can force. """
+        if view.caught():
+            return -depth  # Sooner catches are better.
+        if depth == 0:
+            return distance()
+        best = inf
+        for dest in view.moves('chaser'):
+            view.move('chaser', dest)
+            if view.caught():
+                value = -depth
+            else:
+                value = -inf
+                for escape in view.moves('player') or [None]:
+                    if escape is not None:
+                        view.move('player', escape)
+                    value = max(value, search(
+                        depth - 1, max(alpha, value), min(beta, best)))
+                    if escape is not None:
+                        view.undo()
+                    if value >= min(beta, best):
+                        break
+            view.undo()
+            if value < best:
+                best = value
+            if best <= alpha:
+                break
+        return best
+
+    best_move, best = None, inf
+    for dest in view.moves('chaser'):
+        view.move('chaser', dest)
+        value = -depth - 1 if view.caught() else -inf
+        if value == -inf:
+            for escape in view.moves('player') or [None]:
+                if escape is not None:
+                    view.move('player', escape)
+                value = max(value, search(depth - 1, value, best))
+                if escape is not None:
+                    view.undo()
+                if value >= best:
+                    break
+        view.undo()
+        if value < best:
+            best_move, best = dest, value
+    return best_move
+
+
+if __name__ == '__main__':
+    import sys
+    from time import perf_counter
+    from engine import Game
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    game = Game(20, headless=True)
+
+    start = perf_counter()
+    for _ in range(1000):
+        view = game.clone()
+    print(f'clone a game:      {(perf_counter() - start) * 1000:8.1f} µs')
+    start = perf_counter()
+    for _ in range(1000):
+        view.clone()
+    print(f'clone a lookahead: {(perf_counter() - start) * 1000:8.1f} µs')
+
+    moves = 0
+    original = view.move
+
+    def counted(*args):
+        global moves
+        moves += 1
+        original(*args)
+
+    view.move = counted
+    start = perf_counter()
+    best = minimax_chaser(view, depth)
+    seconds = perf_counter() - start
+    print(f'minimax depth {depth}: {best} from {game.chaser}, {moves} moves'
+          f' in {seconds * 1000:.1f} ms ({moves / seconds:,.0f} moves/s)')
@@ -0,0 +1,97 @@
+"""
+Plans where the runner should run to, with its geometry precomputed
+per width and its decisions cached, so each move costs the same
+small number of lookups. Independent of Game, so it can be tested alone.
+"""
+from functools import lru_cache
+from math import hypot
+
+from pair import Pair
+
+
+class RunnerPlanner:
+    """
+    When far from the player, the runner avoids the nommer and chases
+    the chaser. Otherwise, it runs toward whichever of the two corners
+    farthest from the player is most in its favour, biased away from
+    the player.
+
+    Attributes:
+    -- width        : int               : See Game.width.
+    -- cell         : int               : Side in tiles of the cells that share a
+                                          cached escape. 1 plans exactly.
+    -- corners      : list{tuple}       : The corners the runner may run to.
+    -- away         : dict{tuple: tuple}: Map from vectors from the nommer to the
+                                          runner to a step of width / 9 along them.
+    -- escapes      : dict{tuple: tuple}: Map from the cells of the runner and player
+                                          to the target of the runner.
+    """
+    def __init__(self, width: int, cell: int = 2):
+        self.width = width
+        self.cell = cell
+        self.far = (width / 2) ** 2
+        d1 = width // 5
+        d2 = width - 1 - d1
+        self.corners = [(d1, d1), (d2, d1), (d1, d2), (d2, d2)]
+        self.away = {(0, 0): (0, 0)}
+        for dy in range(1 - width, width):
+            for dx in range(1 - width, width):
+                if dx or dy:
+                    scale = width / 9 / hypot(dx, dy)
+                    self.away[dx, dy] = (
+                        int(round(dx * scale)), int(round(dy * scale)))
+        self.escapes = {}
+
+    def is_far(self, runner: Pair, player: Pair):
+        """ Returns whether the runner is a safe distance from the player. """
+        dx, dy = runner.x - player.x, runner.y - player.y
+        return dx * dx + dy * dy >= self.far
+
+    def target(self, runner: Pair, player: Pair, chaser: Pair, nommer: Pair):
+        """
+        Returns the position the runner should move toward. Callers may
+        add some randomness when the runner is far from the player.
+        """
+        if self.is_far(runner, player):
+            dx, dy = self.away[runner.x - nommer.x, runner.y - nommer.y]
+            return Pair(chaser.x + dx, chaser.y + dy)
+
+        cell = self.cell
+        key = (runner.x // cell, runner.y // cell,
+               player.x // cell, player.y // cell)
+        if key[:2] == key[2:]:
+            # The cell's center gives no direction to run in:
+            return Pair(*self.escape(runner.x, runner.y, player.x, player.y))
+        target = self.escapes.get(key)
+        if target is None:
+            center = (cell - 1) / 2
+            target = self.escapes[key] = self.escape(
+                *[i * cell + center for i in key])
+        return Pair(*target)
+
+    def escape(self, rx: float, ry: float, px: float, py: float):
+        """
+        Returns the target of a runner at (rx, ry) that is
+        near a player at (px, py), as a tuple. Not cached.
+        """
+        corners = sorted(
+            self.corners, reverse=True,
+            key=lambda c: hypot(rx - c[0], ry - c[1]))
+        corners.sort(key=lambda c: max(abs(px - c[0]), abs(py - c[1])))
+        corners = corners[2:]
+        corners.sort(
+            key=lambda c:
+            hypot(rx - c[0], ry - c[1]) - hypot(px - c[0], py - c[1]))
+        tx, ty = corners[0]
+
+        # Bias away from the player if they are close:
+        run_x, run_y = rx - px, ry - py
+        scale = (hypot(tx - rx, ty - ry) ** 2 / hypot(run_x, run_y)) ** 0.3
+        return (tx + int(round(run_x * scale)),
+                ty + int(round(run_y * scale)))
+
+
+@lru_cache(maxsize=None)
+def runner_planner(width: int):
+    """ Returns a RunnerPlanner shared by every game of a width. """
+    return RunnerPlanner(width)
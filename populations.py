@@ -0,0 +1,109 @@
+"""
+Key populations, grouped by count so that balanced key
+choices do not need to scan every key in a language.
+"""
+from random import randrange, uniform
+
+
+class Populations(dict):
+    """
+    A map from display keys to their number of occurrences in the grid.
+    Keys are also grouped into levels by their number of occurrences.
+    Only item assignment may be used to change populations.
+
+    Attributes:
+    -- levels   : dict{int: list{str}}  : Map from populations to the keys with them.
+    -- slots    : dict{str: int}        : Map from keys to their index in their level.
+    """
+    def __init__(self, items=()):
+        super(Populations, self).__init__()
+        self.levels = {}
+        self.slots = {}
+        for key, value in dict(items).items():
+            self[key] = value
+
+    @staticmethod
+    def fromkeys(keys, value: int = 0):
+        return Populations((key, value) for key in keys)
+
+    def __setitem__(self, key: str, value: int):
+        if key in self:
+            if self[key] == value:
+                return
+            self.__leave_level(key)
+        super(Populations, self).__setitem__(key, value)
+        level = self.levels.setdefault(value, [])
+        self.slots[key] = len(level)
+        level.append(key)
+
+    def __leave_level(self, key: str):
+        """
+        Removes key from its level in O(1) by
+        moving the last key of the level into its slot.
+        """
+        level = self.levels[self[key]]
+        last = level.pop()
+        if last != key:
+            slot = self.slots[key]
+            level[slot] = last
+            self.slots[last] = slot
+        if not level:
+            del self.levels[self[key]]
+
+    def rarest(self, excluded=frozenset()):
+        """
+        Returns a key with the lowest population that is not in
+        excluded, or None if every key is excluded. Only visits
+        levels until one has a key that is not excluded.
+        """
+        for value in sorted(self.levels):
+            for key in self.levels[value]:
+                if key not in excluded:
+                    return key
+        return None
+
+    def balanced_choice(self, excluded=frozenset(), base: float = 4):
+        """
+        Returns a random key that is not in excluded. Keys are weighted
+        by base ** (lowest - population), where lowest is the lowest
+        population of any key not in excluded.
+
+        Keys of a level share the same weight, so a level is drawn by
+        the total weight of its allowed keys, and then a key is drawn
+        uniformly from that level. The cost grows with the number of
+        excluded keys and levels rather than with the size of the language.
+        excluded must not hold every key.
+        """
+        # Count the excluded keys in each level:
+        blocked = {}
+        for key in excluded:
+            if key in self:
+                value = self[key]
+                blocked[value] = blocked.get(value, 0) + 1
+
+        # Weigh each level by its allowed keys:
+        weights = []
+        lowest = None
+        for value in sorted(self.levels):
+            allowed = len(self.levels[value]) - blocked.get(value, 0)
+            if allowed > 0:
+                if lowest is None:
+                    lowest = value
+                weights.append((value, allowed * base ** (lowest - value)))
+
+        # Choose a level:
+        w_choice = uniform(0, sum(weight for _, weight in weights))
+        for value, weight in weights:
+            if w_choice > weight:
+                w_choice -= weight
+            else:
+                break
+
+        # Choose a key from the level:
+        level = self.levels[value]
+        if blocked.get(value, 0) * 2 > len(level):
+            level = [key for key in level if key not in excluded]
+        while True:
+            key = level[randrange(len(level))]
+            if key not in excluded:
+                return key
@@ -0,0 +1,368 @@
+"""
+Records every tick of long sessions to memory-mapped files.
+
+A recording is three files of fixed-size records that grow as needed:
+-- path         : HEADER, then a TICK for each tick. Doubles as an index
+                  into the changes file.
+-- path.changes : a CHANGE for each tile that changed, in order.
+-- path.keyframes : a KEYFRAME of the whole board every few ticks, so a
+                  reader can rebuild any tick without replaying from
+                  the last reset. See replay.py.
+
+Reading a recording requires numpy. Records are exposed as structured
+arrays mapped from the files, so only the parts that are indexed are
+loaded. The header's counts are updated after each tick, so a
+recording can be read while it is still being written.
+
+A recording holds one language. If the game restarts with another,
+the recording stops there, and what was recorded stays readable.
+
+Run with: python recorder.py path [ticks]
+to record a random headless game and summarize it.
+"""
+import mmap
+import os
+from struct import Struct
+from time import perf_counter
+
+import events
+
+
+MAGIC = b'SNKR'
+VERSION = 2
+# magic, version, width, number of ticks, number of changes, language,
+# number of keyframes:
+HEADER = Struct('<4sBxHQQ64sQ')
+# seconds since recording began, score, losses, heat, (x, y) of the
+# player, chaser, nommer and runner, index of the tick's first change,
+# number of changes, flags:
+TICK = Struct('<diid8HQII')
+# x, y, value, kind:
+CHANGE = Struct('<HHHBx')
+
+# Flags of a tick:
+RESET = 1
+
+# Kinds of changes. The value of a KEY change is the index of the
+# tile's new key in the language, or CHARACTER under characters:
+KEY = 0
+TARGET_SPAWNED = 1
+TARGET_EATEN = 2
+TRAIL_PUSHED = 3
+TRAIL_POPPED = 4
+CHARACTER = 0xFFFF
+
+# Most ticks between a reset or keyframe and the next keyframe:
+KEYFRAME_EVERY = 256
+
+CHANGE_KINDS = {
+    events.TargetSpawned: TARGET_SPAWNED,
+    events.TargetEaten: TARGET_EATEN,
+    events.TrailPushed: TRAIL_PUSHED,
+    events.TrailPopped: TRAIL_POPPED, }
+
+
+def keyframe_struct(width: int):
+    """
+    Returns the Struct of a KEYFRAME of a board of width: the index of
+    the tick it is the state after, then the value of each tile's KEY
+    change, whether each tile is a target, and how many times each tile
+    is in the trail, in row-order.
+    """
+    n = width ** 2
+    return Struct(f'<Q{n}H{n}B{n}B')
+
+
+class _Appender:
+    """
+    A file of fixed-size records after a header, memory-mapped.
+    Its capacity doubles when it fills up, and is trimmed on close.
+
+    Attributes:
+    -- record       : Struct            : Format of each record.
+    -- count        : int               : Number of records appended.
+    -- capacity     : int               : Number of records that fit in the map.
+    """
+    def __init__(self, path: str, record: Struct, header_size: int = 0,
+                 capacity: int = 1024):
+        self.file = open(path, 'w+b')
+        self.record = record
+        self.header_size = header_size
+        self.count = 0
+        self.capacity = 0
+        self.map = None
+        self.__resize(capacity)
+
+    def __resize(self, capacity: int):
+        if self.map is not None:
+            self.map.close()
+        self.capacity = capacity
+        self.file.truncate(self.header_size + capacity * self.record.size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+    def append(self, *values):
+        if self.count == self.capacity:
+            self.__resize(self.capacity * 2)
+        self.record.pack_into(
+            self.map, self.header_size + self.count * self.record.size,
+            *values)
+        self.count += 1
+
+    def close(self):
+        self.map.close()
+        self.file.truncate(self.header_size + self.count * self.record.size)
+        self.file.close()
+
+
+class Recorder:
+    """
+    Records a game to path. Changed tiles are collected from the game's
+    events, and written with the game's header fields on each tick().
+
+    Attributes:
+    -- game         : Game              :
+    -- ticks        : _Appender         : TICK records, after the header.
+    -- changes      : _Appender         : CHANGE records.
+    -- keyframes    : _Appender         : KEYFRAME records.
+    -- keyframe_every : int             : Most ticks between full states.
+    -- since_full   : int               : Ticks since the last reset or keyframe.
+    -- first        : int               : Index of the next tick's first change.
+    -- flags        : int               : Flags of the next tick.
+    -- start        : float             : perf_counter() when recording began.
+    -- stopped      : bool              : Whether the files are closed. Set by
+                                          close(), or when the language changes.
+    """
+    def __init__(self, path: str, game, keyframe_every: int = KEYFRAME_EVERY):
+        self.game = game
+        self.path = path
+        self.stopped = False
+        self.language = game.lang_name
+        if len(self.language.encode()) > 64:
+            raise ValueError(f'The name of {self.language} is too long to record.')
+        self.index = {k: i for i, k in enumerate(game.language)}
+        self.ticks = _Appender(path, TICK, HEADER.size)
+        self.changes = _Appender(path + '.changes', CHANGE)
+        self.keyframes = _Appender(
+            path + '.keyframes', keyframe_struct(game.width), capacity=16)
+        self.keyframe_every = keyframe_every
+        self.since_full = 0
+        self.first = 0
+        self.flags = 0
+        self.start = perf_counter()
+        self.__write_header()
+        game.subscribe(
+            self.on_event,
+            events.KeyChanged, events.TargetSpawned, events.TargetEaten,
+            events.TrailPushed, events.TrailPopped, events.Reset, )
+        self.on_event(events.Reset())
+
+    def __write_header(self):
+        HEADER.pack_into(
+            self.ticks.map, 0, MAGIC, VERSION, self.game.width,
+            self.ticks.count, self.changes.count, self.language.encode(),
+            self.keyframes.count)
+
+    def on_event(self, event):
+        """ Appends the tiles changed by event. """
+        if self.stopped:
+            return
+        kind = type(event)
+        if kind is events.KeyChanged:
+            pos = event.tile.pos
+            self.changes.append(
+                pos.x, pos.y, self.index.get(event.key, CHARACTER), KEY)
+        elif kind is events.Reset:
+            self.__record_all()
+        else:
+            pos = event.tile.pos
+            self.changes.append(pos.x, pos.y, 0, CHANGE_KINDS[kind])
+
+    def __record_all(self):
+        """
+        Drops the changes of the current tick, and instead
+        records every tile's key, and every target and trail tile.
+        """
+        game = self.game
+        if game.lang_name != self.language:
+            # Keys of the new language cannot be recorded. This is called
+            # back by the game, so stop instead of raising into it:
+            self.changes.count = self.first
+            self.__stop()
+            return
+        self.changes.count = self.first
+        self.flags |= RESET
+        for tile in game.grid:
+            self.changes.append(
+                tile.pos.x, tile.pos.y,
+                self.index.get(tile.key.get(), CHARACTER), KEY)
+        for tile in game.targets:
+            self.changes.append(tile.pos.x, tile.pos.y, 0, TARGET_SPAWNED)
+        for tile in game.trail:
+            self.changes.append(tile.pos.x, tile.pos.y, 0, TRAIL_PUSHED)
+
+    def tick(self):
+        """
+        Records the game's state and the changes since the
+        last tick. Does nothing once the recording stopped.
+        """
+        if self.stopped:
+            return
+        game = self.game
+        positions = []
+        for pos in (game.player, game.chaser, game.nommer, game.runner):
+            positions.extend((pos.x, pos.y))
+        self.ticks.append(
+            perf_counter() - self.start, game.score.get(),
+            game.losses.get(), game.heat, *positions,
+            self.first, self.changes.count - self.first, self.flags)
+        self.first = self.changes.count
+        if self.flags & RESET:
+            self.since_full = 0
+        else:
+            self.since_full += 1
+            if self.since_full >= self.keyframe_every:
+                self.__record_keyframe()
+        self.flags = 0
+        self.__write_header()
+
+    def __record_keyframe(self):
+        """ Records the whole board as the state after the last tick. """
+        game = self.game
+        width = game.width
+        targets = bytearray(width ** 2)
+        for tile in game.targets:
+            targets[width * tile.pos.y + tile.pos.x] = 1
+        trail = bytearray(width ** 2)
+        for tile in game.trail:
+            i = width * tile.pos.y + tile.pos.x
+            trail[i] = min(trail[i] + 1, 255)
+        self.keyframes.append(
+            self.ticks.count - 1,
+            *[self.index.get(t.key.get(), CHARACTER) for t in game.grid],
+            *targets, *trail)
+        self.since_full = 0
+
+    def __stop(self):
+        """ Trims the files to their records, and closes them. """
+        self.stopped = True
+        self.__write_header()
+        self.ticks.close()
+        self.changes.close()
+        self.keyframes.close()
+
+    def close(self):
+        """ Stops recording. """
+        self.game.unsubscribe(self.on_event)
+        if not self.stopped:
+            self.__stop()
+
+
+class Recording:
+    """
+    A recording opened for reading. Requires numpy.
+
+    Attributes:
+    -- width        : int               : See Game.width.
+    -- language     : list{str}         : Display keys, indexed by KEY changes.
+    -- ticks        : memmap            : A structured array of every tick.
+    -- changes      : memmap            : A structured array of every change.
+    -- keyframes    : ndarray           : A structured array of every keyframe.
+                                          Empty for recordings made without them.
+    """
+    def __init__(self, path: str):
+        import numpy as np
+        with open(path, 'rb') as file:
+            (magic, version, self.width, num_ticks, num_changes,
+             lang_choice, num_keyframes) = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a compatible recording.')
+        from languages import LANGUAGES
+        self.language = list(LANGUAGES[lang_choice.rstrip(b'\0').decode()])
+        self.ticks = np.memmap(
+            path, dtype=self.tick_dtype(), mode='r',
+            offset=HEADER.size, shape=(num_ticks,))
+        self.changes = np.memmap(
+            path + '.changes', dtype=self.change_dtype(), mode='r',
+            shape=(num_changes,))
+        if num_keyframes:
+            self.keyframes = np.memmap(
+                path + '.keyframes', dtype=self.keyframe_dtype(self.width),
+                mode='r', shape=(num_keyframes,))
+        else:
+            self.keyframes = np.zeros(0, dtype=self.keyframe_dtype(self.width))
+
+    @staticmethod
+    def tick_dtype():
+        import numpy as np
+        positions = [
+            (f'{character}_{axis}', '<u2')
+            for character in ('player', 'chaser', 'nommer', 'runner')
+            for axis in 'xy']
+        dtype = np.dtype([
+            ('time', '<f8'), ('score', '<i4'), ('losses', '<i4'),
+            ('heat', '<f8'), *positions, ('first', '<u8'),
+            ('count', '<u4'), ('flags', '<u4'), ])
+        assert dtype.itemsize == TICK.size
+        return dtype
+
+    @staticmethod
+    def change_dtype():
+        import numpy as np
+        dtype = np.dtype([
+            ('x', '<u2'), ('y', '<u2'), ('value', '<u2'),
+            ('kind', 'u1'), ('', 'V1'), ])
+        assert dtype.itemsize == CHANGE.size
+        return dtype
+
+    @staticmethod
+    def keyframe_dtype(width: int):
+        import numpy as np
+        n = width ** 2
+        dtype = np.dtype([
+            ('tick', '<u8'), ('keys', '<u2', (n,)),
+            ('targets', 'u1', (n,)), ('trail', 'u1', (n,)), ])
+        assert dtype.itemsize == keyframe_struct(width).size
+        return dtype
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def changes_of(self, start: int, stop: int = None):
+        """ Returns the changes recorded in ticks [start, stop). """
+        stop = start + 1 if stop is None else stop
+        if start >= stop:
+            return self.changes[:0]
+        first = int(self.ticks[start]['first'])
+        last = self.ticks[stop - 1]
+        return self.changes[first:int(last['first']) + int(last['count'])]
+
+
+if __name__ == '__main__':
+    import sys
+    from random import choice
+    from engine import Game
+    path = sys.argv[1]
+    num_ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    game = Game(20, headless=True)
+    keys = list(game.language.values())
+    recorder = Recorder(path, game)
+    for i in range(num_ticks):
+        game.move_player(choice(keys))
+        if i % 2 == 0:
+            game.move_nommer()
+        if i % 3 == 0:
+            game.move_runner()
+        if i % 4 == 0 and game.move_chaser():
+            game.restart()
+        recorder.tick()
+    recorder.close()
+
+    recording = Recording(path)
+    ticks = recording.ticks
+    size = os.path.getsize(path) + os.path.getsize(path + '.changes')
+    size += os.path.getsize(path + '.keyframes')
+    print(f'{len(recording)} ticks, {len(recording.changes)} changes,'
+          f' {len(recording.keyframes)} keyframes, {size / 2 ** 20:.1f} MiB')
+    print(f'resets {int((ticks["flags"] & RESET != 0).sum())},'
+          f' best score {ticks["score"].max()},'
+          f' mean heat {ticks["heat"].mean():.2f}')
@@ -0,0 +1,279 @@
+"""
+Views recordings made by recorder.py, with scrubbing and playback
+speed controls. Requires numpy.
+
+Seeking to a tick starts from the last full state of the board before
+it, which is either a keyframe or a reset, and applies the changes of
+the few ticks after that. Playing applies each tick's changes in turn.
+
+Run with: python replay.py path [color scheme]
+"""
+from time import perf_counter
+
+import numpy as np
+
+import colors as _colors
+from engine import Game
+from recorder import (
+    Recording, RESET, KEY, TARGET_SPAWNED, TARGET_EATEN,
+    TRAIL_PUSHED, TRAIL_POPPED, CHARACTER)
+import tkinter as tk
+from tkinter import ttk
+
+
+CHARACTERS = ('player', 'chaser', 'nommer', 'runner')
+# Playback speeds shown in the GUI, as multiples of real time:
+SPEEDS = ('0.25', '0.5', '1', '2', '4', '8', '16', '64')
+# Most ticks to play by applying changes before seeking instead:
+MAX_PLAYED_TICKS = 64
+# Milliseconds between frames of playback:
+FRAME_MS = 30
+
+
+class Replay:
+    """
+    The state of a recorded board at one of its ticks.
+
+    Attributes:
+    -- recording    : Recording         :
+    -- tick         : int               : Index of the tick shown. -1 before seeking.
+    -- keys         : list{int}         : Value of each tile's last KEY change.
+    -- targets      : bytearray         : Whether each tile is a target.
+    -- trail        : list{int}         : How many times each tile is in the trail.
+    -- resets       : ndarray           : Indices of ticks that reset the board.
+    """
+    def __init__(self, recording: Recording):
+        self.recording = recording
+        self.tick = -1
+        n = recording.width ** 2
+        self.keys = [CHARACTER] * n
+        self.targets = bytearray(n)
+        self.trail = [0] * n
+        self.resets = np.flatnonzero(recording.ticks['flags'] & RESET)
+
+    def __len__(self):
+        return len(self.recording)
+
+    def seek(self, tick: int):
+        """
+        Shows the state after tick, from the last keyframe
+        or reset at or before it. Returns the number of
+        ticks whose changes were applied to get there.
+        """
+        recording = self.recording
+        tick = min(max(tick, 0), len(recording) - 1)
+        if 0 <= self.tick <= tick:
+            start = self.tick + 1
+        else:
+            start = 0
+        reset = self.resets[np.searchsorted(self.resets, tick, 'right') - 1]
+        start = max(start, int(reset))
+        keyframes = recording.keyframes
+        i = np.searchsorted(keyframes['tick'], tick, 'right') - 1
+        if i >= 0 and int(keyframes[i]['tick']) >= start:
+            keyframe = keyframes[i]
+            self.keys = keyframe['keys'].tolist()
+            self.targets = bytearray(keyframe['targets'].tobytes())
+            self.trail = keyframe['trail'].tolist()
+            start = int(keyframe['tick']) + 1
+        for t in range(start, tick + 1):
+            self.__apply(t)
+        self.tick = tick
+        return tick + 1 - start
+
+    def advance(self):
+        """ Shows the next tick, if there is one. """
+        if self.tick + 1 < len(self.recording):
+            self.__apply(self.tick + 1)
+            self.tick += 1
+
+    def __apply(self, tick: int):
+        """ Applies the changes of tick to the state before it. """
+        if self.recording.ticks[tick]['flags'] & RESET:
+            n = self.recording.width ** 2
+            self.targets = bytearray(n)
+            self.trail = [0] * n
+        width = self.recording.width
+        keys, targets, trail = self.keys, self.targets, self.trail
+        changes = self.recording.changes_of(tick)
+        for x, y, value, kind in zip(
+                changes['x'].tolist(), changes['y'].tolist(),
+                changes['value'].tolist(), changes['kind'].tolist()):
+            i = width * y + x
+            if kind == KEY:
+                keys[i] = value
+            elif kind == TARGET_SPAWNED:
+                targets[i] = 1
+            elif kind == TARGET_EATEN:
+                targets[i] = 0
+            elif kind == TRAIL_PUSHED:
+                trail[i] += 1
+            elif kind == TRAIL_POPPED:
+                trail[i] -= 1
+
+    def header(self):
+        """ Returns the TICK record of the tick shown. """
+        return self.recording.ticks[self.tick]
+
+    def tiles(self):
+        """ Returns (key, role) for each tile of the tick shown, in row-order. """
+        width = self.recording.width
+        header = self.header()
+        characters = {
+            width * int(header[f'{c}_y']) + int(header[f'{c}_x']): c
+            for c in reversed(CHARACTERS)}
+        language = self.recording.language
+        tiles = []
+        for i, value in enumerate(self.keys):
+            character = characters.get(i)
+            if character is not None:
+                tiles.append((Game.faces[character], character))
+            else:
+                key = '' if value == CHARACTER else language[value]
+                role = 'target' if self.targets[i] else \
+                    'trail' if self.trail[i] else 'tile'
+                tiles.append((key, role))
+        return tiles
+
+
+class ReplayGUI(tk.Tk):
+    """
+    Views the recording at path.
+
+    Attributes:
+    -- replay       : Replay            :
+    -- playing      : bool              :
+    -- clock        : float             : The recording's time shown, in seconds.
+    -- last_frame   : float             : perf_counter() at the last frame.
+    -- play_id      : str               : The pending call to play(), or None.
+    -- shown        : list{tuple}       : The (key, role) shown by each label.
+    -- position     : tk.DoubleVar      : The tick under the scrubber.
+    -- speed        : tk.StringVar      : One of SPEEDS.
+    """
+    def __init__(self, path: str, cs: str = 'dark - nw'):
+        super(ReplayGUI, self).__init__()
+        self.title(f'SnaKey replay - {path}')
+        self.replay = Replay(Recording(path))
+        width = self.replay.recording.width
+        self.playing = False
+        self.clock = 0.0
+        self.last_frame = None
+        self.play_id = None
+
+        # Setup the grid display, as in game.SnaKeyGUI:
+        self.style = ttk.Style(self)
+        self.style.configure(
+            _colors.TILE_STYLE, font=('system', 9, 'bold'), anchor='center')
+        self.styles = {role: _colors.style_name(role) for role in _colors.ROLES}
+        grid = tk.Frame(self, _colors.color_schemes[cs]['lines'])
+        self.labels = []
+        for y in range(width):
+            for x in range(width):
+                label = ttk.Label(grid, width=1, style=self.styles['tile'])
+                label.grid(row=y, column=x, ipadx=4, padx=1, pady=1)
+                self.labels.append(label)
+        grid.pack()
+        self.shown = [None] * len(self.labels)
+        for style, background, foreground in _colors.compiled_scheme(cs):
+            self.style.configure(
+                style, background=background, foreground=foreground)
+
+        # Setup the controls:
+        bar = tk.Frame(self)
+        self.play_button = tk.Button(
+            bar, text='play', width=8, command=self.toggle,
+            relief='ridge', bd=1, )
+        self.play_button.grid(row=0, column=0)
+        self.speed = tk.StringVar()
+        self.speed.set('1')
+        speed = tk.OptionMenu(bar, self.speed, *SPEEDS)
+        speed.grid(row=0, column=1)
+        tk.Label(bar, text='x').grid(row=0, column=2)
+        self.status = tk.StringVar()
+        tk.Label(bar, width=40, anchor='w', textvariable=self.status) \
+            .grid(row=0, column=3)
+        bar.pack()
+        self.position = tk.DoubleVar()
+        scrubber = ttk.Scale(
+            self, from_=0, to=max(len(self.replay) - 1, 0),
+            orient='horizontal', variable=self.position,
+            command=self.scrub, )
+        scrubber.pack(fill='x', padx=4, pady=4)
+
+        self.bind('<space>', lambda _: self.toggle())
+        self.bind('<Left>', lambda _: self.show(self.replay.tick - 1))
+        self.bind('<Right>', lambda _: self.show(self.replay.tick + 1))
+        self.show(0)
+
+    def show(self, tick: int):
+        """ Seeks to tick, and shows it. """
+        replay = self.replay
+        if not len(replay):
+            return
+        replay.seek(tick)
+        self.clock = float(replay.header()['time'])
+        self.render()
+
+    def scrub(self, value):
+        tick = int(float(value))
+        if tick != self.replay.tick:
+            self.show(tick)
+
+    def toggle(self):
+        """ Plays or pauses. """
+        self.playing = not self.playing
+        self.play_button['text'] = 'pause' if self.playing else 'play'
+        if self.playing:
+            if self.replay.tick + 1 >= len(self.replay):
+                self.show(0)
+            self.last_frame = perf_counter()
+            self.play_id = self.after(FRAME_MS, self.play)
+        elif self.play_id is not None:
+            self.after_cancel(self.play_id)
+            self.play_id = None
+
+    def play(self):
+        """
+        Advances the clock by the time since the last frame, times
+        the speed, and shows the last tick recorded before it.
+        """
+        now = perf_counter()
+        self.clock += (now - self.last_frame) * float(self.speed.get())
+        self.last_frame = now
+        replay = self.replay
+        times = replay.recording.ticks['time']
+        tick = int(np.searchsorted(times, self.clock, 'right')) - 1
+        tick = max(tick, replay.tick)
+        if tick - replay.tick > MAX_PLAYED_TICKS:
+            replay.seek(tick)
+        else:
+            while replay.tick < tick:
+                replay.advance()
+        self.render()
+        if replay.tick + 1 >= len(replay):
+            self.toggle()
+        else:
+            self.play_id = self.after(FRAME_MS, self.play)
+
+    def render(self):
+        """ Configures the labels whose key or role changed. """
+        for i, tile in enumerate(self.replay.tiles()):
+            if self.shown[i] != tile:
+                if self.shown[i] is None or self.shown[i][1] != tile[1]:
+                    self.labels[i].configure(
+                        text=tile[0], style=self.styles[tile[1]])
+                else:
+                    self.labels[i].configure(text=tile[0])
+                self.shown[i] = tile
+        header = self.replay.header()
+        self.position.set(self.replay.tick)
+        self.status.set(
+            f'tick {self.replay.tick + 1}/{len(self.replay)}'
+            f'  {float(header["time"]):.1f}s'
+            f'  score {int(header["score"])}'
+            f'  losses {int(header["losses"])}')
+
+
+if __name__ == '__main__':
+    import sys
+    ReplayGUI(*sys.argv[1:3]).mainloop()
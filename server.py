@@ -0,0 +1,417 @@
+"""
+Serves shared SnaKey boards to networked players over TCP.
+
+Every room holds one headless Game. All players in a room share
+the board, the targets, the losses, and the chaser, nommer and runner.
+
+Protocol (newline-delimited, utf-8):
+-- The first line a client sends is the name of the room to join.
+   Every line after that is a tk keysym (ie. 'a', 'space').
+-- The server replies with one 'board' message holding the full
+   board, then one 'delta' message per tick in which anything changed.
+   Messages are compact JSON objects. See Room.board and Room.delta.
+-- Clients that fall more than MAX_BUFFERED bytes behind are dropped,
+   and so are clients whose first line is not a room name.
+
+Run with: python server.py [port] [width]
+"""
+import asyncio
+import json
+import logging
+from random import choice
+from time import time
+
+import events
+from engine import Game, Pair
+from stats import MoveStats
+
+
+TICK_RATE = 20  # Ticks per second.
+# Most bytes waiting to be sent to a client before it is dropped:
+MAX_BUFFERED = 1 << 20
+# Longest line accepted as a keysym. Longer lines are ignored:
+MAX_KEYSYM = 32
+# Longest room name, in characters:
+MAX_ROOM_NAME = 64
+
+log = logging.getLogger(__name__)
+
+
+def encode(message: dict):
+    """ Returns the wire format of a message. """
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def trail_change(old: list, new: list):
+    """
+    Returns [drop, keep, added], such that new is old without its first
+    drop indices, then its next keep indices, and then added. Pushes,
+    pops and trims of a trail take one or two indices to describe.
+    """
+    best = (0, 0)
+    for drop in range(len(old) + 1):
+        keep = 0
+        limit = min(len(old) - drop, len(new))
+        while keep < limit and old[drop + keep] == new[keep]:
+            keep += 1
+        if keep > best[1]:
+            best = (drop, keep)
+        if keep == len(old) - drop:
+            # Dropping more cannot keep more.
+            break
+    drop, keep = best
+    return [drop, keep, new[keep:]]
+
+
+class Seat:
+    """
+    The player-specific state of one client in a Room.
+    Only one seat's state is loaded into the room's Game at a time.
+
+    Attributes:
+    -- id           : int               : Unique within a room.
+    -- writer       : StreamWriter      : Where messages for this seat are sent.
+    -- player       : Pair              : The seat's position on the board.
+    -- trail        : list{Tile}        : See Game.trail.
+    -- move_str     : str               : See Game.move_str. Kept shorter than the
+                                          longest typing key by Game.move_player.
+    -- time_start   : float             : See Game.time_start.
+    -- moves        : MoveStats         : See Game.moves.
+    -- misses       : int               : See Game.misses.
+    -- score        : int               : number of targets reached by this seat.
+    """
+    def __init__(self, seat_id: int, writer, player: Pair):
+        self.id = seat_id
+        self.writer = writer
+        self.player = player
+        self.trail = []
+        self.move_str = ''
+        self.time_start = time()
+        self.moves = MoveStats()
+        self.misses = 0
+        self.score = 0
+
+    def load(self, game: Game):
+        """ Makes this seat the player of game. """
+        game.player = self.player
+        game.trail = self.trail
+        game.move_str = self.move_str
+        game.time_start = self.time_start
+        game.moves = self.moves
+        game.misses = self.misses
+        game.score.set(self.score)
+
+    def store(self, game: Game):
+        """ Saves the state of game's player into this seat. """
+        self.player = game.player
+        self.trail = game.trail
+        self.move_str = game.move_str
+        self.time_start = game.time_start
+        self.moves = game.moves
+        self.misses = game.misses
+        self.score = game.score.get()
+
+
+class Room:
+    """
+    A shared board and the seats playing on it.
+
+    Attributes:
+    -- game         : Game              : Headless. Holds the shared state.
+    -- seats        : dict{int: Seat}   : Map from seat ids to seats.
+    -- dirty        : set{int}          : Grid indices of tiles whose keys
+                                          changed since the last delta.
+    -- last         : dict              : The last value of every delta
+                                          field, used to skip repeats.
+    -- trails       : dict{int: list}   : Map from seat ids to the grid indices
+                                          of their trails, as of the last delta.
+    -- next_move    : dict{str: float}  : Time of each enemy's next move.
+    """
+    def __init__(self, width: int, lang_choice: str = 'english lower'):
+        self.game = Game(width, lang_choice, headless=True)
+        self.seats = {}
+        self.next_id = 0
+        self.dirty = set()
+        self.game.subscribe(self.on_key_changed, events.KeyChanged)
+        self.last = {}
+        self.trails = {}
+        now = time()
+        self.next_move = {
+            'chaser': now + 0.8,
+            'nommer': now + 0.15,
+            'runner': now + 0.5, }
+
+    def on_key_changed(self, event: events.KeyChanged):
+        pos = event.tile.pos
+        self.dirty.add(pos.y * self.game.width + pos.x)
+
+    def join(self, writer):
+        """
+        Adds a seat to the room. The first seat takes
+        over the player spawned by the game. Others
+        spawn on a random free tile.
+        """
+        game = self.game
+        if not self.seats:
+            player = game.player
+        else:
+            player = choice([
+                t for t in game.grid
+                if not game.is_character(t) and t not in game.targets]).pos
+            game.occupy(player, 'player')
+        seat = Seat(self.next_id, writer, player)
+        self.next_id += 1
+        self.seats[seat.id] = seat
+        return seat
+
+    def leave(self, seat: Seat):
+        """
+        Removes a seat from the room, if it is still in it. The
+        last seat's player stays on the board as a statue.
+        """
+        if self.seats.pop(seat.id, None) is None:
+            return
+        if self.seats:
+            self.game.vacate(seat.player)
+
+    def press(self, seat: Seat, keysym: str):
+        """ Applies a keystroke from seat to the board. """
+        seat.load(self.game)
+        self.game.move_player(keysym)
+        seat.store(self.game)
+
+    def nearest(self, pos: Pair):
+        """ Returns the seat closest to pos. """
+        return min(
+            self.seats.values(),
+            key=lambda s: (s.player - pos).square_norm())
+
+    def step(self, now: float):
+        """
+        Moves each enemy whose turn has come. Enemies
+        treat the seat nearest to them as the player.
+        """
+        game = self.game
+        if now >= self.next_move['chaser']:
+            seat = self.nearest(game.chaser)
+            seat.load(game)
+            if game.move_chaser():
+                self.respawn(seat)
+            else:
+                seat.store(game)
+            self.next_move['chaser'] = now + game.chaser_period()
+
+        if now >= self.next_move['nommer']:
+            seat = self.nearest(game.nommer)
+            seat.load(game)
+            game.move_nommer()
+            seat.store(game)
+            self.next_move['nommer'] = now + game.nommer_period()
+
+        if now >= self.next_move['runner']:
+            seat = self.nearest(game.runner)
+            seat.load(game)
+            game.move_runner()
+            seat.store(game)
+            self.next_move['runner'] = now + game.runner_period()
+
+    def respawn(self, seat: Seat):
+        """
+        Called when the chaser catches seat. The chaser keeps
+        the tile, and the seat restarts somewhere else.
+        """
+        game = self.game
+        player = choice([
+            t for t in game.grid
+            if not game.is_character(t) and t not in game.targets]).pos
+        game.occupy(player, 'player')
+        seat.player = player
+        seat.trail = []
+        seat.move_str = ''
+        seat.time_start = time()
+        seat.moves = MoveStats()
+        seat.misses = 0
+        seat.score = 0
+
+    def board(self):
+        """
+        Returns a message with the full state of the board:
+        -- w: width, l: language, k: all keys in row-order.
+        Followed by a delta with every field.
+        """
+        game = self.game
+        return {
+            't': 'board',
+            'w': game.width,
+            'l': game.language,
+            'k': [tile.key.get() for tile in game.grid], }
+
+    def fields(self):
+        """
+        Returns the current value of every delta field except k and r:
+        -- e: [chaser x, y, nommer x, y, runner x, y].
+        -- p: [[seat id, x, y, score], ...].
+        -- g: target indices.
+        -- s: losses.
+        """
+        game = self.game
+        width = game.width
+        return {
+            'e': [game.chaser.x, game.chaser.y,
+                  game.nommer.x, game.nommer.y,
+                  game.runner.x, game.runner.y],
+            'p': [[s.id, s.player.x, s.player.y, s.score]
+                  for s in self.seats.values()],
+            'g': [t.pos.y * width + t.pos.x for t in game.targets],
+            's': game.losses.get(), }
+
+    def current_trails(self):
+        """ Returns a map from seat ids to their trails' grid indices. """
+        width = self.game.width
+        return {
+            s.id: [t.pos.y * width + t.pos.x for t in s.trail]
+            for s in self.seats.values()}
+
+    @staticmethod
+    def trail_changes(old: dict, new: dict):
+        """
+        Returns the r field of a delta from trails old to new:
+        -- r: [[seat id, drop, keep, [added indices]], ...]. See trail_change.
+        Trails of seats that left are dropped with their entries in p.
+        """
+        return [
+            [seat_id, *trail_change(old.get(seat_id, []), trail)]
+            for seat_id, trail in new.items()
+            if old.get(seat_id) != trail]
+
+    def full_delta(self):
+        """ Returns a delta with every field, for a newcomer. """
+        return dict(
+            self.fields(), r=self.trail_changes({}, self.current_trails()),
+            t='delta')
+
+    def delta(self):
+        """
+        Returns a message with the changes since the last delta, or
+        None if nothing changed. Unchanged fields are omitted. Besides
+        those of fields(), k holds [[index, key], ...] for tiles
+        whose keys changed, and r the changes of trails.
+        """
+        game = self.game
+        message = {}
+        if self.dirty:
+            message['k'] = [[i, game.grid[i].key.get()] for i in self.dirty]
+            self.dirty.clear()
+        current = self.fields()
+        for field, value in current.items():
+            if self.last.get(field) != value:
+                message[field] = value
+        self.last = current
+        trails = self.current_trails()
+        changes = self.trail_changes(self.trails, trails)
+        if changes:
+            message['r'] = changes
+        self.trails = trails
+        if not message:
+            return None
+        message['t'] = 'delta'
+        return message
+
+    def broadcast(self, message: dict):
+        """
+        Serializes message once and sends it to every seat. Seats
+        whose clients fell too far behind are dropped instead.
+        """
+        data = encode(message)
+        for seat in list(self.seats.values()):
+            writer = seat.writer
+            if writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                log.warning('dropping seat %d: it fell behind', seat.id)
+                self.leave(seat)
+                writer.close()
+            else:
+                writer.write(data)
+
+
+class Server:
+    """
+    Accepts clients and runs the ticks of every room.
+
+    Attributes:
+    -- width        : int               : Width of boards in new rooms.
+    -- rooms        : dict{str: Room}   : Map from room names to rooms.
+    """
+    def __init__(self, width: int = 20):
+        self.width = width
+        self.rooms = {}
+
+    async def handle(self, reader, writer):
+        """ Serves one client for as long as it is connected. """
+        try:
+            name = (await reader.readline()).decode(errors='replace').strip()
+        except (ConnectionError, ValueError):
+            name = ''
+        if not name or len(name) > MAX_ROOM_NAME:
+            writer.close()
+            return
+        room = self.rooms.get(name)
+        if room is None:
+            room = self.rooms[name] = Room(self.width)
+        seat = room.join(writer)
+
+        # The newcomer needs the full state. Everyone else
+        # receives the newcomer's changes at the next tick:
+        writer.write(encode(room.board()))
+        writer.write(encode(room.full_delta()))
+        try:
+            while seat.id in room.seats:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The reader dropped a line longer than its limit.
+                    continue
+                if not line:
+                    break
+                keysym = line.decode(errors='replace').strip()
+                if len(keysym) <= MAX_KEYSYM:
+                    room.press(seat, keysym)
+        except ConnectionError:
+            pass
+        except Exception:
+            log.exception('error in room %r', name)
+        finally:
+            room.leave(seat)
+            if not room.seats and self.rooms.get(name) is room:
+                del self.rooms[name]
+            writer.close()
+
+    async def tick(self):
+        """ Steps and broadcasts every room TICK_RATE times a second. """
+        while True:
+            now = time()
+            for name, room in list(self.rooms.items()):
+                if not room.seats:
+                    continue
+                # One room's error must not stop the others:
+                try:
+                    room.step(now)
+                    message = room.delta()
+                    if message is not None:
+                        room.broadcast(message)
+                except Exception:
+                    log.exception('error in room %r', name)
+            await asyncio.sleep(1 / TICK_RATE)
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.tick())
+
+
+if __name__ == '__main__':
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    args = sys.argv[1:]
+    asyncio.run(Server(
+        width=int(args[1]) if len(args) > 1 else 20).serve(
+        port=int(args[0]) if args else 8765))
@@ -0,0 +1,202 @@
+"""
+Finished games and leaderboards in a local SQLite database.
+
+Sessions are buffered and written in batches, each in one transaction.
+Beside the sessions table, a table of how many sessions got each score
+on each board (language and width) is kept in the same transactions,
+so a percentile rank sums a few hundred counts instead of counting
+every session, however many are stored.
+
+Run with: python sessions.py path [number of sessions]
+to fill a database with random sessions and time its queries.
+"""
+import sqlite3
+from collections import namedtuple
+from time import time
+
+
+# duration is in seconds, and finished in seconds since the epoch. moves,
+# average, p50 and p90 are from MoveStats.as_dict(), in seconds:
+Session = namedtuple(
+    'Session', 'language width score losses duration moves'
+               ' average p50 p90 finished')
+
+# Most sessions to buffer before writing them:
+BATCH_SIZE = 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id          INTEGER PRIMARY KEY,
+    language    TEXT NOT NULL,
+    width       INTEGER NOT NULL,
+    score       INTEGER NOT NULL,
+    losses      INTEGER NOT NULL,
+    duration    REAL NOT NULL,
+    moves       INTEGER NOT NULL,
+    average     REAL,
+    p50         REAL,
+    p90         REAL,
+    finished    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_board
+    ON sessions (language, width, score DESC, losses);
+CREATE TABLE IF NOT EXISTS score_counts (
+    language    TEXT NOT NULL,
+    width       INTEGER NOT NULL,
+    score       INTEGER NOT NULL,
+    count       INTEGER NOT NULL,
+    PRIMARY KEY (language, width, score)
+) WITHOUT ROWID;
+"""
+
+
+def session_of(language: str, width: int, score: int, losses: int,
+               stats: dict, started: float, finished: float = None):
+    """
+    Returns a Session of a game on a board, which began at started and
+    finished at finished, in seconds since the epoch. finished defaults
+    to now. stats is from Game.stats(), ie. as of a worker.Frame.
+    """
+    if finished is None:
+        finished = time()
+    return Session(
+        language, width, score, losses, finished - started,
+        stats['moves'], stats['average'], stats['p50'], stats['p90'],
+        finished)
+
+
+class SessionStore:
+    """
+    Attributes:
+    -- path         : str               :
+    -- connection   : sqlite3.Connection:
+    -- pending      : list{Session}     : Sessions not yet written.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # Commit without waiting for each batch to reach the disk.
+        # A crash may lose the last batches, but never corrupts the rest:
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.executescript(SCHEMA)
+        self.pending = []
+
+    def add(self, session: Session):
+        """ Buffers a session, and writes the buffer once it is full. """
+        self.pending.append(session)
+        if len(self.pending) >= BATCH_SIZE:
+            self.flush()
+
+    def extend(self, sessions):
+        """ Writes sessions, and any buffered ones, in one transaction. """
+        self.pending.extend(sessions)
+        self.flush()
+
+    def flush(self):
+        """ Writes the buffered sessions in one transaction. """
+        if not self.pending:
+            return
+        counts = {}
+        for session in self.pending:
+            board = (session.language, session.width, session.score)
+            counts[board] = counts.get(board, 0) + 1
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO sessions (language, width, score, losses,'
+                ' duration, moves, average, p50, p90, finished)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', self.pending)
+            self.connection.executemany(
+                'INSERT INTO score_counts VALUES (?, ?, ?, ?)'
+                ' ON CONFLICT (language, width, score)'
+                ' DO UPDATE SET count = count + excluded.count',
+                [(*board, count) for board, count in counts.items()])
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    # -- Queries ------------------------------------------------------------
+    # Buffered sessions are written first, so queries include them.
+
+    def top(self, language: str, width: int, n: int = 10):
+        """
+        Returns the n best Sessions on a board, by score
+        and then by fewest losses. Reads n index entries.
+        """
+        self.flush()
+        rows = self.connection.execute(
+            'SELECT language, width, score, losses, duration, moves,'
+            ' average, p50, p90, finished FROM sessions'
+            ' WHERE language = ? AND width = ?'
+            ' ORDER BY score DESC, losses LIMIT ?', (language, width, n))
+        return [Session(*row) for row in rows]
+
+    def count(self, language: str, width: int):
+        """ Returns the number of sessions on a board. """
+        self.flush()
+        return self.connection.execute(
+            'SELECT coalesce(sum(count), 0) FROM score_counts'
+            ' WHERE language = ? AND width = ?', (language, width)
+        ).fetchone()[0]
+
+    def percentile_rank(self, language: str, width: int, score: int):
+        """
+        Returns the percentage of sessions on a board that scored less
+        than score, counting ties as half. None if there are none.
+        """
+        self.flush()
+        below, tied, total = self.connection.execute(
+            'SELECT coalesce(sum(CASE WHEN score < ?1 THEN count END), 0),'
+            ' coalesce(sum(CASE WHEN score = ?1 THEN count END), 0),'
+            ' sum(count) FROM score_counts'
+            ' WHERE language = ?2 AND width = ?3', (score, language, width)
+        ).fetchone()
+        if not total:
+            return None
+        return 100 * (below + tied / 2) / total
+
+    def boards(self):
+        """ Returns (language, width, sessions, best score) for each board. """
+        self.flush()
+        return self.connection.execute(
+            'SELECT language, width, sum(count), max(score) FROM score_counts'
+            ' GROUP BY language, width ORDER BY language, width').fetchall()
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+    from random import choice, gauss, random
+    from time import perf_counter
+    from languages import LANGUAGES
+    path = sys.argv[1]
+    num_sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    store = SessionStore(path)
+    languages = tuple(LANGUAGES)
+    start = perf_counter()
+    batch = []
+    for i in range(num_sessions):
+        score = max(int(gauss(20, 10)), 0)
+        batch.append(Session(
+            choice(languages), choice((10, 20, 30)), score,
+            int(random() * 30), 60 + score * 5.0, score * 10,
+            0.4, 0.35, 0.8, 1.7e9 + i))
+        if len(batch) == 10_000:
+            store.extend(batch)
+            batch = []
+    store.extend(batch)
+    print(f'wrote {num_sessions} sessions in {perf_counter() - start:.1f} s,'
+          f' {os.path.getsize(path) / 2 ** 20:.0f} MiB')
+
+    start = perf_counter()
+    best = store.top('english lower', 20, 10)
+    middle = perf_counter()
+    rank = store.percentile_rank('english lower', 20, 30)
+    end = perf_counter()
+    print(f'top 10 in {(middle - start) * 1000:.2f} ms, best {best[0].score}')
+    print(f'score 30 beats {rank:.1f}% in {(end - middle) * 1000:.2f} ms')
+    for board in store.boards():
+        print(board)
+    store.close()
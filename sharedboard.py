@@ -0,0 +1,284 @@
+"""
+Publishes the state of a running game in shared memory, so that other
+processes (renderers, analytics) can read live boards without copying
+or unpickling Game objects.
+
+Layout of the shared block, following HEADER (little-endian):
+-- keys     : per tile in row-order, the index of its key in the language.
+              u8, or u16 for languages of 255+ keys. CHARACTER under characters.
+-- roles    : per tile in row-order, a u8 of TARGET and TRAIL bits.
+
+The writer keeps an even sequence number in the header while the block
+is consistent, and makes it odd while it is being changed. Readers
+retry until they see the same even number before and after reading,
+or give up after a timeout if the writer died while changing it.
+
+The language can change when the game restarts. Its name is in the
+header, and readers look it up again when it changes.
+
+Run with: python sharedboard.py [workers]
+to watch boards simulated by worker processes.
+"""
+from multiprocessing import resource_tracker, shared_memory
+from struct import Struct
+from time import monotonic
+
+import events
+from languages import LANGUAGES
+
+
+MAGIC = b'SNKB'
+VERSION = 2
+# magic, version, key size, width, sequence number, score, losses,
+# heat, (x, y) of the player, chaser, nommer and runner, language:
+HEADER = Struct('<4sBBHIiid8H64s')
+LANGUAGE_OFFSET = HEADER.size - 64
+SEQ = Struct('<I')
+SEQ_OFFSET = 8
+
+TARGET = 1
+TRAIL = 2
+
+
+class SharedBoard:
+    """
+    A game board in shared memory. Create one with a Game to
+    publish it, or with the name of an existing board to read it.
+
+    Attributes:
+    -- shm          : SharedMemory      :
+    -- width        : int               : See Game.width.
+    -- lang_choice  : str               : The name of the language. See Game.lang_name.
+    -- language     : list{str}         : Display keys, indexed by the keys array.
+    -- index        : dict{str: int}    : Map from display keys to their index.
+    -- character    : int               : The index of tiles under characters.
+    -- keys         : memoryview        : Key indices. Shares memory with shm.
+    -- roles        : memoryview        : TARGET and TRAIL bits. Shares memory with shm.
+    -- game         : Game              : The published game. None for readers.
+    -- trail        : dict{int: int}    : Times each tile is in the game's trail.
+                                          Only kept by the writer.
+    """
+    def __init__(self, name: str = None, game=None):
+        self.game = game
+        self.lang_choice = None
+        if game is not None:
+            self.width = game.width
+            lang_choice = game.lang_name
+            self.key_size = 1 if len(LANGUAGES[lang_choice]) < 255 else 2
+            self.shm = shared_memory.SharedMemory(
+                name=name, create=True, size=self.size(
+                    self.width, self.key_size))
+            HEADER.pack_into(
+                self.shm.buf, 0, MAGIC, VERSION, self.key_size,
+                self.width, 0, 0, 0, 0.0, *[0] * 8, b'')
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Readers must not free the board when they exit:
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+            magic, version, self.key_size, self.width, *_, lang_choice = \
+                HEADER.unpack_from(self.shm.buf)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError('Not a compatible shared board.')
+            lang_choice = lang_choice.rstrip(b'\0').decode()
+        self.__set_language(lang_choice)
+
+        area = self.width ** 2
+        start = HEADER.size
+        end = start + area * self.key_size
+        self.keys = self.shm.buf[start:end].cast(
+            'B' if self.key_size == 1 else 'H')
+        self.roles = self.shm.buf[end:end + area]
+
+        if game is not None:
+            self.__rebuild()
+            game.subscribe(
+                self.on_event,
+                events.KeyChanged, events.TargetSpawned, events.TargetEaten,
+                events.TrailPushed, events.TrailPopped, events.Reset, )
+            self.publish()
+
+    def __set_language(self, lang_choice: str):
+        """
+        Looks up the display keys of a language. The writer
+        also writes its name to the header.
+        """
+        if lang_choice == self.lang_choice:
+            return
+        encoded = lang_choice.encode()
+        if len(encoded) > 64:
+            raise ValueError(f'The name of {lang_choice} is too long to share.')
+        language = list(LANGUAGES[lang_choice])
+        if self.key_size == 1 and len(language) >= 255:
+            raise ValueError(
+                f'{lang_choice} has too many keys for this board.')
+        self.lang_choice = lang_choice
+        self.language = language
+        self.index = {k: i for i, k in enumerate(language)}
+        self.character = len(language) if self.key_size == 1 else 0xFFFF
+        if self.game is not None:
+            self.shm.buf[LANGUAGE_OFFSET:HEADER.size] = encoded.ljust(64, b'\0')
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @staticmethod
+    def size(width: int, key_size: int):
+        """ Returns the number of bytes needed for a board. """
+        return HEADER.size + width ** 2 * (key_size + 1)
+
+    # -- Writing ------------------------------------------------------------
+
+    def __begin(self):
+        """ Marks the block as being changed. """
+        seq = SEQ.unpack_from(self.shm.buf, SEQ_OFFSET)[0]
+        if not seq & 1:
+            SEQ.pack_into(self.shm.buf, SEQ_OFFSET, seq + 1)
+
+    def on_event(self, event):
+        """ Writes the tiles changed by event. """
+        kind = type(event)
+        if kind is events.Reset:
+            self.__begin()
+            self.__rebuild()
+            return
+        self.__begin()
+        pos = event.tile.pos
+        i = pos.y * self.width + pos.x
+        if kind is events.KeyChanged:
+            self.keys[i] = self.index.get(event.key, self.character)
+        elif kind is events.TargetSpawned:
+            self.roles[i] |= TARGET
+        elif kind is events.TargetEaten:
+            self.roles[i] &= ~TARGET
+        elif kind is events.TrailPushed:
+            self.trail[i] = self.trail.get(i, 0) + 1
+            self.roles[i] |= TRAIL
+        else:  # TrailPopped:
+            self.trail[i] -= 1
+            if not self.trail[i]:
+                self.roles[i] &= ~TRAIL
+
+    def __rebuild(self):
+        game = self.game
+        self.__set_language(game.lang_name)
+        for i, tile in enumerate(game.grid):
+            self.keys[i] = self.index.get(tile.key.get(), self.character)
+            self.roles[i] = 0
+        for tile in game.targets:
+            self.roles[tile.pos.y * self.width + tile.pos.x] |= TARGET
+        self.trail = {}
+        for tile in game.trail:
+            i = tile.pos.y * self.width + tile.pos.x
+            self.trail[i] = self.trail.get(i, 0) + 1
+            self.roles[i] |= TRAIL
+
+    def publish(self):
+        """
+        Writes the header and marks the block as consistent.
+        Call after each step of the game.
+        """
+        game = self.game
+        seq = SEQ.unpack_from(self.shm.buf, SEQ_OFFSET)[0]
+        positions = []
+        for pos in (game.player, game.chaser, game.nommer, game.runner):
+            positions.extend((pos.x, pos.y))
+        HEADER.pack_into(
+            self.shm.buf, 0, MAGIC, VERSION, self.key_size, self.width,
+            seq | 1, game.score.get(), game.losses.get(), game.heat,
+            *positions, self.lang_choice.encode())
+        SEQ.pack_into(self.shm.buf, SEQ_OFFSET, (seq | 1) + 1)
+
+    # -- Reading ------------------------------------------------------------
+
+    def header(self):
+        """
+        Returns the header as a dict. May be
+        inconsistent with the tiles. See read().
+        """
+        (_, _, _, _, seq, score, losses, heat, *positions,
+         lang_choice) = HEADER.unpack_from(self.shm.buf)
+        return {
+            'seq': seq, 'score': score, 'losses': losses, 'heat': heat,
+            'language': lang_choice.rstrip(b'\0').decode(errors='replace'),
+            'player': tuple(positions[0:2]), 'chaser': tuple(positions[2:4]),
+            'nommer': tuple(positions[4:6]), 'runner': tuple(positions[6:8]), }
+
+    def read(self, timeout: float = 1.0):
+        """
+        Returns a consistent copy of the header, keys and roles, and
+        follows changes of the language. Waits out writes in progress,
+        for up to timeout seconds, and then raises a TimeoutError.
+        """
+        deadline = monotonic() + timeout
+        while True:
+            header = self.header()
+            if not header['seq'] & 1:
+                keys = bytes(self.keys.cast('B'))
+                roles = bytes(self.roles)
+                if SEQ.unpack_from(
+                        self.shm.buf, SEQ_OFFSET)[0] == header['seq']:
+                    self.__set_language(header['language'])
+                    return header, keys, roles
+            if monotonic() > deadline:
+                raise TimeoutError(
+                    f'The shared board {self.name} stayed inconsistent.')
+
+    def close(self):
+        """ Detaches from the board. The creator also frees it. """
+        if self.game is not None:
+            self.game.unsubscribe(self.on_event)
+        self.keys.release()
+        self.roles.release()
+        self.shm.close()
+        if self.game is not None:
+            self.shm.unlink()
+
+
+def _simulate(names, i: int, seconds: float):
+    """ Plays a random headless game, publishing it to a shared board. """
+    from random import choice
+    from time import sleep, time
+    from engine import Game
+    game = Game(20, headless=True)
+    board = SharedBoard(game=game)
+    names.put((i, board.name))
+    keys = list(game.language.values())
+    end = time() + seconds
+    while time() < end:
+        game.move_player(choice(keys))
+        game.move_nommer()
+        game.move_runner()
+        if game.move_chaser():
+            game.restart()
+        board.publish()
+        sleep(0.01)
+    names.get()  # Wait for the reader to detach.
+    board.close()
+
+
+if __name__ == '__main__':
+    import sys
+    from multiprocessing import Process, Queue
+    from time import sleep
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    names = Queue()
+    processes = [Process(target=_simulate, args=(names, i, 3.0))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    boards = dict(names.get() for _ in processes)
+    boards = {i: SharedBoard(name) for i, name in boards.items()}
+    for _ in range(5):
+        sleep(0.5)
+        for i, board in sorted(boards.items()):
+            header, keys, roles = board.read()
+            print(f'worker {i}: seq {header["seq"]:6} score {header["score"]:3}'
+                  f' losses {header["losses"]:3} player {header["player"]}'
+                  f' targets {sum(r & TARGET for r in roles)}')
+    for board in boards.values():
+        board.close()
+    for _ in processes:
+        names.put(None)
+    for process in processes:
+        process.join()
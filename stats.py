@@ -0,0 +1,143 @@
+"""
+Streaming statistics of the player's typing speed, and an adaptive
+difficulty controller driven by them. Every update takes O(1) time.
+"""
+from collections import deque
+from math import log
+
+
+class Ewma:
+    """
+    An exponentially weighted moving average.
+
+    Attributes:
+    -- alpha        : float             : Weight of each new value.
+    -- value        : float             : The average. None before the first value.
+    """
+    def __init__(self, span: float):
+        """ Values are weighted like an average of the last span values. """
+        self.alpha = 2 / (span + 1)
+        self.value = None
+
+    def peek(self, x: float):
+        """ Returns what the average would be after adding x. """
+        if self.value is None:
+            return x
+        return self.value + self.alpha * (x - self.value)
+
+    def add(self, x: float):
+        self.value = self.peek(x)
+
+
+class RollingPercentile:
+    """
+    Percentiles of the last few values, estimated from a histogram of
+    logarithmic buckets. Adding a value updates one bucket and evicts
+    one, and a query visits a fixed number of buckets.
+
+    Attributes:
+    -- values       : deque{float}      : The values in the window, oldest first.
+    -- counts       : list{int}         : Number of values in the window per bucket.
+    """
+    def __init__(self, window: int = 64, low: float = 0.02,
+                 high: float = 20.0, num_buckets: int = 48):
+        """ Values outside [low, high) are counted in the end buckets. """
+        self.values = deque(maxlen=window)
+        self.low = low
+        self.num_buckets = num_buckets
+        self.ratio = (high / low) ** (1 / num_buckets)
+        self.counts = [0] * num_buckets
+
+    def __bucket(self, x: float):
+        if x <= self.low:
+            return 0
+        return min(int(log(x / self.low, self.ratio)), self.num_buckets - 1)
+
+    def add(self, x: float):
+        if len(self.values) == self.values.maxlen:
+            self.counts[self.__bucket(self.values[0])] -= 1
+        self.values.append(x)
+        self.counts[self.__bucket(x)] += 1
+
+    def __len__(self):
+        return len(self.values)
+
+    def percentile(self, q: float):
+        """
+        Returns the q'th percentile (q in [0, 100]) to within one bucket,
+        or None if there are no values.
+        """
+        if not self.values:
+            return None
+        rank = q / 100 * (len(self.values) - 1)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen > rank:
+                break
+        # The geometric middle of the bucket:
+        return self.low * self.ratio ** (bucket + 0.5)
+
+
+class MoveStats:
+    """
+    Statistics of the periods between the player's moves.
+
+    Attributes:
+    -- average      : Ewma              : Of recent periods.
+    -- recent       : RollingPercentile : Of recent periods.
+    -- count        : int               : Number of periods added.
+    """
+    def __init__(self, periods=()):
+        self.average = Ewma(span=5)
+        self.recent = RollingPercentile()
+        self.count = 0
+        for period in periods:
+            self.add(period)
+
+    def add(self, period: float):
+        self.average.add(period)
+        self.recent.add(period)
+        self.count += 1
+
+    def periods(self):
+        """ Returns the periods in the percentile window, oldest first. """
+        return list(self.recent.values)
+
+    def as_dict(self):
+        """ Returns a summary of the statistics, for displays and logs. """
+        return {
+            'moves': self.count,
+            'average': self.average.value,
+            'p50': self.recent.percentile(50),
+            'p90': self.recent.percentile(90), }
+
+
+class Difficulty:
+    """
+    Scales the frequencies of enemies by how much faster the player
+    moves than a reference player, for whom the default speeds are
+    tuned. The scale follows its goal gradually, and stays in bounds.
+
+    Attributes:
+    -- reference    : float             : Period in seconds of the reference player's moves.
+    -- low, high    : float             : Bounds of scale.
+    -- gain         : float             : Fraction of the way to its goal scale moves per update.
+    -- scale        : float             : Multiplier of enemy frequencies.
+    """
+    def __init__(self, reference: float = 0.45, low: float = 0.75,
+                 high: float = 1.5, gain: float = 0.1):
+        self.reference = reference
+        self.low = low
+        self.high = high
+        self.gain = gain
+        self.scale = 1.0
+
+    def update(self, player_period: float):
+        """
+        Moves scale toward its goal for a player
+        moving once every player_period seconds.
+        """
+        goal = self.reference / max(player_period, 1e-3)
+        goal = min(max(goal, self.low), self.high)
+        self.scale += self.gain * (goal - self.scale)
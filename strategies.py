@@ -0,0 +1,247 @@
+"""
+Pluggable decision logic for the enemies.
+
+A Strategy decides where an enemy heads on each of its moves, and the
+Game moves it one step that way. Strategies are registered by enemy
+and name, and chosen with Game.set_strategy(). Each may declare a
+budget of seconds per decision: its decisions are timed, and after one
+overruns, the enemy takes the cheap greedy step for a few moves, which
+doubles with each overrun in a row. Expensive strategies can check the
+deadline they are given and return None to give up early.
+"""
+from math import sqrt
+from random import random
+from time import perf_counter
+
+from pair import Pair
+from planner import runner_planner
+from lookahead import minimax_chaser
+from stats import Ewma
+
+
+ENEMIES = ('chaser', 'nommer', 'runner')
+# Map from enemies to maps from names to Strategy subclasses:
+REGISTRY = {character: {} for character in ENEMIES}
+# Most moves to take greedy steps for after an overrun:
+MAX_BACKOFF = 64
+
+
+def register(character: str, name: str):
+    """ Returns a class decorator that registers a Strategy. """
+    def decorator(cls):
+        REGISTRY[character][name] = cls
+        return cls
+    return decorator
+
+
+def strategy(character: str, name: str = 'default', **kwargs):
+    """ Returns a new Strategy registered for character under name. """
+    try:
+        cls = REGISTRY[character][name]
+    except KeyError:
+        raise ValueError(f'no {character} strategy named {name!r}'
+                         f' (choose from {sorted(REGISTRY.get(character, ()))})')
+    chosen = cls(**kwargs)
+    chosen.character = character
+    chosen.name = name
+    return chosen
+
+
+def greedy_target(game, character: str):
+    """
+    Returns the cheapest sensible target of an enemy: the player for
+    the chaser, the nearest target for the nommer, and the opposite
+    of the player for the runner.
+    """
+    pos = getattr(game, character)
+    if character == 'chaser':
+        return game.player
+    elif character == 'nommer':
+        if not game.targets:
+            return game.player
+        return min(game.targets, key=lambda t: (pos - t.pos).square_norm()).pos
+    else:
+        return pos + (pos - game.player)
+
+
+class Strategy:
+    """
+    Subclasses override target(), and are registered with register().
+    Make instances with strategy(), which sets character and name.
+
+    Attributes:
+    -- character    : str               : The enemy this decides for.
+    -- name         : str               : The name this is registered under.
+    -- budget       : float             : Seconds a decision may take, or None.
+    -- cost         : Ewma              : Seconds recent decisions took.
+    -- overruns     : int               : Decisions that went over budget.
+    -- backoff      : int               : Moves to take greedy steps for
+                                          after the next overrun.
+    -- skip         : int               : Moves left to take greedy steps for.
+    """
+    budget = None
+
+    def __init__(self, budget: float = None):
+        self.character = None
+        self.name = None
+        if budget is not None:
+            self.budget = budget
+        self.cost = Ewma(span=20)
+        self.overruns = 0
+        self.backoff = 1
+        self.skip = 0
+
+    def target(self, game, deadline: float):
+        """
+        Returns the position the enemy should move toward, or None if
+        it could not decide before deadline, in seconds of perf_counter.
+        deadline is None if there is no budget.
+        """
+        raise NotImplementedError
+
+    def decide(self, game):
+        """
+        Returns the position the enemy should move toward,
+        from target() if the strategy is within its budget.
+        """
+        if self.skip:
+            self.skip -= 1
+            return greedy_target(game, self.character)
+        budget = self.budget
+        start = perf_counter()
+        target = self.target(game, None if budget is None else start + budget)
+        cost = perf_counter() - start
+        self.cost.add(cost)
+        if target is None or (budget is not None and cost > budget):
+            self.overruns += 1
+            self.skip = self.backoff
+            self.backoff = min(2 * self.backoff, MAX_BACKOFF)
+        else:
+            self.backoff = 1
+        if target is None:
+            return greedy_target(game, self.character)
+        return target
+
+
+@register('chaser', 'greedy')
+@register('nommer', 'greedy')
+@register('runner', 'greedy')
+class Greedy(Strategy):
+    """ Always takes the greedy step. """
+    def target(self, game, deadline: float):
+        return greedy_target(game, self.character)
+
+
+@register('chaser', 'default')
+class DefaultChaser(Strategy):
+    """
+    Heads for the player, but may head for the end of
+    the player's trail instead when the player is fast.
+    """
+    def target(self, game, deadline: float):
+        if not game.trail:
+            return game.player
+        # If time_delta is enemy_base_speed/equiv_point,
+        # there is a 50/50 chance the enemy will miss.
+        # Think of as how easy it is to make the enemy miss.
+        # (pivot around 1: 'same speed' -> same weight)
+        max_miss_weight = 4.0
+        equiv_point = 4.0
+        enemy_speed = game.enemy_base_speed()
+        power = game.player_avg_period() * enemy_speed / equiv_point
+        miss_weight = max_miss_weight ** (1 - power)
+        if random() * (1 + miss_weight) < 1:
+            return game.player
+        return game.trail[-1].pos
+
+
+@register('chaser', 'minimax')
+class MinimaxChaser(Strategy):
+    """
+    Searches the chaser's and player's moves on a Lookahead, one move
+    deeper at a time while the deadline allows another search.
+
+    Attributes:
+    -- max_depth    : int               : Deepest search to try.
+    -- growth       : float             : Estimated cost of a search over
+                                          that of one move shallower.
+    """
+    budget = 0.004
+
+    def __init__(self, budget: float = None, max_depth: int = 4,
+                 growth: float = 30.0):
+        super(MinimaxChaser, self).__init__(budget)
+        self.max_depth = max_depth
+        self.growth = growth
+
+    def target(self, game, deadline: float):
+        view = game.clone()
+        best = None
+        for depth in range(1, self.max_depth + 1):
+            start = perf_counter()
+            move = minimax_chaser(view, depth)
+            if move is None:
+                break
+            best = Pair(*move)
+            now = perf_counter()
+            if deadline is not None and \
+                    now + (now - start) * self.growth > deadline:
+                break
+        return best
+
+
+@register('nommer', 'default')
+class DefaultNommer(Strategy):
+    """
+    Heads for the nearest target that is not among
+    the third of the targets nearest to the player.
+    """
+    def target(self, game, deadline: float):
+        targets = sorted(
+            game.targets, key=lambda t:
+            (game.player-t.pos).square_norm())
+        targets = targets[len(targets)//3:]
+        targets.sort(key=lambda t: (game.nommer-t.pos).square_norm())
+        return targets[0].pos
+
+
+@register('nommer', 'trajectory')
+class TrajectoryNommer(Strategy):
+    """
+    Predicts where the player is headed from their trajectory, and
+    tries to beat them there. Was the nommer's algorithm long ago.
+
+    Attributes:
+    -- hist         : int               : Number of the most recent player
+                                          moves used to find their trajectory.
+    """
+    def __init__(self, budget: float = None, hist: int = 4):
+        super(TrajectoryNommer, self).__init__(budget)
+        self.hist = hist
+
+    def target(self, game, deadline: float):
+        hist = self.hist
+        trail = game.trail
+        # Not enough data. Just chase:
+        if len(trail) < hist:
+            return game.player
+        dest = game.player - trail[-1].pos
+        for i in range(-hist, -1):
+            # Weights of past player moves decrease linearly:
+            dest += (trail[i+1].pos - trail[i].pos) * (i+hist)
+        # Try to go further ahead of player when player is far away:
+        dest *= sqrt((game.player - game.nommer).norm())
+        dest *= 2 / sum(range(1, hist + 1))
+        return dest + game.player
+
+
+@register('runner', 'default')
+class DefaultRunner(Strategy):
+    """ See planner.RunnerPlanner. """
+    def target(self, game, deadline: float):
+        planner = runner_planner(game.width)
+        target = planner.target(
+            game.runner, game.player, game.chaser, game.nommer)
+        if planner.is_far(game.runner, game.player):
+            target += Pair.rand(2)
+        return target
@@ -0,0 +1,222 @@
+"""
+Plays SnaKey in a terminal with curses, for when tkinter cannot run
+(ie. over SSH). The game is driven by a worker.Driver, and only the
+tiles in each of its frames are redrawn. Keys are read without
+blocking, so the loop sleeps until the next key or enemy move.
+
+Run with: python terminal.py [width] [language] [color scheme]
+Keys: type to move, space to backtrack, ctrl-p to pause,
+ctrl-r to restart, and escape to quit.
+"""
+import curses
+from time import time
+from unicodedata import east_asian_width
+
+import colors as _colors
+from engine import Game
+from worker import Driver
+
+
+# Columns per tile. The text of a tile takes at most CELL - 1 of them,
+# so that a tile never touches the next:
+CELL = 4
+# Most key presses to process before drawing:
+KEYS_PER_BATCH = 8
+CTRL_P = '\x10'
+CTRL_R = '\x12'
+ESCAPE = '\x1b'
+
+NAMED_COLORS = {'black': (0, 0, 0), 'white': (255, 255, 255)}
+# The 8 basic terminal colors, in curses order:
+BASIC_COLORS = (
+    (0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0),
+    (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229))
+# Levels of each channel in the 6x6x6 cube of 256-color terminals:
+CUBE_LEVELS = (0, 95, 135, 175, 215, 255)
+
+
+def rgb(color: str):
+    """ Returns the (r, g, b) of a tk color from colors.py. """
+    if color in NAMED_COLORS:
+        return NAMED_COLORS[color]
+    return tuple(int(color[i:i+2], 16) for i in (1, 3, 5))
+
+
+def terminal_color(color: str, num_colors: int):
+    """
+    Returns the terminal color closest to a tk color, using the
+    color cube and grays of 256-color terminals when available.
+    """
+    r, g, b = rgb(color)
+
+    def distance(other):
+        return sum((p - q) ** 2 for p, q in zip((r, g, b), other))
+
+    if num_colors < 256:
+        return min(range(8), key=lambda i: distance(BASIC_COLORS[i]))
+    candidates = {}
+    levels = [min(range(6), key=lambda i: abs(CUBE_LEVELS[i] - c))
+              for c in (r, g, b)]
+    candidates[16 + 36 * levels[0] + 6 * levels[1] + levels[2]] = \
+        tuple(CUBE_LEVELS[i] for i in levels)
+    gray = min(max(round(((r + g + b) / 3 - 8) / 10), 0), 23)
+    candidates[232 + gray] = (8 + 10 * gray,) * 3
+    return min(candidates, key=lambda i: distance(candidates[i]))
+
+
+def cell_text(key: str):
+    """
+    Returns key padded to CELL columns. Wide characters take two.
+    Keys wider than CELL - 1 columns, like the face of a hot and sad
+    nommer, lose their padding and then their first characters, since
+    faces end with their mouths.
+    """
+    text = ''
+    columns = 0
+    for c in reversed(key.strip()):
+        width = 2 if east_asian_width(c) in 'WF' else 1
+        if columns + width > CELL - 1:
+            break
+        text = c + text
+        columns += width
+    return text + ' ' * (CELL - columns)
+
+
+class TerminalGUI:
+    """
+    Attributes:
+    -- screen       : curses.window     :
+    -- driver       : Driver            :
+    -- attributes   : dict{str: int}    : Map from roles to curses attributes.
+    -- paused       : bool              :
+    -- caught       : bool              : Whether the chaser caught the player.
+    -- last         : Frame             : The last frame drawn.
+    """
+    def __init__(self, screen, width: int = 20,
+                 lang_choice: str = 'english lower',
+                 cs: str = 'dark - nw'):
+        self.screen = screen
+        self.driver = Driver(Game(width, lang_choice, headless=True))
+        self.attributes = {}
+        self.set_scheme(cs)
+        self.paused = False
+        self.caught = False
+        self.last = None
+        rows, columns = screen.getmaxyx()
+        if rows < width + 1 or columns < width * CELL:
+            raise SystemExit(
+                f'The terminal must be at least {width * CELL}'
+                f' columns by {width + 1} rows.')
+        curses.curs_set(0)
+        screen.clear()
+
+    def set_scheme(self, cs: str):
+        """
+        Makes a color pair for each role in a color scheme.
+        Without colors, roles are told apart by text attributes.
+        """
+        if not curses.has_colors():
+            self.attributes = dict.fromkeys(_colors.ROLES, curses.A_NORMAL)
+            for role in ('player', 'chaser', 'nommer', 'runner'):
+                self.attributes[role] = curses.A_REVERSE
+            self.attributes['target'] = curses.A_BOLD
+            self.attributes['trail'] = curses.A_DIM
+            return
+        curses.start_color()
+        scheme = _colors.color_schemes[cs]
+        for i, role in enumerate(_colors.ROLES, start=1):
+            curses.init_pair(
+                i, terminal_color(scheme[role]['fg'], curses.COLORS),
+                terminal_color(scheme[role]['bg'], curses.COLORS))
+            self.attributes[role] = curses.color_pair(i)
+
+    def draw(self, frame):
+        """ Draws the tiles in a frame, and the status line. """
+        width = self.driver.game.width
+        for i, key, role in frame.tiles:
+            y, x = divmod(i, width)
+            self.screen.addstr(
+                y, x * CELL, cell_text(key), self.attributes[role])
+        if frame.caught:
+            self.caught = True
+        self.last = frame
+        self.draw_status()
+
+    def draw_status(self):
+        """ Draws the score, losses, speed and state of the last frame. """
+        frame = self.last
+        stats = frame.stats
+        speed = '-' if stats['average'] is None \
+            else f'{1 / stats["average"]:.1f}/s'
+        status = 'caught! ctrl-r to restart' if self.caught \
+            else 'paused' if self.paused else 'ctrl-p pause, esc quit'
+        line = (f'score {frame.score:3}  losses {frame.losses:3}'
+                f'  speed {speed:>7}  {status}')
+        columns = self.screen.getmaxyx()[1]
+        self.screen.addstr(self.driver.game.width, 0, line[:columns - 1])
+        self.screen.clrtoeol()
+
+    def read_keys(self):
+        """
+        Returns up to KEYS_PER_BATCH keys that are waiting,
+        without blocking. Keys other than characters are dropped.
+        """
+        keys = []
+        self.screen.nodelay(True)
+        while len(keys) < KEYS_PER_BATCH:
+            try:
+                key = self.screen.get_wch()
+            except curses.error:
+                break
+            if isinstance(key, str):
+                keys.append(key)
+        return keys
+
+    def run(self):
+        driver = self.driver
+        driver.pause(False)
+        while True:
+            delay = driver.step(time())
+            frame = driver.frame()
+            if frame is not None:
+                self.draw(frame)
+                self.screen.refresh()
+            driver.idle()
+
+            # Sleep until a key is pressed or an enemy is due:
+            self.screen.timeout(-1 if delay is None else int(1000 * delay))
+            try:
+                first = self.screen.get_wch()
+            except curses.error:
+                continue
+            pressed = time()
+            keys = [first] if isinstance(first, str) else []
+            for key in keys + self.read_keys():
+                if key == ESCAPE:
+                    return
+                elif key == CTRL_R:
+                    driver.restart()
+                    self.caught = self.paused = False
+                    driver.pause(False)
+                elif key == CTRL_P and not self.caught:
+                    self.paused = not self.paused
+                    driver.pause(self.paused)
+                    self.draw_status()
+                    self.screen.refresh()
+                elif not self.paused and not self.caught:
+                    driver.press('space' if key == ' ' else key, pressed)
+
+
+def main(screen, *args):
+    TerminalGUI(screen, *args).run()
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+    # Do not wait for escape sequences after escape:
+    os.environ.setdefault('ESCDELAY', '25')
+    args = sys.argv[1:]
+    if args:
+        args[0] = int(args[0])
+    curses.wrapper(main, *args)
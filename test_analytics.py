@@ -0,0 +1,57 @@
+""" Tests of analytics typing stats and key bias. """
+import pytest
+
+from analytics import TypingStats, TypingStore, TypingTracker
+from engine import Game
+
+
+def stats_of(periods: dict, misses: dict = {}, count: int = 5):
+    """ Returns TypingStats with count moves onto each key of periods. """
+    stats = TypingStats('english lower')
+    for key, period in periods.items():
+        for _ in range(count):
+            stats.add(None, stats.index[key], period, misses.get(key, 0))
+    return stats
+
+
+def test_key_bias_keeps_weak_keys():
+    stats = stats_of({'a': 0.2, 'b': 0.4, 'c': 0.8}, misses={'a': 1})
+    # Too few moves to count:
+    stats.add(None, stats.index['d'], 5.0, 0)
+    bias = stats.key_bias(strength=0.5)
+    assert set(bias) == set(stats.keys)
+    # a's misses double its weakness:
+    assert bias['c'] == 1.0
+    assert bias['a'] == bias['b'] == pytest.approx(0.75)
+    # Keys without enough moves count as average:
+    assert bias['d'] == bias['z'] == pytest.approx(1 - 0.5 * (1 - 1.6 / 3 / 0.8))
+    assert all(0.5 <= chance <= 1.0 for chance in bias.values())
+    assert TypingStats('english lower').key_bias() is None
+
+
+def test_store_merges_sessions(tmp_path):
+    path = str(tmp_path / 'typing.json')
+    store = TypingStore(path)
+    store.merge({'english lower': stats_of({'a': 0.2, 'b': 0.8})})
+    store.merge({'english lower': stats_of({'a': 0.2, 'b': 0.8})})
+    store = TypingStore(path)
+    summary = store.totals['english lower'].key_summary()
+    assert summary == {'a': (10, 0.2, 0.0), 'b': (10, 0.8, 0.0)}
+    assert store.key_bias('english lower')['b'] == 1.0
+    assert store.key_bias('japanese hiragana') is None
+
+
+def test_tracker_follows_language_in_play():
+    game = Game(8, headless=True)
+    tracker = TypingTracker(game)
+    game.lang_choice.set('japanese hiragana')
+    # The menu changed, but not the game:
+    for key in list(game.language.values())[:30]:
+        game.move_player(key)
+    assert tracker.stats.lang_choice == 'english lower'
+    moves = sum(tracker.stats.counts)
+    assert moves == game.moves.count
+    assert sum(tracker.stats.bigram_counts) == moves - 1
+    game.restart()
+    assert tracker.stats.lang_choice == 'japanese hiragana'
+    assert set(tracker.flush()) == {'english lower', 'japanese hiragana'}
@@ -0,0 +1,84 @@
+""" Tests of batch.BatchGame. """
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from batch import BACKTRACK, EMPTY, NOMMER, PLAYER, RUNNER, CHASER, BatchGame
+from pair import Pair
+from planner import runner_planner
+
+
+def check_invariants(games):
+    b = np.arange(games.batch)
+    for character, positions in (
+            (PLAYER, games.player), (CHASER, games.chaser),
+            (NOMMER, games.nommer), (RUNNER, games.runner)):
+        count = (games.occupied == character).sum(axis=(1, 2))
+        assert (games.occupied[b, positions[:, 1], positions[:, 0]]
+                == character)[games.alive].all()
+        assert (count[games.alive] == 1).all()
+
+    # Populations count the keys of unoccupied tiles:
+    for row in range(games.batch):
+        free = games.keys[row][games.occupied[row] == EMPTY]
+        counts = np.bincount(free, minlength=len(games.language))
+        assert (counts == games.populations[row]).all()
+
+    # Every slot holds a distinct target:
+    for row in range(games.batch):
+        assert sorted(np.flatnonzero(games.is_target[row])) == \
+            sorted(set(games.targets[row]))
+    assert (games.trail_len >= 0).all()
+    assert (games.trail_len <= games.trail.shape[1]).all()
+
+
+@pytest.mark.parametrize('lang_choice', [
+    'english lower', 'english lower + japanese hiragana + japanese katakana'])
+def test_invariants_hold(lang_choice):
+    games = BatchGame(32, 12, lang_choice, seed=0)
+    check_invariants(games)
+    for _ in range(200):
+        done = games.step(games.rng.integers(0, BACKTRACK + 1, games.batch))
+        check_invariants(games)
+        games.reset(done)
+    assert games.score.any()
+
+
+def test_seed_repeats_games():
+    first, second = BatchGame(8, seed=3), BatchGame(8, seed=3)
+    for _ in range(50):
+        actions = first.rng.integers(0, BACKTRACK + 1, 8)
+        second.rng.integers(0, BACKTRACK + 1, 8)
+        assert (first.step(actions) == second.step(actions)).all()
+    assert (first.keys == second.keys).all()
+    assert (first.runner == second.runner).all()
+
+
+@pytest.mark.parametrize('width', [13, 20])
+def test_runner_follows_planner(width):
+    planner = runner_planner(width)
+    rng = np.random.default_rng(width)
+    pairs = []
+    while len(pairs) < 4000:
+        runner, player = rng.integers(0, width, (2, 2)).tolist()
+        # Many players share the runner's cell of the planner:
+        if rng.random() < 0.2:
+            player = [min(c // 2 * 2 + int(rng.integers(2)), width - 1)
+                      for c in runner]
+        if runner != player:
+            pairs.append((tuple(runner), tuple(player)))
+    games = BatchGame(len(pairs), width, seed=0)
+    games.runner[:] = [r for r, _ in pairs]
+    games.player[:] = [p for _, p in pairs]
+    targets = games.runner_targets(np.arange(len(pairs)))
+    for (runner, player), target, chaser, nommer in zip(
+            pairs, targets.tolist(), games.chaser.tolist(),
+            games.nommer.tolist()):
+        expected = planner.target(
+            Pair(*runner), Pair(*player), Pair(*chaser), Pair(*nommer))
+        if planner.is_far(Pair(*runner), Pair(*player)):
+            # Far runners head near it, with some randomness:
+            assert abs(target[0] - expected.x) <= 2
+            assert abs(target[1] - expected.y) <= 2
+        else:
+            assert tuple(target) == (expected.x, expected.y)
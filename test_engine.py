@@ -0,0 +1,48 @@
+""" Tests of engine.Game snapshots. """
+import pytest
+
+from engine import Game
+from harness import state
+
+
+@pytest.mark.parametrize('lang_choice', [
+    'english lower',
+    'english lower + japanese hiragana + japanese katakana'])
+def test_save_load_long_move_str(lang_choice):
+    game = Game(12, lang_choice, headless=True)
+    for key in list(game.language.values())[:50]:
+        game.move_player(key)
+    # Longer than 255 bytes, whatever the engine would keep:
+    game.move_str = 'ā' * 300
+    # Misses since the last move are not saved:
+    game.misses = 0
+    data = game.save()
+
+    other = Game(12, headless=True)
+    other.load(data)
+    assert other.move_str == game.move_str
+    assert state(other) == state(game)
+
+
+def test_load_truncated_leaves_game_intact():
+    game = Game(8, headless=True)
+    data = game.save()
+    other = Game(8, headless=True)
+    before = state(other)
+    for end in range(0, len(data), 7):
+        with pytest.raises(ValueError):
+            other.load(data[:end])
+    assert state(other) == before
+
+
+@pytest.mark.parametrize('pending', ['english lower', 'japanese katakana'])
+def test_save_ignores_pending_language(pending):
+    game = Game(10, 'japanese hiragana', headless=True)
+    # The menu changes mid-game. It only applies at the next restart:
+    game.lang_choice.set(pending)
+    data = game.save()
+
+    other = Game(10, headless=True)
+    other.load(data)
+    assert other.lang_name == 'japanese hiragana'
+    assert state(other) == state(game)
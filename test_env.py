@@ -0,0 +1,43 @@
+""" Tests of env.SnaKeyEnv. """
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import events
+from env import SnaKeyEnv
+
+
+def play(env, seed: int, actions):
+    """ Returns the observations and rewards of an episode. """
+    history = [env.reset(seed).copy()]
+    rewards = []
+    for action in actions:
+        obs, reward, done, _ = env.step(action)
+        history.append(obs.copy())
+        rewards.append(reward)
+        if done:
+            break
+    return history, rewards
+
+
+def test_seeded_episodes_repeat():
+    actions = [i * 7 % SnaKeyEnv.num_actions for i in range(200)]
+    first = play(SnaKeyEnv(12), 3, actions)
+    # A different environment, which already played another episode:
+    env = SnaKeyEnv(12)
+    play(env, 4, actions[::-1])
+    second = play(env, 3, actions)
+    assert first[1] == second[1]
+    assert len(first[0]) == len(second[0])
+    for a, b in zip(*(history for history, _ in (first, second))):
+        assert np.array_equal(a, b)
+
+
+def test_observation_matches_rebuild():
+    env = SnaKeyEnv(10)
+    env.reset(5)
+    for i in range(100):
+        env.step(i * 3 % SnaKeyEnv.num_actions)
+    updated = env.obs.copy()
+    env.on_event(events.Reset())
+    assert np.array_equal(updated, env.obs)
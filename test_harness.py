@@ -0,0 +1,58 @@
+""" Tests of harness.Harness and its invariants. """
+from engine import Game
+from harness import (
+    Harness, differences, populations_match_grid, state, targets_kept,
+    trail_length)
+
+
+class MoreTargets(Game):
+    """ Breaks the rules by keeping one target more once scoring. """
+    def spawn_new_targets(self):
+        if self.score.get() > 0:
+            self.num_targets = self.width ** 2 / Game.target_thinness + 1
+        return super(MoreTargets, self).spawn_new_targets()
+
+
+def test_same_engine_never_diverges():
+    report = Harness(Game, Game, width=12, seed=1).run(300)
+    assert report.ticks == 300
+    assert report.divergence is None
+    assert report.violations == []
+    assert report.times['candidate']['player'] > 0
+
+
+def test_reports_first_divergence():
+    report = Harness(Game, MoreTargets, width=12, seed=1).run(2000)
+    assert report.divergence is not None
+    tick, action, fields = report.divergence
+    assert report.ticks == tick
+    assert 'player' in action
+    assert 'targets' in fields
+    # Up to the divergence, the games were equal:
+    again = Harness(Game, MoreTargets, width=12, seed=1)
+    assert again.run(tick - 1).divergence is None
+
+
+def test_invariants_catch_broken_games():
+    game = Game(10, headless=True)
+    assert populations_match_grid(game) is None
+    assert trail_length(game) is None
+    assert targets_kept(game) is None
+
+    key = next(iter(game.language))
+    game.populations[key] += 1
+    assert key in populations_match_grid(game)
+    game.trail.extend(game.grid[:3])
+    assert 'trail of 3 tiles' in trail_length(game)
+    game.targets.append(game.targets[0])
+    assert targets_kept(game) == 'a tile is a target more than once'
+
+
+def test_differences_summarize_keys():
+    game = Game(8, headless=True)
+    before = state(game)
+    game.grid[5].key.set('?')
+    game.grid[9].key.set('?')
+    fields = differences(before, state(game))
+    assert list(fields) == ['keys']
+    assert fields['keys'][0].startswith('2 tiles, first #5:')
@@ -0,0 +1,49 @@
+""" Tests of engine.Game.legal_moves and its cache. """
+import random
+
+from engine import Game
+
+
+def fresh_moves(game):
+    """ Returns legal_moves() as made without the cache. """
+    cached = game.neighborhood
+    game.neighborhood = None
+    moves = game.legal_moves()
+    game.neighborhood = cached
+    return moves
+
+
+def test_cache_is_reused_until_the_neighborhood_changes():
+    game = Game(10, headless=True)
+    moves = game.legal_moves()
+    assert game.legal_moves()[0] is moves[0]
+    center = game.player
+    far = next(t for t in game.grid if (t.pos - center).norm() > 3
+               and not game.is_character(t))
+    game._Game__set_key(far, far.key.get())
+    assert game.neighborhood is not None
+
+    near = moves[0].tile
+    unused = next(k for k in game.language if k != near.key.get())
+    game._Game__set_key(near, unused)
+    assert game.neighborhood is None
+    moves = game.legal_moves()
+    assert [m.keys for m in moves if m.tile is near] == \
+        [tuple(game.language[unused])]
+
+
+def test_cached_moves_match_fresh_ones_in_play():
+    rng = random.Random(2)
+    game = Game(10, 'english lower + japanese hiragana', headless=True)
+    for tick in range(400):
+        moves = game.legal_moves()
+        assert moves == fresh_moves(game)
+        assert all(not game.is_character(m.tile) for m in moves)
+        move = rng.choice(moves)
+        for key in move.keys:
+            game.move_player(key)
+        assert game.player == move.tile.pos
+        if game.move_chaser():
+            game.restart()
+        game.move_nommer()
+        game.move_runner()
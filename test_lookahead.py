@@ -0,0 +1,116 @@
+""" Tests of lookahead.Lookahead and minimax_chaser. """
+import random
+from math import inf
+
+import pytest
+
+from engine import Game
+from lookahead import CHARACTERS, minimax_chaser
+
+
+def snapshot(view):
+    return (dict(view.keys), dict(view.populations), set(view.targets),
+            list(view.trail), dict(view.positions), view.score, view.losses)
+
+
+def play(game, steps: int):
+    for _ in range(steps):
+        moves = game.legal_moves()
+        for key in random.choice(moves).keys:
+            game.move_player(key)
+        game.move_nommer()
+        game.move_runner()
+        if game.move_chaser():
+            game.restart()
+
+
+def test_undo_restores_exact_state():
+    random.seed(0)
+    game = Game(10, headless=True)
+    play(game, 30)
+    view = game.clone()
+    for _ in range(200):
+        snapshots = []
+        for _ in range(random.randint(1, 12)):
+            character = random.choice(CHARACTERS)
+            moves = view.moves(character)
+            if not moves or view.caught():
+                break
+            snapshots.append(snapshot(view))
+            view.move(character, random.choice(moves))
+        for before in reversed(snapshots):
+            view.undo()
+            assert snapshot(view) == before
+        assert not view.history
+        assert not view.keys and not view.populations
+
+
+def test_view_reads_the_live_game():
+    random.seed(1)
+    game = Game(10, headless=True)
+    play(game, 10)
+    view = game.clone()
+    clone = view.clone()
+    for tile in game.grid:
+        pos = (tile.pos.x, tile.pos.y)
+        key = tile.key.get()
+        expected = key if key in game.language else ''
+        assert view.key_at(pos) == clone.key_at(pos) == expected
+    for key, population in game.populations.items():
+        assert view.population(key) == population
+
+    play(game, 1)
+    for stale in (view, clone):
+        with pytest.raises(RuntimeError):
+            stale.move('chaser', stale.moves('chaser')[0])
+
+
+def plain_minimax(view, depth: int):
+    """ Returns the value of each chaser move, searching without pruning. """
+    def distance():
+        (cx, cy), (px, py) = view.positions['chaser'], view.positions['player']
+        return max(abs(cx - px), abs(cy - py))
+
+    def after_chaser(depth: int, caught_value: int):
+        if view.caught():
+            return caught_value
+        value = -inf
+        for escape in view.moves('player') or [None]:
+            if escape is not None:
+                view.move('player', escape)
+            value = max(value, search(depth - 1))
+            if escape is not None:
+                view.undo()
+        return value
+
+    def search(depth: int):
+        if view.caught():
+            return -depth
+        if depth == 0:
+            return distance()
+        best = inf
+        for dest in view.moves('chaser'):
+            view.move('chaser', dest)
+            best = min(best, after_chaser(depth, -depth))
+            view.undo()
+        return best
+
+    values = {}
+    for dest in view.moves('chaser'):
+        view.move('chaser', dest)
+        values[dest] = after_chaser(depth, -depth - 1)
+        view.undo()
+    return values
+
+
+@pytest.mark.parametrize('depth', [1, 2, 3])
+def test_minimax_matches_plain_search(depth):
+    random.seed(depth)
+    for _ in range(6):
+        game = Game(8, headless=True)
+        play(game, random.randint(0, 20))
+        view = game.clone()
+        values = plain_minimax(view, depth)
+        move = minimax_chaser(view, depth)
+        assert values[move] == min(values.values())
+        assert not view.history
@@ -0,0 +1,57 @@
+""" Tests of planner.RunnerPlanner against its exact escapes. """
+from itertools import product
+from math import hypot
+
+import pytest
+
+from pair import Pair
+from planner import RunnerPlanner
+
+
+def near_pairs(planner, step: int = 1):
+    """ Yields the distinct runner and player positions that are near. """
+    positions = [Pair(x, y) for x, y in
+                 product(range(0, planner.width, step), repeat=2)]
+    for runner, player in product(positions, repeat=2):
+        if runner != player and not planner.is_far(runner, player):
+            yield runner, player
+
+
+@pytest.mark.parametrize('width', [10, 13])
+def test_cell_of_one_is_exact(width):
+    planner = RunnerPlanner(width, cell=1)
+    chaser = nommer = Pair(0, 0)
+    for runner, player in near_pairs(planner):
+        target = planner.target(runner, player, chaser, nommer)
+        assert target == Pair(*planner.escape(runner.x, runner.y, player.x, player.y))
+
+
+@pytest.mark.parametrize('width', [10, 13, 20])
+def test_cells_share_the_escape_of_their_centers(width):
+    planner = RunnerPlanner(width, cell=2)
+    chaser = nommer = Pair(0, 0)
+    for runner, player in near_pairs(planner):
+        target = planner.target(runner, player, chaser, nommer)
+        if (runner.x // 2, runner.y // 2) == (player.x // 2, player.y // 2):
+            # Centers of the same cell would give no direction:
+            expected = planner.escape(runner.x, runner.y, player.x, player.y)
+        else:
+            expected = planner.escape(
+                runner.x // 2 * 2 + 0.5, runner.y // 2 * 2 + 0.5,
+                player.x // 2 * 2 + 0.5, player.y // 2 * 2 + 0.5)
+        assert target == Pair(*expected)
+    assert len(planner.escapes) <= ((width + 1) // 2) ** 4
+
+
+def test_far_runner_chases_the_chaser_away_from_the_nommer():
+    planner = RunnerPlanner(18)
+    runner, player = Pair(1, 1), Pair(16, 16)
+    chaser, nommer = Pair(9, 4), Pair(1, 10)
+    assert planner.is_far(runner, player)
+    target = planner.target(runner, player, chaser, nommer)
+    # Two tiles, or width / 9, from the chaser, straight away from the nommer:
+    assert target == Pair(9, 2)
+    for (dx, dy), (sx, sy) in planner.away.items():
+        if dx or dy:
+            assert abs(hypot(sx, sy) - 2) <= 0.75
+            assert sx * dx + sy * dy > 0
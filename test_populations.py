@@ -0,0 +1,42 @@
+""" Tests of populations.Populations. """
+import random
+
+from populations import Populations
+
+
+def test_levels_follow_assignments():
+    populations = Populations.fromkeys('abcd')
+    populations['a'] = 2
+    populations['b'] = 1
+    populations['a'] = 1
+    populations['c'] = 3
+    for value, level in populations.levels.items():
+        assert sorted(level) == sorted(
+            k for k, v in populations.items() if v == value)
+        for slot, key in enumerate(level):
+            assert populations.slots[key] == slot
+    assert populations.rarest() == 'd'
+    assert populations.rarest(excluded={'d'}) in ('a', 'b')
+
+
+def test_balanced_choice_weights():
+    random.seed(0)
+    populations = Populations({'a': 0, 'b': 0, 'c': 1, 'd': 2})
+    excluded = {'b'}
+    draws = 40000
+    counts = dict.fromkeys(populations, 0)
+    for _ in range(draws):
+        counts[populations.balanced_choice(excluded)] += 1
+    assert counts['b'] == 0
+    # Keys are weighted by 4 ** (lowest - population):
+    weights = {'a': 1, 'c': 1 / 4, 'd': 1 / 16}
+    total = sum(weights.values())
+    for key, weight in weights.items():
+        assert abs(counts[key] / draws - weight / total) < 0.01
+
+
+def test_balanced_choice_skips_excluded_lowest_level():
+    random.seed(1)
+    populations = Populations({'a': 0, 'b': 1, 'c': 1})
+    draws = {populations.balanced_choice({'a'}) for _ in range(200)}
+    assert draws == {'b', 'c'}
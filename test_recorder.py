@@ -0,0 +1,58 @@
+""" Tests of recorder.Recorder. """
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from engine import Game
+from recorder import Recorder, Recording
+from worker import Driver
+
+
+def test_language_change_stops_recording(tmp_path):
+    path = str(tmp_path / 'game.snk')
+    game = Game(8, headless=True)
+    recorder = Recorder(path, game)
+    keys = list(game.language.values())
+    for _ in range(20):
+        game.move_player(random.choice(keys))
+        recorder.tick()
+    game.lang_choice.set('japanese hiragana')
+    # The recording must not raise into the game:
+    game.restart()
+    assert recorder.stopped
+    recorder.tick()
+    recorder.close()
+
+    recording = Recording(path)
+    assert len(recording) == 20
+    assert recording.language == list(Game(8, headless=True).language)
+
+
+def test_recording_names_language_in_play(tmp_path):
+    path = str(tmp_path / 'game.snk')
+    game = Game(8, headless=True)
+    game.lang_choice.set('japanese hiragana')
+    recorder = Recorder(path, game)
+    recorder.tick()
+    recorder.close()
+    assert Recording(path).language == list(game.language)
+
+
+def test_driver_records_a_tick_per_frame(tmp_path):
+    path = str(tmp_path / 'game.snk')
+    game = Game(8, headless=True)
+    driver = Driver(game)
+    driver.record(path)
+    frames = 0
+    for _ in range(30):
+        moves = game.legal_moves()
+        for key in random.choice(moves).keys:
+            driver.press(key)
+        game.move_nommer()
+        if driver.frame() is not None:
+            frames += 1
+    driver.record(None)
+    assert driver.recorder is None
+    assert len(Recording(path)) == frames + 1
@@ -0,0 +1,52 @@
+""" Tests of seeking recordings made by recorder.py with replay.Replay. """
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('tkinter')
+
+from engine import Game
+from recorder import CHARACTER, Recorder, Recording
+from replay import Replay
+
+
+def test_seek_matches_ticks(tmp_path):
+    random.seed(0)
+    game = Game(12, headless=True)
+    path = str(tmp_path / 'game.snk')
+    recorder = Recorder(path, game, keyframe_every=40)
+    index = {k: i for i, k in enumerate(game.language)}
+    width = game.width
+    snapshots = []
+    for i in range(1500):
+        if random.random() < 0.5:
+            for key in random.choice(game.legal_moves()).keys:
+                game.move_player(key)
+        if i % 3 == 0:
+            game.move_nommer()
+        if i % 4 == 0:
+            game.move_runner()
+        if i % 9 == 0 and game.move_chaser():
+            game.restart()
+        recorder.tick()
+        trail = [0] * width ** 2
+        for tile in game.trail:
+            trail[width * tile.pos.y + tile.pos.x] += 1
+        snapshots.append((
+            [index.get(t.key.get(), CHARACTER) for t in game.grid],
+            sorted(width * t.pos.y + t.pos.x for t in game.targets),
+            trail))
+    recorder.close()
+
+    replay = Replay(Recording(path))
+    assert len(replay) == len(snapshots)
+    assert len(replay.recording.keyframes) and len(replay.resets) > 1
+    ticks = random.sample(range(len(snapshots)), 200)
+    ticks += sorted(ticks[:50]) + [len(snapshots) - 1, 0]
+    for tick in ticks:
+        replay.seek(tick)
+        keys, targets, trail = snapshots[tick]
+        assert replay.keys == keys
+        assert [i for i, t in enumerate(replay.targets) if t] == targets
+        assert replay.trail == trail
@@ -0,0 +1,98 @@
+""" Tests of server.Room and server.Server, through client.Mirror. """
+import asyncio
+import json
+import random
+from time import time
+
+from client import Mirror
+from server import Room, Server, trail_change
+
+
+class Writer:
+    """ Collects the messages written to a seat. """
+    class Transport:
+        def get_write_buffer_size(self):
+            return 0
+
+    def __init__(self):
+        self.transport = Writer.Transport()
+        self.messages = []
+
+    def write(self, data: bytes):
+        self.messages.append(json.loads(data))
+
+    def close(self):
+        pass
+
+
+def test_trail_change():
+    for old, new in (
+            ([], [1]), ([1, 2], [1, 2, 3]), ([1, 2, 3], [1, 2]),
+            ([1, 2, 3], [2, 3, 4]), ([1, 2, 1, 2], [2, 1, 2, 5]),
+            ([1, 2, 3], [1, 3]), ([4, 5], [])):
+        drop, keep, added = trail_change(old, new)
+        assert old[drop:drop + keep] + added == new
+    assert trail_change([1, 2, 3], [2, 3, 4]) == [1, 2, [4]]
+
+
+def test_two_seats_share_a_room():
+    random.seed(0)
+    room = Room(10)
+    writers = [Writer(), Writer()]
+    seats = [room.join(writer) for writer in writers]
+    mirrors = []
+    for writer in writers:
+        mirror = Mirror(room.board())
+        mirror.apply(room.full_delta())
+        mirrors.append(mirror)
+    assert seats[0].player != seats[1].player
+
+    game = room.game
+    # Enemies move on a simulated clock, faster than real time:
+    now = time()
+    for _ in range(400):
+        seat = random.choice(seats)
+        seat.load(game)
+        moves = game.legal_moves()
+        seat.store(game)
+        keys = random.choice(moves).keys if moves and random.random() < 0.9 \
+            else ['space']
+        for key in keys:
+            room.press(seat, key)
+        now += 0.1
+        room.step(now)
+        message = room.delta()
+        if message is not None:
+            room.broadcast(message)
+            for writer, mirror in zip(writers, mirrors):
+                mirror.apply(writer.messages[-1])
+
+    width = game.width
+    for mirror in mirrors:
+        assert mirror.keys == [tile.key.get() for tile in game.grid]
+        assert mirror.players == room.fields()['p']
+        assert mirror.trails == {
+            s.id: [t.pos.y * width + t.pos.x for t in s.trail]
+            for s in seats}
+
+    # The last seat leaves its player on the board as a statue:
+    room.leave(seats[0])
+    room.leave(seats[0])
+    assert list(room.seats) == [seats[1].id]
+
+
+def test_bad_first_line_is_dropped():
+    async def main():
+        server = Server(8)
+        listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        for first in (b'x' * 100_000 + b'\n', b'y' * 100 + b'\n', b'\n'):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(first)
+            assert await asyncio.wait_for(reader.read(), 5) == b''
+            writer.close()
+        assert not server.rooms
+        listener.close()
+        await listener.wait_closed()
+
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+""" Tests of sessions.SessionStore. """
+from sessions import Session, SessionStore, session_of
+
+
+def session(score: int, language: str = 'english lower', width: int = 20):
+    return Session(language, width, score, 0, 60.0, 10,
+                   0.4, 0.35, 0.8, 1.7e9)
+
+
+def test_percentile_rank_counts_ties_as_half(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.db'))
+    store.extend(session(score) for score in (10, 20, 20, 30))
+    store.add(session(5, width=10))
+    assert store.percentile_rank('english lower', 20, 5) == 0
+    assert store.percentile_rank('english lower', 20, 20) == 50
+    assert store.percentile_rank('english lower', 20, 30) == 87.5
+    assert store.percentile_rank('english lower', 20, 40) == 100
+    # Buffered sessions count, and each board has its own ranks:
+    assert store.percentile_rank('english lower', 10, 5) == 50
+    assert store.percentile_rank('english lower', 30, 5) is None
+    assert store.count('english lower', 20) == 4
+    store.close()
+
+
+def test_store_persists_sessions_of_games(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    stats = {'moves': 12, 'average': 0.5, 'p50': 0.4, 'p90': 0.9}
+    store = SessionStore(path)
+    store.add(session_of('english lower', 20, 7, 2, stats, 100.0, 160.0))
+    store.add(session_of('english lower', 20, 9, 3, stats, 100.0, 130.0))
+    store.close()
+
+    store = SessionStore(path)
+    best = store.top('english lower', 20)
+    assert [s.score for s in best] == [9, 7]
+    assert best[0].duration == 30.0 and best[0].moves == 12
+    assert store.boards() == [('english lower', 20, 2, 9)]
+    store.close()
@@ -0,0 +1,67 @@
+""" Tests of sharedboard.SharedBoard. """
+import pytest
+
+from engine import Game
+from languages import LANGUAGES, MIXES
+from sharedboard import SEQ, SEQ_OFFSET, SharedBoard
+
+
+def shown_keys(board, keys):
+    """ Returns the display keys of a read, with '' under characters. """
+    indices = memoryview(keys).cast('B' if board.key_size == 1 else 'H')
+    return [board.language[i] if i != board.character else '' for i in indices]
+
+
+def game_keys(game):
+    return [tile.key.get() if tile.key.get() in game.language else ''
+            for tile in game.grid]
+
+
+@pytest.mark.parametrize('lang_choice', list(LANGUAGES) + list(MIXES))
+def test_attach(lang_choice):
+    game = Game(8, lang_choice, headless=True)
+    writer = SharedBoard(game=game)
+    reader = SharedBoard(writer.name)
+    try:
+        header, keys, roles = reader.read()
+        assert header['language'] == lang_choice
+        assert shown_keys(reader, keys) == game_keys(game)
+
+        # Readers follow a change of language on restart:
+        game.lang_choice.set('english lower')
+        game.restart()
+        writer.publish()
+        header, keys, roles = reader.read()
+        assert reader.lang_choice == 'english lower'
+        assert shown_keys(reader, keys) == game_keys(game)
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_read_times_out():
+    writer = SharedBoard(game=Game(8, headless=True))
+    reader = SharedBoard(writer.name)
+    try:
+        # A writer that died while changing the board:
+        SEQ.pack_into(writer.shm.buf, SEQ_OFFSET, 7)
+        with pytest.raises(TimeoutError):
+            reader.read(timeout=0.05)
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_attach_after_menu_change():
+    game = Game(8, headless=True)
+    # The menu changes mid-game. It only applies at the next restart:
+    game.lang_choice.set('japanese hiragana')
+    writer = SharedBoard(game=game)
+    reader = SharedBoard(writer.name)
+    try:
+        header, keys, roles = reader.read()
+        assert header['language'] == 'english lower'
+        assert shown_keys(reader, keys) == game_keys(game)
+    finally:
+        reader.close()
+        writer.close()
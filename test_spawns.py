@@ -0,0 +1,46 @@
+""" Tests of targets drawn ahead of time by engine.Game.prepare_spawns. """
+import random
+
+import events
+from engine import SPAWN_BUFFER, Game
+from harness import characters_placed, targets_kept
+
+
+def test_prepare_fills_the_buffer():
+    game = Game(10, headless=True)
+    assert game.prepare_spawns() == SPAWN_BUFFER
+    assert game.prepare_spawns() == 0
+    assert len(game.spawns) == SPAWN_BUFFER
+    assert not any(t in game.targets or game.is_character(t)
+                   for t in game.spawns)
+    game.restart()
+    assert game.spawns == []
+
+
+def test_spawns_skip_tiles_taken_since_drawn():
+    game = Game(10, headless=True)
+    eaten = game.targets.pop()
+    free = next(t for t in game.grid if t not in game.targets
+                and t is not eaten and not game.is_character(t))
+    game.spawns = [game.targets[0], game.player_tile(), free, eaten]
+    assert game.spawn_new_targets() == [free]
+    assert game.spawns == [eaten]
+
+
+def test_buffered_play_keeps_targets():
+    rng = random.Random(4)
+    game = Game(10, headless=True)
+    eaten = []
+    game.subscribe(eaten.append, events.TargetEaten)
+    for tick in range(300):
+        if tick % 3 == 0:
+            game.prepare_spawns()
+        move = rng.choice(game.legal_moves())
+        for key in move.keys:
+            game.move_player(key)
+        game.move_nommer()
+        if game.move_chaser():
+            game.restart()
+        assert targets_kept(game) is None
+        assert characters_placed(game) is None
+    assert eaten
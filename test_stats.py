@@ -0,0 +1,62 @@
+""" Tests of stats.Difficulty and the statistics it follows. """
+import random
+
+import pytest
+
+from engine import Game
+from stats import Difficulty, RollingPercentile
+
+
+@pytest.mark.parametrize('period, goal', [
+    (0.45, 1.0), (0.3, 1.5), (0.1, 1.5), (0.6, 0.75), (5.0, 0.75)])
+def test_scale_approaches_bounded_goal(period, goal):
+    difficulty = Difficulty()
+    last = abs(difficulty.scale - goal)
+    for _ in range(100):
+        difficulty.update(period)
+        distance = abs(difficulty.scale - goal)
+        assert distance <= last
+        assert difficulty.low <= difficulty.scale <= difficulty.high
+        last = distance
+    assert difficulty.scale == pytest.approx(goal, abs=1e-3)
+
+
+def test_percentile_within_one_bucket():
+    rng = random.Random(1)
+    recent = RollingPercentile(window=64)
+    values = [rng.uniform(0.1, 2.0) for _ in range(300)]
+    for value in values:
+        recent.add(value)
+    window = sorted(values[-64:])
+    for q in (10, 50, 90):
+        exact = window[int(q / 100 * 63)]
+        assert exact / recent.ratio <= recent.percentile(q) <= exact * recent.ratio
+
+
+def play(game, period: float, moves: int = 40):
+    """ Moves the player every period seconds on a simulated clock. """
+    now = 0.0
+    game.clock = lambda: now
+    game.time_start = now
+    for _ in range(moves):
+        now += period
+        key = next(iter(game.legal_moves())).keys[0]
+        game.move_player(key, now)
+
+
+def test_enemies_scale_with_player_speed():
+    fast = Game(10, headless=True)
+    fast.adaptive.set(True)
+    play(fast, 0.15)
+    slow = Game(10, headless=True)
+    slow.adaptive.set(True)
+    play(slow, 2.0)
+    fixed = Game(10, headless=True)
+    play(fixed, 0.15)
+    assert fast.frequency_scale() == pytest.approx(1.5, abs=0.05)
+    assert slow.frequency_scale() == pytest.approx(0.75, abs=0.05)
+    assert fixed.frequency_scale() == 1.0
+    assert fast.stats()['scale'] == fast.frequency_scale()
+    for game in (fast, slow, fixed):
+        assert game.chaser_period() * game.enemy_base_speed() \
+            == pytest.approx(1 / game.frequency_scale())
@@ -0,0 +1,77 @@
+""" Tests of strategies.Strategy budgets and the registry. """
+from time import sleep
+
+import pytest
+
+import strategies
+from engine import Game
+from pair import Pair
+from strategies import MAX_BACKOFF, Strategy, greedy_target, strategy
+
+
+class Scripted(Strategy):
+    """ Targets a far corner, and takes the given seconds to. """
+    def __init__(self, seconds: float, budget: float = 0.005):
+        super(Scripted, self).__init__(budget)
+        self.character = 'chaser'
+        self.seconds = seconds
+        self.calls = 0
+
+    def target(self, game, deadline: float):
+        self.calls += 1
+        if self.seconds:
+            sleep(self.seconds)
+        return Pair(-50, -50)
+
+
+def test_overruns_take_greedy_steps_for_doubling_moves():
+    game = Game(10, headless=True)
+    slow = Scripted(0.01)
+    greedy = greedy_target(game, 'chaser')
+    decisions = [slow.decide(game) for _ in range(1 + 2 + 4 + 3)]
+    # Overrun, 1 greedy, overrun, 2 greedy, overrun, 4 greedy, overrun:
+    assert decisions == [
+        Pair(-50, -50), greedy, Pair(-50, -50), greedy, greedy,
+        Pair(-50, -50), greedy, greedy, greedy, greedy]
+    assert slow.calls == 3 and slow.overruns == 3
+    assert slow.backoff == 8
+
+    # A decision within budget resets the backoff:
+    slow.seconds = 0
+    for _ in range(slow.skip):
+        slow.decide(game)
+    assert slow.decide(game) == Pair(-50, -50)
+    assert slow.backoff == 1
+
+
+def test_backoff_is_bounded():
+    game = Game(10, headless=True)
+    slow = Scripted(0.0, budget=0.0)
+    for _ in range(1000):
+        slow.decide(game)
+    assert slow.backoff == MAX_BACKOFF
+
+
+def test_giving_up_takes_the_greedy_step():
+    game = Game(10, headless=True)
+    quitter = strategy('chaser', 'minimax', budget=1.0)
+    quitter.target = lambda game, deadline: None
+    assert quitter.decide(game) == greedy_target(game, 'chaser')
+    assert quitter.overruns == 1 and quitter.skip == 1
+
+
+def test_overrunning_game_keeps_moving():
+    game = Game(10, headless=True)
+    game.set_strategy('chaser', 'minimax', budget=0.0)
+    for _ in range(20):
+        if game.move_chaser():
+            break
+    chaser = game.strategies['chaser']
+    assert chaser.overruns > 0
+    assert chaser.cost.value is not None
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError, match='minimax'):
+        strategy('chaser', 'telepathic')
+    assert set(strategies.REGISTRY['runner']) >= {'default', 'greedy'}
@@ -0,0 +1,71 @@
+""" Tests of worker.Driver. """
+import random
+from time import sleep
+
+from engine import Game
+from worker import Driver, EngineWorker
+
+
+def test_frames_follow_engine_state():
+    random.seed(0)
+    game = Game(10, headless=True)
+    driver = Driver(game)
+    shown = {}
+    for _ in range(3000):
+        r = random.random()
+        if r < 0.5:
+            moves = game.legal_moves()
+            if moves:
+                for key in random.choice(moves).keys:
+                    driver.press(key)
+        elif r < 0.7:
+            game.move_runner()
+        elif r < 0.9:
+            game.move_nommer()
+        elif game.move_chaser():
+            driver.restart()
+        frame = driver.frame()
+        if frame is not None:
+            if frame.full:
+                shown = {}
+            for i, key, role in frame.tiles:
+                shown[i] = (key, role)
+        assert shown == {
+            i: (tile.key.get(), driver.role(tile))
+            for i, tile in enumerate(game.grid)}
+
+
+def test_held_worker_makes_no_frames():
+    random.seed(1)
+    game = Game(10, headless=True)
+    worker = EngineWorker(Driver(game))
+    worker.start()
+    worker.send(worker.hold, True)
+    worker.send(worker.driver.pause, False)
+    for _ in range(200):
+        worker.send(lambda: [
+            worker.driver.press(key)
+            for key in random.choice(game.legal_moves()).keys])
+    sleep(0.3)
+    frames = []
+    while not worker.frames.empty():
+        frames.append(worker.frames.get())
+    # Only frames made before the hold was taken:
+    assert len(frames) <= 1
+
+    worker.send(worker.driver.pause, True)
+    worker.send(worker.hold, False)
+    sleep(0.3)
+    worker.stop()
+    worker.join()
+    while not worker.frames.empty():
+        frames.append(worker.frames.get())
+    shown = {}
+    for frame in frames:
+        if frame.full:
+            shown = {}
+        for i, key, role in frame.tiles:
+            shown[i] = (key, role)
+    assert shown == {
+        i: (tile.key.get(), worker.driver.role(tile))
+        for i, tile in enumerate(game.grid)}
@@ -0,0 +1,291 @@
+"""
+Drives a Game from commands, and describes its changes as frames.
+
+A Driver moves the enemies on their timers and the player on key
+presses, and collects the tiles that change from the game's events.
+frame() returns them as an immutable diff. An EngineWorker runs a
+Driver on its own thread, so slow shuffles and spawns on big boards
+never hold up a GUI. Commands go to the worker through one queue,
+and frames come back through another, for the GUI to drain on its
+own schedule. Neither side waits on the other.
+"""
+import threading
+from collections import namedtuple
+from queue import Empty, SimpleQueue
+from time import time
+
+import events
+
+
+# A diff of the board. tiles holds (grid index, key, role) for each tile
+# that changed, where role is a key of a color scheme. full is True when
+# tiles holds every tile. caught is True once the chaser caught the player:
+Frame = namedtuple('Frame', 'tiles score losses stats caught full')
+
+# Seconds until each enemy first moves after un-pausing:
+START_DELAYS = {'chaser': 0.8, 'nommer': 0.15, 'runner': 0.5}
+# Most commands an EngineWorker runs before making a frame:
+COMMANDS_PER_FRAME = 8
+
+
+def coalesce(frames):
+    """
+    Returns one Frame with the changes of frames, which are in the order
+    they were made, or None if there are none. Each tile is in it once.
+    """
+    if len(frames) <= 1:
+        return frames[0] if frames else None
+    tiles = {}
+    full = False
+    for frame in frames:
+        if frame.full:
+            tiles.clear()
+            full = True
+        for tile in frame.tiles:
+            tiles[tile[0]] = tile
+    last = frames[-1]
+    return Frame(
+        tuple(tiles.values()), last.score, last.losses, last.stats,
+        any(frame.caught for frame in frames), full)
+
+
+class Driver:
+    """
+    Attributes:
+    -- game         : Game              :
+    -- targets      : set{Tile}         : Mirrors game.targets from its events.
+    -- trail        : dict{Tile: int}   : Mirrors game.trail from its events.
+                                          Counts how many times a tile is in it.
+    -- dirty        : set{Tile}         : Tiles changed since the last frame.
+    -- full         : bool              : Whether the next frame holds every tile.
+    -- caught       : bool              : Whether the chaser caught the player
+                                          since the last frame.
+    -- deadlines    : dict{str: float}  : Map from enemies to when they next move,
+                                          in seconds since the epoch. None while paused.
+    -- recorder     : Recorder          : Records a tick per frame, or None.
+                                          See record().
+    """
+    def __init__(self, game):
+        self.game = game
+        self.targets = None
+        self.trail = None
+        self.dirty = None
+        self.full = False
+        self.caught = False
+        self.deadlines = None
+        self.recorder = None
+        game.subscribe(
+            self.on_event,
+            events.KeyChanged, events.TargetSpawned, events.TargetEaten,
+            events.TrailPushed, events.TrailPopped,
+            events.CharacterMoved, events.Reset, )
+        self.on_event(events.Reset())
+
+    def on_event(self, event):
+        kind = type(event)
+        if kind is events.CharacterMoved:
+            self.dirty.add(event.src)
+            self.dirty.add(event.dst)
+            return
+        elif kind is events.KeyChanged:
+            # Tiles shuffled without a character moving onto or off
+            # them, ie. the one the runner passes through:
+            pass
+        elif kind is events.TargetSpawned:
+            self.targets.add(event.tile)
+        elif kind is events.TargetEaten:
+            self.targets.discard(event.tile)
+        elif kind is events.TrailPushed:
+            self.trail[event.tile] = self.trail.get(event.tile, 0) + 1
+        elif kind is events.TrailPopped:
+            self.trail[event.tile] -= 1
+            if not self.trail[event.tile]:
+                del self.trail[event.tile]
+        elif kind is events.Reset:
+            self.targets = set(self.game.targets)
+            self.trail = {}
+            for tile in self.game.trail:
+                self.trail[tile] = self.trail.get(tile, 0) + 1
+            self.dirty = set()
+            self.full = True
+            return
+        self.dirty.add(event.tile)
+
+    def role(self, tile):
+        """ Returns the role of tile that decides its colors. """
+        game = self.game
+        pos = tile.pos
+        if pos == game.chaser:
+            return 'chaser'
+        elif pos == game.player:
+            return 'player'
+        elif pos == game.nommer:
+            return 'nommer'
+        elif pos == game.runner:
+            return 'runner'
+        elif tile in self.targets:
+            return 'target'
+        elif tile in self.trail:
+            return 'trail'
+        else:
+            return 'tile'
+
+    # -- Commands -----------------------------------------------------------
+
+    def press(self, keysym: str, pressed: float = None):
+        """ See Game.move_player. """
+        self.game.move_player(keysym, pressed)
+
+    def restart(self):
+        self.game.restart()
+
+    def pause(self, paused: bool):
+        """ Stops the enemies, or restarts their timers. """
+        if paused:
+            self.deadlines = None
+        else:
+            now = time()
+            self.deadlines = {
+                character: now + delay
+                for character, delay in START_DELAYS.items()}
+
+    def set_option(self, name: str, value):
+        """ Sets a game-play option of the game, such as lang_choice. """
+        getattr(self.game, name).set(value)
+
+    def record(self, path: str = None):
+        """
+        Records the game to path from now on, with a first tick
+        and then a tick for each frame. See recorder.py. Stops the last recording, if any, and
+        only stops if path is None.
+        """
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if path is not None:
+            from recorder import Recorder
+            self.recorder = Recorder(path, self.game)
+            # The first tick holds the board as it is now:
+            self.recorder.tick()
+
+    def call(self, function, *args):
+        """ Calls function with args. For work that must touch the game. """
+        function(*args)
+
+    def idle(self):
+        """
+        Does work that would otherwise be done while handling a
+        command. Call when there is nothing else to do.
+        """
+        self.game.prepare_spawns()
+
+    # -- Simulation ---------------------------------------------------------
+
+    def step(self, now: float):
+        """
+        Moves each enemy whose deadline has passed. Returns the seconds
+        until the next deadline, or None if the enemies are stopped.
+        The enemies stop when the chaser catches the player.
+        """
+        if self.deadlines is None:
+            return None
+        game = self.game
+        for character, deadline in self.deadlines.items():
+            if deadline > now:
+                continue
+            if character == 'chaser':
+                if game.move_chaser():
+                    self.caught = True
+                    self.deadlines = None
+                    return None
+                period = game.chaser_period()
+            elif character == 'nommer':
+                game.move_nommer()
+                period = game.nommer_period()
+            else:
+                game.move_runner()
+                period = game.runner_period()
+            self.deadlines[character] = now + period
+        return max(min(self.deadlines.values()) - now, 0.0)
+
+    def frame(self):
+        """
+        Returns a Frame of the changes since the last
+        frame, or None if nothing has changed.
+        """
+        if not (self.dirty or self.full or self.caught):
+            return None
+        game = self.game
+        width = game.width
+        tiles = game.grid if self.full else self.dirty
+        frame = Frame(
+            tuple((width * t.pos.y + t.pos.x, t.key.get(), self.role(t))
+                  for t in tiles),
+            game.score.get(), game.losses.get(), game.stats(),
+            self.caught, self.full)
+        self.dirty = set()
+        self.full = False
+        self.caught = False
+        if self.recorder is not None:
+            self.recorder.tick()
+        return frame
+
+
+class EngineWorker(threading.Thread):
+    """
+    Runs a Driver on its own thread. Only this thread may touch the
+    driver's game once started, so everything is done through send().
+
+    Attributes:
+    -- driver       : Driver            :
+    -- commands     : SimpleQueue       : Of (function, args), or None to stop.
+    -- frames       : SimpleQueue       : Of Frames, for the GUI to drain.
+    -- held         : bool              : Whether frames are held back. See hold().
+    """
+    def __init__(self, driver: Driver):
+        super(EngineWorker, self).__init__(daemon=True)
+        self.driver = driver
+        self.commands = SimpleQueue()
+        self.frames = SimpleQueue()
+        self.held = False
+
+    def send(self, function, *args):
+        """ Calls function with args on the worker's thread. """
+        self.commands.put((function, args))
+
+    def hold(self, held: bool):
+        """
+        Stops or resumes making frames, ie. while nobody drains them.
+        Meanwhile, changes build up in the driver, which holds each
+        tile at most once. Call through send().
+        """
+        self.held = held
+
+    def stop(self):
+        """ Stops the worker once it has run the commands sent before. """
+        self.commands.put(None)
+
+    def run(self):
+        driver = self.driver
+        while True:
+            delay = driver.step(time())
+            frame = None if self.held else driver.frame()
+            if frame is not None:
+                self.frames.put(frame)
+            if self.commands.empty():
+                driver.idle()
+            try:
+                batch = [self.commands.get(timeout=delay)]
+            except Empty:
+                continue
+            # Take the rest of the pending commands as one batch:
+            while len(batch) < COMMANDS_PER_FRAME:
+                try:
+                    batch.append(self.commands.get_nowait())
+                except Empty:
+                    break
+            for command in batch:
+                if command is None:
+                    return
+                function, args = command
+                function(*args)